@@ -0,0 +1,283 @@
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+
+from backend.storage import RUNTIME_DIR, create_client
+
+# ==========================================
+# BILLING
+# ==========================================
+# One pricing function for everything that shows or stores a fee: the
+# payment portal, the dashboard's live total and the job below that prices
+# the 'Unpaid' transactions the detectors log.
+#
+#   python backend/billing.py                  # price new unpaid transactions once
+#   python backend/billing.py --watch 60       # ... every 60 s
+#   python backend/billing.py --full           # re-price every unpaid one (after a tariff change)
+#   python backend/billing.py --bench 1000000  # pricing benchmark
+#
+# The tariff is read from the JSON file in PARKING_TARIFF if set, e.g.
+#   {"first_hour": 2.0, "per_hour": 1.0, "grace_minutes": 10, "daily_cap": 20.0}
+
+
+class Tariff:
+    """RM `first_hour` for the first hour, then `per_hour` per extra full hour.
+
+    Stays shorter than `grace_minutes` are free. With `daily_cap` every full
+    24 hours costs the cap, and the remainder at most the cap.
+    """
+
+    def __init__(self, first_hour=2.0, per_hour=1.0, grace_minutes=0, daily_cap=None):
+        self.first_hour = float(first_hour)
+        self.per_hour = float(per_hour)
+        self.grace_minutes = float(grace_minutes)
+        self.daily_cap = float(daily_cap) if daily_cap is not None else None
+
+    def __repr__(self):
+        return (f"Tariff(first_hour={self.first_hour}, per_hour={self.per_hour}, "
+                f"grace_minutes={self.grace_minutes}, daily_cap={self.daily_cap})")
+
+    def fee(self, seconds):
+        """Fees for an array of stay lengths in seconds (NaN for missing or negative stays)."""
+        seconds = np.asarray(seconds, np.float64)
+        if self.daily_cap is None:
+            fee = self._hourly(seconds)
+        else:
+            days = seconds // 86400
+            rest = seconds - days * 86400
+            # A stay of exactly N days costs N caps; otherwise the remainder is capped too
+            rest_fee = np.where((rest > 0) | (days == 0), np.minimum(self._hourly(rest), self.daily_cap), 0.0)
+            fee = days * self.daily_cap + rest_fee
+        fee = np.where(seconds < self.grace_minutes * 60, 0.0, fee)
+        return np.where(np.isnan(seconds) | (seconds < 0), np.nan, fee)
+
+    def _hourly(self, seconds):
+        hours = np.maximum(1, seconds // 3600)
+        return self.first_hour + (hours - 1) * self.per_hour
+
+
+def load_tariff(path=None):
+    path = path or os.environ.get('PARKING_TARIFF')
+    if not path:
+        return Tariff()
+    with open(path) as f:
+        return Tariff(**json.load(f))
+
+
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# A trailing UTC offset on ISO timestamps ('Z', '+00:00', '+0800')
+_OFFSET = r'(?:Z|[+-]\d{2}:?\d{2})$'
+
+
+def parse_times(values):
+    """Stored timestamps -> naive datetime64, NaT if invalid. The one parser for billing and forecasting.
+
+    'YYYY-mm-dd HH:MM:SS' (what this project writes) takes a fast
+    fixed-format path. Anything else, e.g. ISO strings with 'T', fractions
+    or an offset as the cloud returns them, is read as the wall-clock time
+    it shows, with the offset dropped, like the local strings it was written
+    from.
+    """
+    s = pd.Series(values, dtype=object)
+    parsed = pd.to_datetime(s, format=TIME_FORMAT, errors='coerce')
+    retry = parsed.isna() & s.notna()
+    if retry.any():
+        text = s[retry].astype(str).str.replace('T', ' ', regex=False).str.replace(_OFFSET, '', regex=True)
+        try:
+            parsed[retry] = pd.to_datetime(text, errors='coerce', format='mixed')
+        except (TypeError, ValueError):
+            parsed[retry] = pd.to_datetime(text, errors='coerce') # pandas < 2.0
+    return parsed
+
+
+def quote(entry_times, exit_times=None, tariff=None, now=None):
+    """(seconds parked, amount) arrays for entry/exit timestamps; open stays run until `now`.
+
+    Whole days count (a stay is its total length, not timedelta.seconds).
+    """
+    tariff = tariff or load_tariff()
+    entry = parse_times(entry_times)
+    if exit_times is None:
+        exit_ = pd.Series(pd.Timestamp(now or pd.Timestamp.now().floor('s')), index=entry.index)
+    else:
+        exit_ = parse_times(exit_times)
+    seconds = (exit_ - entry).dt.total_seconds().to_numpy(np.float64)
+    return seconds, tariff.fee(seconds)
+
+
+class BillingJob:
+    """Prices unpaid transactions in chunks and writes the amounts back in batches.
+
+    Transactions are read `chunk` rows at a time in id order (keyset paging,
+    so it also works when the server caps the page size). Each chunk is
+    priced with one vectorized quote(). Amounts are written with one
+    update per distinct amount and `batch` ids, guarded by payment_status so
+    a row paid in the meantime is left alone. The last id seen is kept in
+    `state_path`, so a normal run only looks at new transactions.
+    """
+
+    def __init__(self, client, tariff=None, chunk=10000, batch=500, state_path=None):
+        self.client = client
+        self.tariff = tariff or load_tariff()
+        self.chunk = chunk
+        self.batch = batch
+        self.state_path = state_path
+        self.cursor = 0
+        if state_path and os.path.exists(state_path):
+            with open(state_path) as f:
+                self.cursor = json.load(f).get('last_id', 0)
+
+        # Reporting
+        self.rows_read = 0
+        self.rows_priced = 0
+        self.reads = 0
+        self.writes = 0
+
+    def run_once(self, full=False):
+        """Price one pass over the table; returns the number of amounts written."""
+        last_id = 0 if full else self.cursor
+        written = 0
+        while True:
+            rows = self.client.table('transactions').select('id,entry_time,exit_time,amount') \
+                .eq('payment_status', 'Unpaid').gt('id', last_id).order('id').limit(self.chunk).execute().data
+            self.reads += 1
+            if not rows:
+                break
+            df = pd.DataFrame(rows)
+            last_id = int(df['id'].max())
+            self.rows_read += len(df)
+
+            # Completed stays only; a normal pass leaves already priced rows as they are
+            df = df[df['exit_time'].notna() & (df['amount'].isna() if not full else True)]
+            if df.empty:
+                continue
+            _, amounts = quote(df['entry_time'], df['exit_time'], self.tariff)
+            df = df.assign(new_amount=np.round(amounts, 2))
+            df = df[df['new_amount'].notna() & (df['new_amount'] != df['amount'])]
+            written += self._write(df)
+
+        self.cursor = max(self.cursor, last_id)
+        self._save()
+        return written
+
+    def _write(self, df):
+        for amount, ids in df.groupby('new_amount')['id']:
+            ids = ids.tolist()
+            for i in range(0, len(ids), self.batch):
+                self.client.table('transactions').update({'amount': float(amount)}) \
+                    .in_('id', ids[i:i + self.batch]).eq('payment_status', 'Unpaid').execute()
+                self.writes += 1
+        self.rows_priced += len(df)
+        return len(df)
+
+    def _save(self):
+        if not self.state_path:
+            return
+        os.makedirs(os.path.dirname(self.state_path) or '.', exist_ok=True)
+        tmp = self.state_path + ".tmp"
+        with open(tmp, 'w') as f:
+            json.dump({'last_id': self.cursor}, f)
+        os.replace(tmp, self.state_path)
+
+
+def _synthetic_stays(n, seed=0):
+    """n (entry, exit) timestamp strings over a month, log-normal stays up to a few days."""
+    rng = np.random.default_rng(seed)
+    entry = np.datetime64('2026-01-01T00:00:00') + rng.integers(0, 30 * 86400, n).astype('timedelta64[s]')
+    stay = np.clip(rng.lognormal(np.log(90 * 60), 1.0, n), 60, 4 * 86400).astype('timedelta64[s]')
+    fmt = lambda t: np.char.replace(np.datetime_as_string(t, unit='s').astype(str), 'T', ' ').astype(object)
+    return fmt(entry), fmt(entry + stay)
+
+
+def bench(n):
+    from datetime import datetime
+    tariff = load_tariff()
+    entry, exit_ = _synthetic_stays(n)
+
+    t0 = time.perf_counter()
+    _, amounts = quote(entry, exit_, tariff)
+    vector_s = time.perf_counter() - t0
+    print(f"quote(): {n:,} rows in {vector_s:.2f} s ({n / vector_s:,.0f} rows/s), "
+          f"total RM {np.nansum(amounts):,.2f}")
+
+    # The portal's original per-row path, on a sample
+    k = min(n, 100_000)
+    t0 = time.perf_counter()
+    for a, b in zip(entry[:k], exit_[:k]):
+        duration = datetime.strptime(b, '%Y-%m-%d %H:%M:%S') - datetime.strptime(a, '%Y-%m-%d %H:%M:%S')
+        hours = max(1, int(duration.total_seconds()) // 3600)
+        2.00 + (max(0, hours - 1) * 1.00)
+    loop_s = (time.perf_counter() - t0) / k * n
+    print(f"per-row strptime loop: ~{loop_s:.1f} s for {n:,} rows ({loop_s / vector_s:.0f}x slower)")
+
+    # End to end against a scratch SQLite store
+    import tempfile
+    from backend.sqlite_client import SqliteClient
+    with tempfile.TemporaryDirectory() as tmp:
+        client = SqliteClient(os.path.join(tmp, 'bench.db'))
+        conn = client.connection()
+        conn.execute("BEGIN IMMEDIATE")
+        conn.executemany("INSERT INTO transactions (wing_id, slot_id, entry_time, exit_time, payment_status) "
+                         "VALUES ('W1', 'W1-01', ?, ?, 'Unpaid')", zip(entry, exit_))
+        conn.execute("COMMIT")
+        job = BillingJob(client, tariff, chunk=50000)
+        t0 = time.perf_counter()
+        written = job.run_once()
+        job_s = time.perf_counter() - t0
+        print(f"BillingJob on SQLite: {written:,} amounts in {job_s:.1f} s ({written / job_s:,.0f} rows/s), "
+              f"{job.reads} reads + {job.writes} batched writes")
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--full', action='store_true', help='Re-price every unpaid transaction, not just new ones')
+    parser.add_argument('--watch', type=float, default=0, help='Run every N seconds (0 = once)')
+    parser.add_argument('--chunk', type=int, default=10000, help='Transactions read per query')
+    parser.add_argument('--bench', type=int, default=0, help='Benchmark pricing N synthetic rows and exit')
+    args = parser.parse_args()
+
+    if args.bench:
+        bench(args.bench)
+        sys.exit()
+
+    import signal
+    sys.path.append(os.path.join(ROOT_DIR, 'core_ai'))
+    from supervisor import clear_ready, mark_ready
+
+    job = BillingJob(create_client(), chunk=args.chunk, state_path=os.path.join(RUNTIME_DIR, 'billing.json'))
+    print(f"[BILLING] {job.tariff}")
+    mark_ready('billing')
+
+    def _on_sigterm(signum, frame):
+        raise KeyboardInterrupt
+
+    signal.signal(signal.SIGTERM, _on_sigterm)
+    full = args.full
+    try:
+        while True:
+            t0 = time.perf_counter()
+            try:
+                written = job.run_once(full=full)
+                full = False
+                if written or not args.watch:
+                    print(f"[BILLING] Priced {written} transactions in {time.perf_counter() - t0:.1f} s "
+                          f"({job.rows_read} read, {job.writes} writes so far)")
+            except Exception as e:
+                print(f"[BILLING] Database unreachable: {e}")
+            if not args.watch:
+                break
+            time.sleep(args.watch)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        clear_ready('billing')
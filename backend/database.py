@@ -1,15 +1,38 @@
 import os
-from datetime import datetime
-from supabase import create_client, Client
+import atexit
+from datetime import datetime, timezone
 
-# --- SUPABASE CLOUD SETUP ---
-# Replace these with your actual Supabase URL and Anon Key
-SUPABASE_URL = "https://edmusfoswgnjarzewzbi.supabase.co"
-SUPABASE_KEY = "sb_publishable_P-od1ESelOgV9dXUKooIlQ_x3FrRWHE"
+from backend.storage import create_client
+from backend.writer import SlotWriter
 
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+# --- DATABASE SETUP ---
+# Supabase by default; PARKING_STORAGE=sqlite writes to a local database that
+# backend/sync.py replicates to the cloud (see backend/storage.py)
+supabase = create_client()
 
-def update_slot_status(wing_id, slot_id, new_status):
+# Local journal for the write-behind queue (pending events survive restarts)
+JOURNAL_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'runtime')
+
+_writer = None
+
+def get_writer(name="detector"):
+    """Return this process's background SlotWriter, starting it on first use"""
+    global _writer
+    if _writer is None:
+        os.makedirs(JOURNAL_DIR, exist_ok=True)
+        _writer = SlotWriter(supabase, journal_path=os.path.join(JOURNAL_DIR, f'journal_{name}.jsonl'))
+        atexit.register(_writer.close)
+    return _writer
+
+def load_slots(wing_ids):
+    """Current `slots` rows of the given wings in one query (startup reconcile)"""
+    return supabase.table('slots').select('wing_id,slot_id,status,start_time').in_('wing_id', list(wing_ids)).execute().data
+
+def queue_slot_status(wing_id, slot_id, new_status, at=None, entry_time=None):
+    """Non-blocking version of update_slot_status for the detection loop"""
+    get_writer().submit(wing_id, slot_id, new_status, at=at, entry_time=entry_time)
+
+def update_slot_status(wing_id, slot_id, new_status, entry_time=None):
     """Function called by detector.py to update the cloud database"""
     now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
 
@@ -18,17 +41,19 @@ def update_slot_status(wing_id, slot_id, new_status):
             # 1. Update Cloud Status to Occupied
             supabase.table('slots').update({
                 'status': 'Occupied', 
-                'start_time': now
+                'start_time': now,
+                'updated_at': datetime.now(timezone.utc).isoformat()
             }).eq('wing_id', wing_id).eq('slot_id', slot_id).eq('status', 'Vacant').execute()
             print(f"☁️ Cloud Update: {slot_id} is Occupied")
         
         elif new_status == "Vacant":
-            # 1. Get the entry time from the cloud
-            response = supabase.table('slots').select('start_time').eq('wing_id', wing_id).eq('slot_id', slot_id).execute()
-            
-            if response.data and response.data[0].get('start_time'):
-                entry_time = response.data[0]['start_time']
-                
+            # 1. Get the entry time from the cloud (only if the caller doesn't know it)
+            if entry_time is None:
+                response = supabase.table('slots').select('start_time').eq('wing_id', wing_id).eq('slot_id', slot_id).execute()
+                if response.data and response.data[0].get('start_time'):
+                    entry_time = response.data[0]['start_time']
+
+            if entry_time:
                 # 2. Log 'Park and Run' Transaction to the cloud
                 supabase.table('transactions').insert({
                     'wing_id': wing_id,
@@ -41,7 +66,8 @@ def update_slot_status(wing_id, slot_id, new_status):
             # 3. Reset the slot to Vacant in the cloud
             supabase.table('slots').update({
                 'status': 'Vacant', 
-                'start_time': None
+                'start_time': None,
+                'updated_at': datetime.now(timezone.utc).isoformat()
             }).eq('wing_id', wing_id).eq('slot_id', slot_id).execute()
             print(f"☁️ Cloud Update: {slot_id} is Vacant")
             
@@ -0,0 +1,176 @@
+import copy
+import threading
+import time
+from collections import Counter
+
+
+class FakeResponse:
+    def __init__(self, data):
+        self.data = data
+
+
+class FakeSupabase:
+    """In-memory stand-in for the supabase Client, for offline runs and benchmarks.
+
+    Supports the subset of the query builder this project uses:
+    table().select/insert/update/upsert/delete, the eq/neq/in_/gt/gte/lt/lte
+    filters, order, limit and execute. Inserted rows get an increasing `id`
+    like the cloud tables' identity column. Every execute() sleeps `latency`
+    seconds and is counted in `calls` by (table, operation). Set
+    `fail_next` to make the next N calls raise ConnectionError, and
+    `on_execute(query, data)` to observe every successful call.
+    """
+
+    def __init__(self, tables=None, latency=0.0):
+        self.tables = {name: [dict(r) for r in rows] for name, rows in (tables or {}).items()}
+        self.latency = latency
+        self.fail_next = 0
+        self.calls = Counter()
+        self.on_execute = None
+        self._lock = threading.Lock()
+        self._last_id = Counter({name: max((r.get('id') or 0 for r in rows), default=0)
+                                 for name, rows in self.tables.items()})
+
+    def table(self, name):
+        return _FakeQuery(self, name)
+
+    def _execute(self, query):
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.calls[(query.table_name, query.op)] += 1
+            if self.fail_next > 0:
+                self.fail_next -= 1
+                raise ConnectionError("FakeSupabase: simulated network failure")
+            rows = self.tables.setdefault(query.table_name, [])
+            data = query.apply(rows)
+        if self.on_execute is not None:
+            self.on_execute(query, data)
+        return FakeResponse(data)
+
+
+class _FakeQuery:
+    def __init__(self, client, table_name):
+        self.client = client
+        self.table_name = table_name
+        self.op = None
+        self.payload = None
+        self.columns = None
+        self.on_conflict = []
+        self.filters = []
+        self.order_by = None
+        self.max_rows = None
+
+    # --- operations ---
+    def select(self, columns='*', count=None):
+        self.op, self.columns = 'select', columns
+        return self
+
+    def insert(self, rows):
+        self.op, self.payload = 'insert', rows if isinstance(rows, list) else [rows]
+        return self
+
+    def update(self, values):
+        self.op, self.payload = 'update', values
+        return self
+
+    def upsert(self, rows, on_conflict=''):
+        self.op, self.payload = 'upsert', rows if isinstance(rows, list) else [rows]
+        self.on_conflict = [c.strip() for c in on_conflict.split(',') if c.strip()]
+        return self
+
+    def delete(self):
+        self.op = 'delete'
+        return self
+
+    # --- filters & modifiers ---
+    def _filter(self, col, test):
+        self.filters.append((col, test))
+        return self
+
+    def eq(self, col, value):
+        return self._filter(col, lambda v: v == value)
+
+    def neq(self, col, value):
+        return self._filter(col, lambda v: v != value)
+
+    def in_(self, col, values):
+        values = list(values)
+        return self._filter(col, lambda v: v in values)
+
+    def gt(self, col, value):
+        return self._filter(col, lambda v: v is not None and v > value)
+
+    def gte(self, col, value):
+        return self._filter(col, lambda v: v is not None and v >= value)
+
+    def lt(self, col, value):
+        return self._filter(col, lambda v: v is not None and v < value)
+
+    def lte(self, col, value):
+        return self._filter(col, lambda v: v is not None and v <= value)
+
+    def order(self, col, desc=False):
+        self.order_by = (col, desc)
+        return self
+
+    def limit(self, n):
+        self.max_rows = n
+        return self
+
+    def execute(self):
+        return self.client._execute(self)
+
+    # --- evaluation (called under the client lock) ---
+    def _matches(self, row):
+        return all(test(row.get(col)) for col, test in self.filters)
+
+    def apply(self, rows):
+        if self.op == 'select':
+            result = [r for r in rows if self._matches(r)]
+            if self.order_by:
+                col, desc = self.order_by
+                result.sort(key=lambda r: (r.get(col) is None, r.get(col)), reverse=desc)
+            if self.max_rows is not None:
+                result = result[:self.max_rows]
+            if self.columns and self.columns != '*':
+                cols = [c.strip() for c in self.columns.split(',')]
+                result = [{c: r.get(c) for c in cols} for r in result]
+            return copy.deepcopy(result)
+
+        if self.op == 'insert':
+            new_rows = [dict(r) for r in self.payload]
+            for r in new_rows:
+                if r.get('id') is None:
+                    self.client._last_id[self.table_name] += 1
+                    r['id'] = self.client._last_id[self.table_name]
+            rows.extend(new_rows)
+            return copy.deepcopy(new_rows)
+
+        if self.op == 'update':
+            hit = [r for r in rows if self._matches(r)]
+            for r in hit:
+                r.update(self.payload)
+            return copy.deepcopy(hit)
+
+        if self.op == 'upsert':
+            result = []
+            for new in self.payload:
+                match = None
+                if self.on_conflict:
+                    match = next((r for r in rows
+                                  if all(r.get(c) == new.get(c) for c in self.on_conflict)), None)
+                if match is None:
+                    match = dict(new)
+                    rows.append(match)
+                else:
+                    match.update(new)
+                result.append(match)
+            return copy.deepcopy(result)
+
+        if self.op == 'delete':
+            hit = [r for r in rows if self._matches(r)]
+            rows[:] = [r for r in rows if not self._matches(r)]
+            return copy.deepcopy(hit)
+
+        raise ValueError(f"FakeSupabase: no operation set on table '{self.table_name}'")
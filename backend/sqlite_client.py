@@ -0,0 +1,236 @@
+import sqlite3
+import threading
+
+from backend.fake_client import FakeResponse
+
+# Local copy of the two cloud tables. `rev` and `synced` are bookkeeping for
+# backend/sync.py and never show up in query results:
+#   synced 0 = written locally, not in the cloud yet
+#          1 = in the cloud as it is here
+#          2 = (transactions) in the cloud, changed locally since
+# The triggers mark a row dirty whenever a data column changes, whoever
+# changes it, so writers don't have to know about syncing.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS slots (
+    wing_id    TEXT NOT NULL,
+    slot_id    TEXT NOT NULL,
+    status     TEXT NOT NULL DEFAULT 'Vacant',
+    start_time TEXT,
+    updated_at TEXT,
+    rev        INTEGER NOT NULL DEFAULT 1,
+    synced     INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (wing_id, slot_id)
+);
+CREATE INDEX IF NOT EXISTS slots_updated_at ON slots (updated_at);
+CREATE INDEX IF NOT EXISTS slots_slot_id ON slots (slot_id);
+CREATE INDEX IF NOT EXISTS slots_unsynced ON slots (synced) WHERE synced != 1;
+
+CREATE TABLE IF NOT EXISTS transactions (
+    id             INTEGER PRIMARY KEY AUTOINCREMENT,
+    wing_id        TEXT NOT NULL,
+    slot_id        TEXT NOT NULL,
+    entry_time     TEXT,
+    exit_time      TEXT,
+    payment_status TEXT NOT NULL DEFAULT 'Unpaid',
+    amount         REAL,
+    rev            INTEGER NOT NULL DEFAULT 1,
+    synced         INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS transactions_exit_time ON transactions (exit_time);
+CREATE INDEX IF NOT EXISTS transactions_payment_status ON transactions (payment_status);
+CREATE INDEX IF NOT EXISTS transactions_slot ON transactions (wing_id, slot_id, entry_time);
+CREATE INDEX IF NOT EXISTS transactions_unsynced ON transactions (synced) WHERE synced != 1;
+
+CREATE TRIGGER IF NOT EXISTS slots_dirty AFTER UPDATE OF wing_id, slot_id, status, start_time, updated_at ON slots
+BEGIN
+    UPDATE slots SET rev = rev + 1, synced = 0 WHERE rowid = NEW.rowid;
+END;
+CREATE TRIGGER IF NOT EXISTS transactions_dirty
+AFTER UPDATE OF wing_id, slot_id, entry_time, exit_time, payment_status, amount ON transactions
+BEGIN
+    UPDATE transactions SET rev = rev + 1, synced = CASE WHEN synced = 0 THEN 0 ELSE 2 END WHERE id = NEW.id;
+END;
+"""
+
+HIDDEN = ('rev', 'synced')
+
+
+class SqliteClient:
+    """Local SQLite database behind the same query builder as the supabase Client.
+
+    SlotWriter, SlotCache, the forecaster and the dashboard use it unchanged:
+    table().select/insert/update/upsert/delete, the eq/neq/in_/gt/gte/lt/lte
+    filters, order, limit and execute. The database runs in WAL mode so
+    detectors can write while the dashboard reads. Each thread gets its own
+    connection.
+    """
+
+    def __init__(self, path, busy_timeout_ms=5000):
+        self.path = path
+        self.busy_timeout_ms = busy_timeout_ms
+        self._local = threading.local()
+        conn = self.connection()
+        conn.executescript(SCHEMA)
+        self.columns = {
+            table: [r[1] for r in conn.execute(f"PRAGMA table_info({table})") if r[1] not in HIDDEN]
+            for table in ('slots', 'transactions')
+        }
+
+    def connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout_ms / 1000, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")   # Durable at checkpoints; a crash loses at most the last commits
+            conn.execute(f"PRAGMA busy_timeout={self.busy_timeout_ms}")
+            self._local.conn = conn
+        return conn
+
+    def table(self, name):
+        return _SqliteQuery(self, name)
+
+    def _execute(self, query):
+        sql, params, many = query.build()
+        conn = self.connection()
+        if many:
+            # One commit per batch instead of one per row
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = []
+                for p in params:
+                    rows += conn.execute(sql, p).fetchall()
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        else:
+            rows = conn.execute(sql, params).fetchall()
+        return FakeResponse([{k: r[k] for k in r.keys() if k not in HIDDEN} for r in rows])
+
+
+def _q(name):
+    return f'"{name}"'
+
+
+class _SqliteQuery:
+    def __init__(self, client, table_name):
+        self.client = client
+        self.table_name = table_name
+        self.op = None
+        self.payload = None
+        self.columns = '*'
+        self.on_conflict = []
+        self.where = []
+        self.params = []
+        self.order_by = None
+        self.max_rows = None
+
+    # --- operations ---
+    def select(self, columns='*', count=None):
+        self.op, self.columns = 'select', columns
+        return self
+
+    def insert(self, rows):
+        self.op, self.payload = 'insert', rows if isinstance(rows, list) else [rows]
+        return self
+
+    def update(self, values):
+        self.op, self.payload = 'update', values
+        return self
+
+    def upsert(self, rows, on_conflict=''):
+        self.op, self.payload = 'upsert', rows if isinstance(rows, list) else [rows]
+        self.on_conflict = [c.strip() for c in on_conflict.split(',') if c.strip()]
+        return self
+
+    def delete(self):
+        self.op = 'delete'
+        return self
+
+    # --- filters & modifiers ---
+    def _filter(self, col, op, value):
+        self.where.append(f"{_q(col)} {op} ?")
+        self.params.append(value)
+        return self
+
+    def eq(self, col, value):
+        if value is None:
+            self.where.append(f'"{col}" IS NULL')
+            return self
+        return self._filter(col, '=', value)
+
+    def neq(self, col, value):
+        return self._filter(col, 'IS NOT', value)
+
+    def in_(self, col, values):
+        values = list(values)
+        self.where.append(f'"{col}" IN ({",".join("?" * len(values))})' if values else '0')
+        self.params += values
+        return self
+
+    def gt(self, col, value):
+        return self._filter(col, '>', value)
+
+    def gte(self, col, value):
+        return self._filter(col, '>=', value)
+
+    def lt(self, col, value):
+        return self._filter(col, '<', value)
+
+    def lte(self, col, value):
+        return self._filter(col, '<=', value)
+
+    def order(self, col, desc=False):
+        self.order_by = (col, desc)
+        return self
+
+    def limit(self, n):
+        self.max_rows = n
+        return self
+
+    def execute(self):
+        return self.client._execute(self)
+
+    # --- SQL generation ---
+    def _where(self):
+        return (" WHERE " + " AND ".join(self.where)) if self.where else ""
+
+    def build(self):
+        """(sql, params, executemany?) for this query."""
+        table = f'"{self.table_name}"'
+        if self.op == 'select':
+            if self.columns == '*':
+                cols = ", ".join(f'"{c}"' for c in self.client.columns[self.table_name])
+            else:
+                cols = ", ".join(f'"{c.strip()}"' for c in self.columns.split(','))
+            sql = f"SELECT {cols} FROM {table}{self._where()}"
+            if self.order_by:
+                col, desc = self.order_by
+                sql += f' ORDER BY "{col}"' + (" DESC" if desc else "")
+            if self.max_rows is not None:
+                sql += f" LIMIT {int(self.max_rows)}"
+            return sql, self.params, False
+
+        if self.op in ('insert', 'upsert'):
+            if not self.payload:
+                return "SELECT 1 WHERE 0", [], False
+            cols = list(dict.fromkeys(c for row in self.payload for c in row))
+            sql = f"INSERT INTO {table} ({', '.join(_q(c) for c in cols)}) VALUES ({', '.join('?' * len(cols))})"
+            if self.op == 'upsert':
+                keys = self.on_conflict or ['id']
+                updates = [c for c in cols if c not in keys]
+                sql += f" ON CONFLICT ({', '.join(keys)}) DO " + (
+                    "UPDATE SET " + ", ".join(f"{_q(c)} = excluded.{_q(c)}" for c in updates) if updates else "NOTHING")
+            sql += " RETURNING *"
+            return sql, [[row.get(c) for c in cols] for row in self.payload], True
+
+        if self.op == 'update':
+            sets = ", ".join(f'"{c}" = ?' for c in self.payload)
+            return (f"UPDATE {table} SET {sets}{self._where()} RETURNING *",
+                    list(self.payload.values()) + self.params, False)
+
+        if self.op == 'delete':
+            return f"DELETE FROM {table}{self._where()} RETURNING *", self.params, False
+
+        raise ValueError(f"SqliteClient: no operation set on table '{self.table_name}'")
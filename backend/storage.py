@@ -0,0 +1,61 @@
+import os
+
+# ==========================================
+# STORAGE SELECTION
+# ==========================================
+# Every component talks to the database through a client with the supabase
+# query-builder interface (table().select/insert/upsert/...). Which client
+# is used is configured per machine:
+#
+#   PARKING_STORAGE=supabase  (default) straight to the cloud
+#   PARKING_STORAGE=sqlite    local SQLite file (PARKING_SQLITE, default
+#                             runtime/parking.db); backend/sync.py copies it
+#                             to Supabase in batches when the link is up
+#   PARKING_FAKE_DB=<latency> in-memory FakeSupabase (benchmarks)
+#
+# Cloud schema: the slot writer (backend/writer.py) and backend/sync.py
+# upsert `slots` on (wing_id, slot_id), which PostgREST only accepts with a
+# unique constraint on those columns. Once per Supabase project (SQL editor),
+# after removing any duplicate rows:
+#
+#   ALTER TABLE slots ADD CONSTRAINT slots_wing_id_slot_id_key UNIQUE (wing_id, slot_id);
+#
+# The local SQLite schema has it as its primary key.
+SLOT_KEY = 'wing_id,slot_id'
+
+SUPABASE_URL = "https://edmusfoswgnjarzewzbi.supabase.co"
+SUPABASE_KEY = "sb_publishable_P-od1ESelOgV9dXUKooIlQ_x3FrRWHE"
+
+RUNTIME_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'runtime')
+
+
+def storage_kind():
+    if os.environ.get('PARKING_FAKE_DB'):
+        return 'fake'
+    return os.environ.get('PARKING_STORAGE', 'supabase').lower()
+
+
+def sqlite_path():
+    return os.environ.get('PARKING_SQLITE', os.path.join(RUNTIME_DIR, 'parking.db'))
+
+
+def create_remote_client():
+    """The Supabase cloud client."""
+    from supabase import create_client
+    return create_client(SUPABASE_URL, SUPABASE_KEY)
+
+
+def create_client(kind=None):
+    """The client detectors and the dashboard should read and write through."""
+    kind = kind or storage_kind()
+    if kind == 'fake':
+        from backend.fake_client import FakeSupabase
+        return FakeSupabase(latency=float(os.environ.get('PARKING_FAKE_DB') or 0))
+    if kind == 'sqlite':
+        from backend.sqlite_client import SqliteClient
+        path = sqlite_path()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        return SqliteClient(path)
+    if kind == 'supabase':
+        return create_remote_client()
+    raise ValueError(f"Unknown PARKING_STORAGE '{kind}' (expected 'supabase' or 'sqlite')")
@@ -0,0 +1,156 @@
+import os
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+
+from backend.storage import SLOT_KEY, create_client, create_remote_client
+
+SLOT_COLUMNS = ('wing_id', 'slot_id', 'status', 'start_time', 'updated_at')
+TRANSACTION_COLUMNS = ('wing_id', 'slot_id', 'entry_time', 'exit_time', 'payment_status', 'amount')
+
+
+class SyncJob:
+    """Replicates the local SQLite database to Supabase in batches.
+
+    Rows the SqliteClient triggers marked dirty are pushed with one upsert
+    (slots) or one insert (new transactions) per batch. Transactions that
+    were already in the cloud and changed locally, e.g. paid or priced, are
+    updated by (wing_id, slot_id, entry_time), batched per slot and new
+    value. A row is marked synced only if it hasn't changed again while the
+    push was in flight; a transaction that did is updated on the next pass.
+    When the cloud is unreachable the job backs off and nothing is lost: the
+    rows stay dirty locally.
+    """
+
+    def __init__(self, local, remote, batch_size=500, interval=2.0, max_backoff=60.0):
+        self.local = local
+        self.remote = remote
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_backoff = max_backoff
+
+        # Reporting
+        self.pushed = 0
+        self.failures = 0
+
+    def _dirty(self, table, columns, synced):
+        conn = self.local.connection()
+        key = 'rowid' if table == 'slots' else 'id'
+        return conn.execute(
+            f"SELECT {key} AS key, rev, {', '.join(columns)} FROM {table} WHERE synced = ? LIMIT ?",
+            (synced, self.batch_size)).fetchall()
+
+    def _mark(self, table, rows):
+        """Mark pushed rows synced, or (transactions) 'in the cloud, changed since' if they changed meanwhile.
+
+        A transaction that changed while its insert was in flight exists in
+        the cloud all the same; it must get an update next time, not a
+        second insert. Slots are upserted, so a changed one simply stays dirty.
+        """
+        key = 'rowid' if table == 'slots' else 'id'
+        synced = '1' if table == 'slots' else 'CASE WHEN rev = ? THEN 1 ELSE 2 END'
+        guard = " AND rev = ?" if table == 'slots' else ""
+        params = [(r['key'], r['rev']) if table == 'slots' else (r['rev'], r['key']) for r in rows]
+        conn = self.local.connection()
+        conn.execute("BEGIN IMMEDIATE")
+        conn.executemany(f"UPDATE {table} SET synced = {synced} WHERE {key} = ?{guard}", params)
+        conn.execute("COMMIT")
+
+    def seed(self):
+        """Copy down the cloud's slot rows that the local database doesn't have yet.
+
+        Per (wing_id, slot_id): a detector may already have written some of a
+        wing's slots before this runs, and those local rows win.
+        """
+        conn = self.local.connection()
+        rows = self.remote.table('slots').select(','.join(SLOT_COLUMNS)).execute().data
+        conn.execute("BEGIN IMMEDIATE")
+        before = conn.total_changes
+        conn.executemany(f"INSERT OR IGNORE INTO slots ({', '.join(SLOT_COLUMNS)}, synced) "
+                         f"VALUES ({', '.join('?' * len(SLOT_COLUMNS))}, 1)",
+                         [[r.get(c) for c in SLOT_COLUMNS] for r in rows])
+        seeded = conn.total_changes - before
+        conn.execute("COMMIT")
+        if seeded:
+            print(f"[SYNC] Seeded {seeded} of {len(rows)} slots from the cloud")
+        return seeded
+
+    def sync_once(self):
+        """Push one batch of each kind of change; returns the number of rows pushed."""
+        pushed = 0
+
+        slots = self._dirty('slots', SLOT_COLUMNS, 0)
+        if slots:
+            self.remote.table('slots').upsert([{c: r[c] for c in SLOT_COLUMNS} for r in slots],
+                                              on_conflict=SLOT_KEY).execute()
+            self._mark('slots', slots)
+            pushed += len(slots)
+
+        new = self._dirty('transactions', TRANSACTION_COLUMNS, 0)
+        if new:
+            self.remote.table('transactions').insert([{c: r[c] for c in TRANSACTION_COLUMNS} for r in new]).execute()
+            self._mark('transactions', new)
+            pushed += len(new)
+
+        changed = self._dirty('transactions', TRANSACTION_COLUMNS, 2)
+        # One update per slot and new (payment_status, amount), over all its changed entry times
+        groups = {}
+        for r in changed:
+            groups.setdefault((r['wing_id'], r['slot_id'], r['payment_status'], r['amount']), []).append(r['entry_time'])
+        for (wing_id, slot_id, payment_status, amount), entry_times in groups.items():
+            self.remote.table('transactions').update({'payment_status': payment_status, 'amount': amount}) \
+                .eq('wing_id', wing_id).eq('slot_id', slot_id).in_('entry_time', entry_times).execute()
+        if changed:
+            self._mark('transactions', changed)
+            pushed += len(changed)
+
+        self.pushed += pushed
+        return pushed
+
+    def pending(self):
+        conn = self.local.connection()
+        return sum(conn.execute(f"SELECT COUNT(*) FROM {t} WHERE synced != 1").fetchone()[0]
+                   for t in ('slots', 'transactions'))
+
+    def run(self):
+        backoff = 0.0
+        seeded = False
+        while True:
+            try:
+                if not seeded:
+                    self.seed()
+                    seeded = True
+                pushed = self.sync_once()
+                if pushed:
+                    print(f"[SYNC] Pushed {pushed} rows ({self.pending()} pending)")
+                backoff = 0.0
+                if pushed < self.batch_size:
+                    time.sleep(self.interval)
+            except Exception as e:
+                self.failures += 1
+                backoff = min(max(backoff * 2, 1.0), self.max_backoff)
+                print(f"[SYNC] Cloud unreachable: {e} (retrying in {backoff:.0f}s, {self.pending()} pending)")
+                time.sleep(backoff)
+
+
+if __name__ == '__main__':
+    import signal
+    sys.path.append(os.path.join(ROOT_DIR, 'core_ai'))
+    from supervisor import clear_ready, mark_ready
+
+    job = SyncJob(create_client('sqlite'), create_remote_client())
+    mark_ready('sync')
+
+    def _on_sigterm(signum, frame):
+        raise KeyboardInterrupt
+
+    signal.signal(signal.SIGTERM, _on_sigterm)
+    try:
+        job.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        clear_ready('sync')
@@ -0,0 +1,253 @@
+import json
+import os
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+
+from backend.storage import SLOT_KEY
+
+
+class SlotWriter:
+    """Write-behind queue between the detection loop and the cloud database.
+
+    submit() appends the event to an in-memory queue and a local journal and
+    returns immediately. A background thread waits `flush_interval` seconds
+    to let a burst build up, coalesces the pending events per slot and writes
+    them as one `transactions` insert and one `slots` upsert (on
+    storage.SLOT_KEY, see the schema note there). Failed flushes are retried
+    with exponential backoff; pending events stay in the journal until they
+    have been written, so a restart picks them up again.
+    """
+
+    def __init__(self, client, journal_path=None, flush_interval=0.5, max_batch=500, max_backoff=30.0):
+        self.client = client
+        self.journal_path = journal_path
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.max_backoff = max_backoff
+
+        self._pending = []
+        self._cond = threading.Condition()
+        self._closing = False
+
+        # Reporting
+        self.flushes = 0
+        self.failures = 0
+        self.events_written = 0
+        self.last_flush_ms = 0.0
+        self.total_flush_ms = 0.0
+        self.calls = Counter()           # (table, op) -> database calls
+        self.errors = Counter()          # (table, op) -> failed calls
+        self.events_by_wing = Counter()
+
+        if journal_path and os.path.exists(journal_path):
+            with open(journal_path) as f:
+                self._pending = [json.loads(line) for line in f if line.strip()]
+            if self._pending:
+                print(f"☁️ Cloud Writer: replaying {len(self._pending)} journalled events")
+
+        self._thread = threading.Thread(target=self._run, name="SlotWriter", daemon=True)
+        self._thread.start()
+
+    # ------------------------------------------
+    # Producer side (detection loop)
+    # ------------------------------------------
+    def submit(self, wing_id, slot_id, new_status, at=None, entry_time=None):
+        """Queue a status change. Pass the slot's entry_time on a vacate to skip the cloud read."""
+        event = {
+            'wing_id': wing_id,
+            'slot_id': slot_id,
+            'status': new_status,
+            'at': at or datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        }
+        if new_status == 'Vacant' and entry_time:
+            event['entry_time'] = entry_time
+        with self._cond:
+            self._pending.append(event)
+            if self.journal_path:
+                with open(self.journal_path, 'a') as f:
+                    f.write(json.dumps(event) + "\n")
+            self._cond.notify()
+
+    def submit_states(self, states):
+        """Queue final slot states (dicts with wing_id, slot_id, status, at) that log no transactions.
+
+        Used for the startup reconcile: they go out with the next batch upsert.
+        """
+        events = [dict(s, settled=True) for s in states]
+        if not events:
+            return
+        with self._cond:
+            self._pending.extend(events)
+            if self.journal_path:
+                with open(self.journal_path, 'a') as f:
+                    f.writelines(json.dumps(e) + "\n" for e in events)
+            self._cond.notify()
+
+    def pending_slots(self):
+        """Slot IDs with events still waiting to be written (e.g. replayed from the journal)."""
+        with self._cond:
+            return {e['slot_id'] for e in self._pending}
+
+    def queue_depth(self):
+        with self._cond:
+            return len(self._pending)
+
+    def stats(self):
+        return {
+            'queue_depth': self.queue_depth(),
+            'flushes': self.flushes,
+            'failures': self.failures,
+            'events_written': self.events_written,
+            'db_calls': sum(self.calls.values()),
+            'db_errors': sum(self.errors.values()),
+            'last_flush_ms': round(self.last_flush_ms, 2),
+            'avg_flush_ms': round(self.total_flush_ms / self.flushes, 2) if self.flushes else 0.0,
+        }
+
+    def close(self, timeout=10.0):
+        """Stop accepting work and flush what is pending (best effort within `timeout`)."""
+        with self._cond:
+            self._closing = True
+            self._cond.notify()
+        self._thread.join(timeout)
+
+    # ------------------------------------------
+    # Consumer side (background thread)
+    # ------------------------------------------
+    def _run(self):
+        backoff = 0.0
+        attempts_after_close = 0
+        while True:
+            with self._cond:
+                while not self._pending and not self._closing:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+                closing = self._closing
+
+            if not closing and backoff == 0.0:
+                time.sleep(self.flush_interval) # Let a burst of changes coalesce
+
+            with self._cond:
+                batch = self._pending[:self.max_batch]
+
+            try:
+                self._flush(batch)
+                backoff = 0.0
+            except Exception as e:
+                self.failures += 1
+                backoff = min(max(backoff * 2, 0.5), self.max_backoff)
+                print(f"Error updating Supabase: {e} (retrying in {backoff:.1f}s, {self.queue_depth()} queued)")
+                if 'on conflict' in str(e).lower():
+                    print("The cloud `slots` table needs a unique (wing_id, slot_id) constraint; "
+                          "see backend/storage.py")
+                if closing:
+                    attempts_after_close += 1
+                    if attempts_after_close >= 3:
+                        return  # Still journalled; picked up on the next start
+                time.sleep(backoff)
+
+    def _flush(self, batch):
+        t0 = time.perf_counter()
+        transactions, settled = coalesce(batch)
+
+        # Leading vacates whose entry time only the cloud knows (events from
+        # before the detector kept entry times locally): one bulk read
+        lookup = [t['slot_id'] for t in transactions if t['entry_time'] is None]
+        if lookup:
+            response = self._call('slots', 'select', self.client.table('slots').select('slot_id,start_time')
+                                  .in_('slot_id', lookup))
+            start_times = {r['slot_id']: r.get('start_time') for r in response.data}
+            for t in transactions:
+                if t['entry_time'] is None:
+                    t['entry_time'] = start_times.get(t['slot_id'])
+            transactions = [t for t in transactions if t['entry_time']]
+
+        # 1. Log all 'Park and Run' transactions of the batch in one insert.
+        # A vacate is two writes per flush, not one RPC: this repo doesn't manage the
+        # Supabase schema (no functions or migrations to deploy one with), and the
+        # queue is trimmed to the settled slot states once the insert lands, so a
+        # failure between the two only retries the idempotent upsert below.
+        if transactions:
+            self._call('transactions', 'insert', self.client.table('transactions').insert(transactions))
+
+        # The transactions are in; from here on the batch is just final slot states
+        self._replace(len(batch), settled)
+
+        # 2. Write the final state of every touched slot in one upsert
+        # (updated_at lets the dashboard fetch only rows changed since its last sync).
+        # Unlike the old per-slot update there is no status = 'Vacant' guard on an
+        # occupy: each wing has a single detector, its FSM only emits Occupied from
+        # Vacant, and `at` is the entry time it keeps locally and logs the
+        # transaction with, so the cloud start_time has to match it. A replayed
+        # event carries the same `at` and rewrites the same value.
+        updated_at = datetime.now(timezone.utc).isoformat()
+        rows = [{'wing_id': e['wing_id'], 'slot_id': e['slot_id'], 'status': e['status'],
+                 'start_time': e['at'] if e['status'] == 'Occupied' else None,
+                 'updated_at': updated_at} for e in settled]
+        self._call('slots', 'upsert', self.client.table('slots').upsert(rows, on_conflict=SLOT_KEY))
+        self._replace(len(settled), [])
+
+        self.flushes += 1
+        self.events_written += len(batch)
+        self.events_by_wing.update(e['wing_id'] for e in batch)
+        self.last_flush_ms = (time.perf_counter() - t0) * 1000
+        self.total_flush_ms += self.last_flush_ms
+        print(f"☁️ Cloud Update: {len(rows)} slots, {len(transactions)} transactions "
+              f"in {self.last_flush_ms:.0f} ms ({self.queue_depth()} queued)")
+
+    def _call(self, table, op, query):
+        """Execute one database call, counting it (and its failure) per table and operation."""
+        self.calls[table, op] += 1
+        try:
+            return query.execute()
+        except Exception:
+            self.errors[table, op] += 1
+            raise
+
+    def _replace(self, n, events):
+        """Swap the first n pending events for `events` and rewrite the journal."""
+        with self._cond:
+            self._pending[:n] = events
+            if self.journal_path:
+                tmp = self.journal_path + ".tmp"
+                with open(tmp, 'w') as f:
+                    f.writelines(json.dumps(e) + "\n" for e in self._pending)
+                os.replace(tmp, self.journal_path)
+
+
+def coalesce(events):
+    """Collapse a run of slot events into transactions plus one settled event per slot.
+
+    Every Occupied -> Vacant pair becomes a transaction. A Vacant with no
+    Occupied before it in the batch uses the entry_time the detector sent
+    with it, or None (to be looked up) if it did not send one.
+    The settled events carry only the final status of each slot and are
+    marked so that replaying them never logs a transaction twice.
+    """
+    transactions = []
+    final = {}
+    for e in events:
+        key = (e['wing_id'], e['slot_id'])
+        current = final.get(key)
+        if e['status'] == 'Vacant' and not e.get('settled'):
+            if current is None:
+                entry_time = e.get('entry_time')
+            elif current['status'] == 'Occupied':
+                entry_time = current['at']
+            else:
+                entry_time = False  # Already vacant: nothing to log
+            if entry_time is not False:
+                transactions.append({
+                    'wing_id': e['wing_id'],
+                    'slot_id': e['slot_id'],
+                    'entry_time': entry_time,
+                    'exit_time': e['at'],
+                    'payment_status': 'Unpaid'
+                })
+        # Drop the key first so the settled order follows the latest change
+        final.pop(key, None)
+        final[key] = dict(e, settled=True)
+    return transactions, list(final.values())
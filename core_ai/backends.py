@@ -0,0 +1,191 @@
+import hashlib
+import os
+import shutil
+import subprocess
+import sys
+
+import cv2
+import numpy as np
+
+from layout import HEIGHT, WIDTH
+
+# ==========================================
+# INFERENCE BACKENDS
+# ==========================================
+# Every backend is called with a list of resized BGR frames and returns one
+# (n, 6) float32 array per frame: xmin, ymin, xmax, ymax, conf, cls in frame
+# pixels - the same rows as results.xyxy[i] from the torch hub model.
+# `size` is AutoShape's target for the longest side (torch only; an ONNX
+# session has the fixed input shape it was exported at, see `shape`).
+#
+#   torch  torch.hub.load(yolo_repo, 'custom', ...) (the original path)
+#   onnx   ONNX Runtime on CPU with a cached export of best.pt (optionally INT8)
+
+CONF_THRES = 0.2     # model.conf in the original detector
+IOU_THRES = 0.45     # yolov5 AutoShape default
+MAX_DET = 1000
+STRIDE = 32
+
+
+def inference_shape(width=WIDTH, height=HEIGHT, size=640):
+    """(h, w) AutoShape letterboxes a width x height frame to: longest side = size, rounded up to the stride."""
+    g = size / max(height, width)
+    return tuple(int(np.ceil(x * g / STRIDE) * STRIDE) for x in (height, width))
+
+
+class TorchBackend:
+    name = 'torch'
+
+    def __init__(self, weights_path, yolo_repo, conf=CONF_THRES, threads=None):
+        import torch
+        if threads:
+            torch.set_num_threads(threads)
+        self.model = torch.hub.load(yolo_repo, 'custom', path=weights_path, source='local')
+        self.model.conf = conf
+
+    def __call__(self, frames, size=640):
+        results = self.model(list(frames), size=size)
+        return [dets.cpu().numpy() for dets in results.xyxy]
+
+
+class OnnxBackend:
+    name = 'onnx'
+
+    def __init__(self, onnx_path, conf=CONF_THRES, iou=IOU_THRES, threads=None):
+        import onnxruntime as ort
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(onnx_path, options, providers=['CPUExecutionProvider'])
+        self.input_name = self.session.get_inputs()[0].name
+        self.input_shape = tuple(self.session.get_inputs()[0].shape[2:4])  # (h, w)
+        self.conf, self.iou = conf, iou
+
+    def __call__(self, frames, size=None):
+        detections = []
+        for frame in frames:
+            blob, gain, pad = letterbox(frame, self.input_shape)
+            pred = self.session.run(None, {self.input_name: blob})[0][0]
+            dets = non_max_suppression(pred, self.conf, self.iou)
+            detections.append(scale_boxes(dets, gain, pad, frame.shape[:2]))
+        return detections
+
+
+def letterbox(frame, shape, color=114):
+    """Resize keeping aspect ratio and pad to `shape` (h, w), as AutoShape does.
+
+    Channel order is passed through untouched: the torch path also receives
+    the BGR frame as-is, and parity with it is what matters here.
+    """
+    h, w = frame.shape[:2]
+    gain = min(shape[0] / h, shape[1] / w)
+    new_w, new_h = int(round(w * gain)), int(round(h * gain))
+    pad_w, pad_h = (shape[1] - new_w) / 2, (shape[0] - new_h) / 2
+
+    resized = cv2.resize(frame, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    top, bottom = int(round(pad_h - 0.1)), int(round(pad_h + 0.1))
+    left, right = int(round(pad_w - 0.1)), int(round(pad_w + 0.1))
+    padded = cv2.copyMakeBorder(resized, top, bottom, left, right, cv2.BORDER_CONSTANT, value=(color,) * 3)
+
+    blob = np.ascontiguousarray(padded.transpose(2, 0, 1)[None], dtype=np.float32) / 255.0
+    return blob, gain, (left, top)
+
+
+def non_max_suppression(pred, conf_thres=CONF_THRES, iou_thres=IOU_THRES, max_det=MAX_DET):
+    """NumPy port of yolov5 non_max_suppression (single image, class-aware, best class per box)."""
+    pred = pred[pred[:, 4] > conf_thres]
+    if not len(pred):
+        return np.zeros((0, 6), np.float32)
+
+    scores = pred[:, 5:] * pred[:, 4:5]
+    cls = scores.argmax(1)
+    conf = scores[np.arange(len(scores)), cls]
+    keep = conf > conf_thres
+    pred, cls, conf = pred[keep], cls[keep], conf[keep]
+    if not len(pred):
+        return np.zeros((0, 6), np.float32)
+
+    xy, wh = pred[:, 0:2], pred[:, 2:4] / 2
+    boxes = np.concatenate([xy - wh, xy + wh], axis=1)
+
+    # Offset boxes by class so different classes never suppress each other
+    offset = boxes + cls[:, None] * 7680.0
+    order = conf.argsort()[::-1]
+    areas = (offset[:, 2] - offset[:, 0]) * (offset[:, 3] - offset[:, 1])
+    kept = []
+    while len(order) and len(kept) < max_det:
+        i = order[0]
+        kept.append(i)
+        rest = order[1:]
+        x1 = np.maximum(offset[i, 0], offset[rest, 0])
+        y1 = np.maximum(offset[i, 1], offset[rest, 1])
+        x2 = np.minimum(offset[i, 2], offset[rest, 2])
+        y2 = np.minimum(offset[i, 3], offset[rest, 3])
+        inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+        iou = inter / (areas[i] + areas[rest] - inter + 1e-9)
+        order = rest[iou <= iou_thres]
+
+    kept = np.array(kept, dtype=np.intp)
+    return np.concatenate([boxes[kept], conf[kept, None], cls[kept, None]], axis=1).astype(np.float32)
+
+
+def scale_boxes(dets, gain, pad, frame_shape):
+    """Map letterboxed boxes back to frame pixels and clip to the frame."""
+    if not len(dets):
+        return dets
+    dets = dets.copy()
+    dets[:, [0, 2]] = ((dets[:, [0, 2]] - pad[0]) / gain).clip(0, frame_shape[1])
+    dets[:, [1, 3]] = ((dets[:, [1, 3]] - pad[1]) / gain).clip(0, frame_shape[0])
+    return dets
+
+
+# ==========================================
+# CACHED EXPORT
+# ==========================================
+def weights_hash(weights_path):
+    h = hashlib.sha256()
+    with open(weights_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()[:16]
+
+
+def export_onnx(weights_path, yolo_repo, int8=False, cache_dir=None, shape=None):
+    """Path of the ONNX export of `weights_path`, exporting (and quantizing) only on a cache miss.
+
+    Exports are keyed by the weights' SHA-256 and the input shape, so
+    replacing best.pt invalidates them automatically.
+    """
+    shape = shape or inference_shape()
+    cache_dir = cache_dir or os.path.join(os.path.dirname(weights_path), 'cache')
+    os.makedirs(cache_dir, exist_ok=True)
+
+    stem = os.path.join(cache_dir, f"{os.path.splitext(os.path.basename(weights_path))[0]}-"
+                                   f"{weights_hash(weights_path)}-{shape[0]}x{shape[1]}")
+    fp32_path, int8_path = stem + '.onnx', stem + '-int8.onnx'
+
+    if not os.path.exists(fp32_path):
+        print(f"Exporting {weights_path} to ONNX ({shape[0]}x{shape[1]})...")
+        subprocess.run([sys.executable, os.path.join(yolo_repo, 'export.py'), '--weights', weights_path,
+                        '--include', 'onnx', '--imgsz', str(shape[0]), str(shape[1]), '--simplify'], check=True)
+        shutil.move(os.path.splitext(weights_path)[0] + '.onnx', fp32_path)
+
+    if not int8:
+        return fp32_path
+
+    if not os.path.exists(int8_path):
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        print("Quantizing ONNX export to INT8...")
+        quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QUInt8)
+    return int8_path
+
+
+def load_backend(name, weights_path='weights/best.pt', yolo_repo='../yolov5', int8=False, conf=CONF_THRES,
+                 threads=None, shape=None):
+    """`shape` (h, w): ONNX input shape to export for, e.g. a SlotRegion's (default: the full frame)."""
+    if name == 'torch':
+        return TorchBackend(weights_path, yolo_repo, conf, threads=threads)
+    if name == 'onnx':
+        return OnnxBackend(export_onnx(weights_path, yolo_repo, int8=int8, shape=shape), conf, threads=threads)
+    raise ValueError(f"Unknown inference backend '{name}' (expected 'torch' or 'onnx')")
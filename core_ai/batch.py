@@ -0,0 +1,216 @@
+import argparse
+import multiprocessing as mp
+import os
+import time
+from datetime import datetime
+
+import cv2
+import numpy as np
+import pandas as pd
+
+from backends import load_backend
+from layout import HEIGHT, WIDTH, load_layout, layout_path
+from slot_fsm import SlotFSM
+from supervisor import available_cores
+from wing_stream import FRAMES_TO_OCCUPY, FRAMES_TO_VACATE, INFER_EVERY, RUNTIME_DIR
+
+# ==========================================
+# OFFLINE BATCH MODE (recorded footage, no cloud writes)
+# ==========================================
+# Usage (from core_ai/):
+#   python batch.py --wings W1 W5 --workers 4
+#   python batch.py --wings W1 --workers 1 2 4          # scaling table
+#   python batch.py --wings W1 --out ../runtime/W1.parquet --recorded-at "2026-03-02 08:00:00"
+#
+# Each video is played once, start to end; it does not loop like the live
+# grabber. It is split into chunks of --chunk-seconds, and a process pool runs
+# the model on the due frames (every INFER_EVERY source frames, same as live).
+# Workers return only raw per-slot occupancy. The parent then runs the slot
+# FSM over the chunks in order, so the counters carry across chunk
+# boundaries. The timeline is therefore identical to a single sequential
+# pass, whatever the chunking or worker count.
+
+_model = None
+_masks = {}
+
+
+def plan_chunks(total_frames, chunk_frames):
+    """[start, end) frame ranges; starts are aligned so every chunk sees the same due frames as a full pass."""
+    chunk_frames = max(INFER_EVERY, chunk_frames - chunk_frames % INFER_EVERY)
+    return [(start, min(start + chunk_frames, total_frames)) for start in range(0, total_frames, chunk_frames)]
+
+
+def _init_worker(backend, int8, threads):
+    global _model
+    cv2.setNumThreads(1)
+    _model = load_backend(backend, int8=int8, threads=threads)
+
+
+def _slot_mask(wing_id):
+    if wing_id not in _masks:
+        _masks[wing_id] = load_layout(layout_path(wing_id), wing_id).get_slot_mask()
+    return _masks[wing_id]
+
+
+def _run_chunk(task):
+    """Occupancy observations for the due frames of one chunk: (frame indices, bool[k, slots])."""
+    wing_id, video_path, start, end, batch = task
+    slot_mask = _slot_mask(wing_id)
+    cap = cv2.VideoCapture(video_path)
+    cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+
+    indices, frames, occupancy = [], [], []
+
+    def flush():
+        for dets in _model(frames):
+            occupancy.append(slot_mask.occupancy(dets))
+        frames.clear()
+
+    for index in range(start, end):
+        if index % INFER_EVERY:
+            if not cap.grab():
+                break
+            continue
+        success, frame = cap.read()
+        if not success:
+            break
+        indices.append(index)
+        frames.append(cv2.resize(frame, (WIDTH, HEIGHT)))
+        if len(frames) >= batch:
+            flush()
+    if frames:
+        flush()
+    cap.release()
+    return wing_id, start, np.array(indices, np.int64), np.array(occupancy, bool).reshape(-1, slot_mask.num_slots)
+
+
+def stitch(num_slots, observations):
+    """Run the FSM over chunk observations in frame order. Returns (frame, slot, occupied) changes."""
+    fsm = SlotFSM(num_slots, FRAMES_TO_OCCUPY, FRAMES_TO_VACATE)
+    changes = []
+    for indices, occupancy in observations:
+        for index, occupied in zip(indices, occupancy):
+            for i in fsm.update(occupied):
+                changes.append((int(index), int(i), bool(fsm.occupied[i])))
+    return changes
+
+
+def timeline(wing_id, num_slots, changes, total_frames, fps, recorded_at=None):
+    """One row per (slot, status) interval, covering the whole video for every slot."""
+    rows = []
+    status_start = [0] * num_slots
+    occupied = [False] * num_slots
+
+    def close(i, end):
+        rows.append((wing_id, f"{wing_id}-{i+1:02d}", "Occupied" if occupied[i] else "Vacant",
+                     status_start[i], end))
+
+    for frame, i, now_occupied in changes:
+        close(i, frame)
+        status_start[i], occupied[i] = frame, now_occupied
+    for i in range(num_slots):
+        close(i, total_frames)
+
+    df = pd.DataFrame(rows, columns=['wing_id', 'slot_id', 'status', 'start_frame', 'end_frame'])
+    df = df[df['end_frame'] > df['start_frame']].sort_values(['slot_id', 'start_frame'], ignore_index=True)
+    df['start_s'] = (df['start_frame'] / fps).round(3)
+    df['end_s'] = (df['end_frame'] / fps).round(3)
+    df['duration_s'] = df['end_s'] - df['start_s']
+    if recorded_at is not None:
+        df['start_time'] = pd.Timestamp(recorded_at) + pd.to_timedelta(df['start_s'], unit='s')
+        df['end_time'] = pd.Timestamp(recorded_at) + pd.to_timedelta(df['end_s'], unit='s')
+    return df
+
+
+def write_timeline(df, path):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    if path.endswith('.parquet'):
+        df.to_parquet(path, index=False)   # needs pyarrow or fastparquet
+    else:
+        df.to_csv(path, index=False)
+
+
+def video_info(path):
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise SystemExit(f"Cannot open {path}")
+    total, fps = int(cap.get(cv2.CAP_PROP_FRAME_COUNT)), cap.get(cv2.CAP_PROP_FPS) or 30.0
+    cap.release()
+    return total, fps
+
+
+def run(wings, workers, args):
+    """Process every wing's video with `workers` processes. Returns (timelines, stats)."""
+    videos = {w: f'../dataset/{w}.mp4' for w in wings}
+    info = {w: video_info(p) for w, p in videos.items()}
+    tasks = []
+    for w, path in videos.items():
+        total, fps = info[w]
+        tasks += [(w, path, s, e, args.batch) for s, e in plan_chunks(total, int(args.chunk_seconds * fps))]
+
+    threads = args.threads or max(1, available_cores() // workers)
+    t0 = time.perf_counter()
+    results = {w: {} for w in wings}
+    with mp.get_context('spawn').Pool(workers, _init_worker, (args.backend, args.int8, threads)) as pool:
+        for wing_id, start, indices, occupancy in pool.imap_unordered(_run_chunk, tasks):
+            results[wing_id][start] = (indices, occupancy)
+    elapsed = time.perf_counter() - t0
+
+    timelines = {}
+    for w in wings:
+        total, fps = info[w]
+        num_slots = _slot_mask(w).num_slots
+        changes = stitch(num_slots, [results[w][s] for s in sorted(results[w])])
+        timelines[w] = timeline(w, num_slots, changes, total, fps, args.recorded_at)
+
+    video_seconds = sum(total / fps for total, fps in info.values())
+    stats = {
+        'workers': workers,
+        'threads_per_worker': threads,
+        'chunks': len(tasks),
+        'video_s': round(video_seconds, 1),
+        'wall_s': round(elapsed, 2),
+        'x_realtime': round(video_seconds / elapsed, 2),
+    }
+    return timelines, stats
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--wings', nargs='+', default=['W3A', 'W5', 'W1', 'W7', 'W8'])
+    parser.add_argument('--workers', nargs='+', type=int, default=[available_cores()],
+                        help='Worker processes; several values print a scaling table')
+    parser.add_argument('--threads', type=int, default=None,
+                        help='Inference threads per worker (default: cores / workers)')
+    parser.add_argument('--chunk-seconds', type=float, default=60.0, help='Length of one chunk of video')
+    parser.add_argument('--batch', type=int, default=8, help='Frames per model call inside a chunk')
+    parser.add_argument('--backend', choices=['torch', 'onnx'], default=os.environ.get('PARKING_BACKEND', 'torch'))
+    parser.add_argument('--int8', action='store_true', help='ONNX backend: use the INT8-quantized export')
+    parser.add_argument('--out', default=os.path.join(RUNTIME_DIR, 'timeline_{wing}.csv'),
+                        help='Output path per wing; {wing} is substituted, .parquet writes Parquet')
+    parser.add_argument('--recorded-at', type=lambda s: datetime.strptime(s, '%Y-%m-%d %H:%M:%S'),
+                        help='Wall-clock start of the recordings ("YYYY-mm-dd HH:MM:SS"); adds start/end times')
+    args = parser.parse_args()
+
+    runs = []
+    reference = None
+    for workers in args.workers:
+        timelines, stats = run(args.wings, workers, args)
+        if reference is None:
+            reference = timelines
+            for w, df in timelines.items():
+                path = args.out.format(wing=w)
+                write_timeline(df, path)
+                print(f"[{w}] {len(df)} intervals -> {path}")
+        else:
+            # Different chunk assignment, same stitched result
+            stats['identical'] = all(reference[w].equals(timelines[w]) for w in args.wings)
+        runs.append(stats)
+
+    base = runs[0]['wall_s'] * runs[0]['workers']
+    print(f"\n{'workers':>7} {'chunks':>6} {'video s':>8} {'wall s':>7} {'x realtime':>10} {'efficiency':>10}")
+    for r in runs:
+        efficiency = base / (r['wall_s'] * r['workers']) if len(runs) > 1 else 1.0
+        print(f"{r['workers']:>7} {r['chunks']:>6} {r['video_s']:>8.0f} {r['wall_s']:>7.1f} "
+              f"{r['x_realtime']:>9.1f}x {efficiency:>10.0%}"
+              + ('' if r.get('identical', True) else '  (timeline differs!)'))
@@ -0,0 +1,106 @@
+import argparse
+import glob
+import json
+import time
+
+import cv2
+import numpy as np
+
+from backends import load_backend
+from layout import HEIGHT, WIDTH, load_layout, layout_path
+from tracker import iou_matrix
+
+# ==========================================
+# BACKEND BENCHMARK: startup, latency, parity
+# ==========================================
+# Usage (from core_ai/):
+#   python bench_backends.py --wing W1 --frames 200
+#
+# Sample frames come from ../dataset/<wing>.mp4 (or ../dataset/train/*.jpg).
+# Every backend is compared with the torch path on the same frames: boxes are
+# matched at IoU >= 0.5, and per-slot occupancy is compared through the
+# wing's layout.
+
+parser = argparse.ArgumentParser()
+parser.add_argument('--wing', default='W1')
+parser.add_argument('--frames', type=int, default=200, help='Number of sample frames')
+parser.add_argument('--backends', nargs='+', default=['torch', 'onnx', 'onnx-int8'])
+parser.add_argument('--json', help='Also write the results to this file')
+args = parser.parse_args()
+
+
+def sample_frames(wing_id, count):
+    frames = []
+    cap = cv2.VideoCapture(f'../dataset/{wing_id}.mp4')
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) or count
+    for idx in np.linspace(0, max(total - 1, 0), count).astype(int):
+        cap.set(cv2.CAP_PROP_POS_FRAMES, int(idx))
+        success, frame = cap.read()
+        if success:
+            frames.append(cv2.resize(frame, (WIDTH, HEIGHT)))
+    cap.release()
+    if not frames:
+        for path in sorted(glob.glob('../dataset/train/*.jpg'))[:count]:
+            frames.append(cv2.resize(cv2.imread(path), (WIDTH, HEIGHT)))
+    return frames
+
+
+def matched(reference, candidate, thresh=0.5):
+    """How many reference boxes have a candidate box with IoU >= thresh (greedy, one-to-one)."""
+    if not len(reference) or not len(candidate):
+        return 0
+    iou = iou_matrix(reference[:, :4], candidate[:, :4])
+    hits = 0
+    while iou.size and iou.max() >= thresh:
+        i, j = np.unravel_index(iou.argmax(), iou.shape)
+        hits += 1
+        iou[i, :], iou[:, j] = -1, -1
+    return hits
+
+
+frames = sample_frames(args.wing, args.frames)
+if not frames:
+    raise SystemExit(f"No sample frames found for {args.wing}")
+slot_mask = load_layout(layout_path(args.wing), args.wing).get_slot_mask()
+print(f"Benchmarking on {len(frames)} frames of {args.wing} ({WIDTH}x{HEIGHT})")
+
+results, reference = {}, None
+for name in args.backends:
+    backend_name, int8 = name.split('-')[0], name.endswith('-int8')
+
+    t0 = time.perf_counter()
+    backend = load_backend(backend_name, int8=int8)
+    backend([frames[0]]) # First call includes lazy initialisation
+    startup = time.perf_counter() - t0
+
+    latencies, outputs = [], []
+    for frame in frames:
+        t0 = time.perf_counter()
+        outputs.append(backend([frame])[0])
+        latencies.append(time.perf_counter() - t0)
+
+    if reference is None:
+        reference = outputs
+
+    ref_boxes = sum(len(r) for r in reference)
+    hits = sum(matched(r, o) for r, o in zip(reference, outputs))
+    agree = np.mean([(slot_mask.occupancy(r) == slot_mask.occupancy(o)).mean() for r, o in zip(reference, outputs)])
+
+    results[name] = {
+        'startup_s': round(startup, 3),
+        'latency_ms_mean': round(float(np.mean(latencies)) * 1000, 2),
+        'latency_ms_p95': round(float(np.percentile(latencies, 95)) * 1000, 2),
+        'boxes': int(sum(len(o) for o in outputs)),
+        'box_recall_vs_reference': round(hits / ref_boxes, 4) if ref_boxes else 1.0,
+        'slot_agreement_vs_reference': round(float(agree), 4),
+    }
+
+print(f"\n{'backend':<10} {'startup s':>9} {'mean ms':>8} {'p95 ms':>7} {'boxes':>6} {'box recall':>10} {'slot agree':>10}")
+for name, r in results.items():
+    print(f"{name:<10} {r['startup_s']:>9.2f} {r['latency_ms_mean']:>8.1f} {r['latency_ms_p95']:>7.1f} "
+          f"{r['boxes']:>6} {r['box_recall_vs_reference']:>10.3f} {r['slot_agreement_vs_reference']:>10.3f}")
+print(f"(parity columns are relative to '{args.backends[0]}')")
+
+if args.json:
+    with open(args.json, 'w') as f:
+        json.dump({'wing': args.wing, 'frames': len(frames), 'results': results}, f, indent=2)
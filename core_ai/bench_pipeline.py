@@ -0,0 +1,209 @@
+import argparse
+import glob
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH_DIR = os.path.join(ROOT_DIR, 'runtime', 'bench')
+
+# ==========================================
+# PIPELINE BENCHMARK (synthetic lot, fake database)
+# ==========================================
+# Usage (from core_ai/):
+#   python bench_pipeline.py --wings 5 --slots 40 --cars 25 --churn 0.3 --db-latency 0.08 --json ../runtime/bench.json
+#
+# Generates one synthetic video + layout per wing (synthetic.py) and runs the
+# real WingStream -> SlotWriter path on them. ColorBlobDetector stands in for
+# the model (add --infer-ms to mimic its cost). The cloud is a FakeSupabase
+# with --db-latency seconds per call (PARKING_FAKE_DB). Every configuration
+# runs in a fresh process, once with 1 wing and once with --wings wings, so
+# the memory slope per wing can be measured. Reported:
+#   fps                 frames through the loop per second (total and per wing)
+#   detect_to_db_ms     capture of the deciding frame -> slots upsert done
+#   db_calls_per_change database calls per confirmed state change
+#   rss_mb              peak resident memory, and its slope per extra wing
+
+
+def peak_rss_mb():
+    try:
+        import resource
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return rss / 1024 / 1024 if sys.platform == 'darwin' else rss / 1024
+    except ImportError:  # Windows
+        try:
+            import psutil
+            return psutil.Process().memory_info().peak_wset / 1024 / 1024
+        except ImportError:
+            return None
+
+
+def percentile_ms(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(q * len(values)))] * 1000, 2)
+
+
+def run_child(args):
+    """One measurement in this process: `args.child` wings through the live pipeline."""
+    os.environ['PARKING_FAKE_DB'] = str(args.db_latency)
+    sys.path.append(ROOT_DIR)
+    from backend import database
+    from synthetic import ColorBlobDetector
+    from wing_stream import RUNTIME_DIR, WingStream
+
+    wing_ids = [f'S{i + 1}' for i in range(args.child)]
+    for path in [os.path.join(RUNTIME_DIR, 'journal_bench.jsonl')] + \
+            [os.path.join(RUNTIME_DIR, f'entries_{w}.json') for w in wing_ids]:
+        if os.path.exists(path):
+            os.remove(path)
+
+    writer = database.get_writer('bench')
+    fake = database.supabase
+    model = ColorBlobDetector(infer_ms=args.infer_ms)
+
+    streams = {}
+    pending = defaultdict(list)     # slot_id -> [(status, capture time)] not yet in the database
+    latencies, changes = [], 0
+
+    def on_change(wing_id, slot_id, status, at=None, entry_time=None):
+        nonlocal changes
+        changes += 1
+        pending[slot_id].append((status, streams[wing_id].frame_time))
+        database.queue_slot_status(wing_id, slot_id, status, at=at, entry_time=entry_time)
+
+    def on_execute(query, data):
+        if query.table_name == 'slots' and query.op == 'upsert':
+            now = time.perf_counter()
+            for row in query.payload:
+                # Earlier changes of the same slot were coalesced into this row
+                latencies.extend(now - t for status, t in pending.pop(row['slot_id'], []) if status == row['status'])
+
+    fake.on_execute = on_execute
+
+    for w in wing_ids:
+        video = next(p for p in glob.glob(os.path.join(BENCH_DIR, f'{w}.*')) if not p.endswith('.npz'))
+        streams[w] = WingStream(w, video, os.path.join(BENCH_DIR, f'{w}.npz'), on_change=on_change,
+                                display=False, motion_gate=args.motion_gate, pace=args.pace, checkpoint_every=0)
+
+    t_start = time.perf_counter()
+    while time.perf_counter() - t_start < args.run_seconds:
+        frames = {}
+        for s in streams.values():
+            frame = s.read(timeout=0.1)
+            if frame is not None:
+                frames[s.wing_id] = frame
+        due = [s for s in streams.values()
+               if s.wing_id in frames and s.should_infer() and s.needs_model(frames[s.wing_id])]
+        if due:
+            for s, dets in zip(due, model([frames[s.wing_id] for s in due])):
+                s.process(dets)
+        for w in frames:
+            streams[w].frame_done()
+    elapsed = time.perf_counter() - t_start
+
+    for s in streams.values():
+        s.release()
+    writer.close()
+
+    frames = {w: s.frames.value for w, s in streams.items()}
+    db_calls = sum(fake.calls.values())
+    rss = peak_rss_mb()
+    return {
+        'wings': len(wing_ids),
+        'run_s': round(elapsed, 2),
+        'fps_total': round(sum(frames.values()) / elapsed, 1),
+        'fps_per_wing': {w: round(n / elapsed, 1) for w, n in frames.items()},
+        'inferences': sum(s.inferences.value for s in streams.values()),
+        'state_changes': changes,
+        'db_calls': db_calls,
+        'db_calls_by_op': {f'{t}.{op}': n for (t, op), n in sorted(fake.calls.items())},
+        'db_calls_per_change': round(db_calls / changes, 3) if changes else None,
+        'detect_to_db_ms': {'count': len(latencies), 'p50': percentile_ms(latencies, 0.5),
+                            'p95': percentile_ms(latencies, 0.95), 'max': percentile_ms(latencies, 1.0)},
+        'rss_mb': round(rss, 1) if rss is not None else None,
+    }
+
+
+def generate(args):
+    from synthetic import SyntheticLot
+    for i in range(args.wings):
+        lot = SyntheticLot(args.slots, args.cars, args.churn, fps=args.fps, seed=args.seed + i)
+        for old in glob.glob(os.path.join(BENCH_DIR, f'S{i + 1}.*')):
+            os.remove(old)
+        path, truth = lot.write(BENCH_DIR, f'S{i + 1}', args.video_seconds)
+        print(f"[bench] {path}: {args.slots} slots, {len(truth)} changes in {args.video_seconds:.0f}s")
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_DIR,
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--wings', type=int, default=5)
+    parser.add_argument('--slots', type=int, default=40, help='Slots per wing')
+    parser.add_argument('--cars', type=int, default=25, help='Parked cars per wing (on average)')
+    parser.add_argument('--churn', type=float, default=0.3, help='Fraction of slots changing state per minute')
+    parser.add_argument('--fps', type=float, default=30.0, help='Frame rate of the synthetic video')
+    parser.add_argument('--video-seconds', type=float, default=120.0, help='Length of each synthetic video')
+    parser.add_argument('--run-seconds', type=float, default=20.0, help='How long each configuration runs')
+    parser.add_argument('--pace', action='store_true', help='Play at the video frame rate instead of flat out')
+    parser.add_argument('--db-latency', type=float, default=0.08, help='Fake database seconds per call')
+    parser.add_argument('--infer-ms', type=float, default=0.0, help='Simulated model cost per frame')
+    parser.add_argument('--motion-gate', action='store_true')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help='Write the results to this file')
+    parser.add_argument('--child', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print("BENCH_RESULT " + json.dumps(run_child(args)))
+        sys.exit(0)
+
+    generate(args)
+    results = []
+    for wings in sorted({1, args.wings}):
+        cmd = [sys.executable, os.path.abspath(__file__), *sys.argv[1:], '--child', str(wings)]
+        out = subprocess.run(cmd, capture_output=True, text=True)
+        line = next((l for l in out.stdout.splitlines() if l.startswith('BENCH_RESULT ')), None)
+        if line is None:
+            raise SystemExit(f"Benchmark run with {wings} wings failed:\n{out.stderr[-2000:]}")
+        results.append(json.loads(line[len('BENCH_RESULT '):]))
+
+    per_wing_mb = None
+    if len(results) > 1 and results[0]['rss_mb'] is not None:
+        per_wing_mb = round((results[-1]['rss_mb'] - results[0]['rss_mb']) / (results[-1]['wings'] - 1), 2)
+
+    report = {
+        'commit': git_commit(),
+        'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'platform': platform.platform(),
+        'python': platform.python_version(),
+        'config': {k: v for k, v in vars(args).items() if k not in ('json', 'child')},
+        'results': results,
+        'memory_per_wing_mb': per_wing_mb,
+    }
+
+    print(f"\n{'wings':>5} {'fps':>7} {'fps/wing':>8} {'changes':>7} {'db calls':>8} {'calls/chg':>9} "
+          f"{'p50 ms':>7} {'p95 ms':>7} {'rss MB':>7}")
+    for r in results:
+        lat = r['detect_to_db_ms']
+        print(f"{r['wings']:>5} {r['fps_total']:>7.0f} {r['fps_total'] / r['wings']:>8.0f} {r['state_changes']:>7} "
+              f"{r['db_calls']:>8} {r['db_calls_per_change'] or 0:>9.2f} {lat['p50'] or 0:>7.0f} "
+              f"{lat['p95'] or 0:>7.0f} {r['rss_mb'] or 0:>7.0f}")
+    if per_wing_mb is not None:
+        print(f"Memory per additional wing: {per_wing_mb} MB")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
@@ -0,0 +1,103 @@
+import cv2
+import os
+import threading
+import time
+from collections import deque
+
+
+class FrameGrabber:
+    """Reads a video source in its own thread and keeps only the newest frames.
+
+    Only every `decode_every`-th source frame is decoded; the rest are
+    skipped with cap.grab(), which advances the stream without decoding.
+    Decoded frames go into a bounded buffer; when the consumer falls behind
+    the oldest frames are dropped, so latency stays bounded instead of
+    growing. Video files are paced at their native FPS (like a live camera)
+    and loop at the end.
+    """
+
+    def __init__(self, source, decode_every=1, buffer_size=1, timings=None, pace=None):
+        self.source = source
+        self.cap = cv2.VideoCapture(source)
+        self.is_file = isinstance(source, str) and os.path.isfile(source)
+        self.decode_every = max(1, decode_every)
+        self.timings = timings
+
+        fps = self.cap.get(cv2.CAP_PROP_FPS) or 0
+        pace = self.is_file if pace is None else pace
+        self.frame_interval = 1.0 / fps if pace and fps > 0 else 0.0
+
+        # Counters (read from the consumer side for reporting)
+        self.index = 0
+        self.dropped = 0
+
+        self._buffer = deque(maxlen=max(1, buffer_size))
+        self._cond = threading.Condition()
+        self._running = self.cap.isOpened()
+        self._thread = threading.Thread(target=self._run, name=f"FrameGrabber-{source}", daemon=True)
+        self._thread.start()
+
+    def _record(self, stage, t0):
+        if self.timings is not None:
+            self.timings.add(stage, time.perf_counter() - t0)
+
+    def _run(self):
+        next_due = time.perf_counter()
+        failed_rewinds = 0
+        while self._running:
+            if self.frame_interval:
+                delay = next_due - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                # Don't try to "catch up" after a stall; just keep the pace from now
+                next_due = max(next_due + self.frame_interval, time.perf_counter())
+
+            t0 = time.perf_counter()
+            if not self.cap.grab():
+                if self.is_file and failed_rewinds < 2:
+                    self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0) # Loop video
+                    failed_rewinds += 1
+                    continue
+                break
+            failed_rewinds = 0
+            self.index += 1
+
+            if self.index % self.decode_every:
+                self._record('grab', t0)
+                continue
+
+            success, frame = self.cap.retrieve()
+            self._record('decode', t0)
+            if not success:
+                continue
+
+            with self._cond:
+                if len(self._buffer) == self._buffer.maxlen:
+                    self.dropped += 1
+                self._buffer.append((self.index, time.perf_counter(), frame))
+                self._cond.notify()
+
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+
+    def read(self, timeout=1.0):
+        """Newest buffered (index, capture_time, frame), or None if nothing arrived in time."""
+        with self._cond:
+            self._cond.wait_for(lambda: self._buffer or not self._running, timeout)
+            if not self._buffer:
+                return None
+            item = self._buffer.pop()
+            self.dropped += len(self._buffer)
+            self._buffer.clear()
+            return item
+
+    def is_open(self):
+        with self._cond:
+            return self._running or bool(self._buffer)
+
+    def release(self):
+        with self._cond:
+            self._running = False
+        self._thread.join(timeout=2.0)
+        self.cap.release()
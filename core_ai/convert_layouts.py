@@ -0,0 +1,51 @@
+import argparse
+import glob
+import os
+import pickle
+
+from layout import HEIGHT, WIDTH, Layout, load_layout, save_layout
+
+# ==========================================
+# MIGRATE config/*.pkl -> config/*.npz
+# ==========================================
+# Usage (from core_ai/):
+#   python convert_layouts.py                      # every config/*.pkl
+#   python convert_layouts.py config/W1_v1.pkl     # selected files
+#   python convert_layouts.py config/parking_slots.pkl --width 1280 --height 720
+#
+# The wing ID is taken from the file name. Files whose points fall outside the
+# given resolution are skipped, since they were drawn for some other frame size.
+
+parser = argparse.ArgumentParser()
+parser.add_argument('files', nargs='*', help='Pickle layouts to convert (default: config/*.pkl)')
+parser.add_argument('--width', type=int, default=WIDTH, help='Resolution the polygons were drawn at')
+parser.add_argument('--height', type=int, default=HEIGHT)
+parser.add_argument('--force', action='store_true', help='Overwrite existing .npz files')
+args = parser.parse_args()
+
+files = args.files or sorted(glob.glob(os.path.join('config', '*.pkl')))
+
+for pkl_path in files:
+    npz_path = os.path.splitext(pkl_path)[0] + '.npz'
+    wing_id = os.path.splitext(os.path.basename(pkl_path))[0]
+
+    if os.path.exists(npz_path) and not args.force:
+        print(f"Skip {pkl_path}: {npz_path} already exists (use --force)")
+        continue
+
+    with open(pkl_path, 'rb') as f:
+        pos_list = pickle.load(f)
+
+    xs = [x for pts in pos_list for x, _ in pts]
+    ys = [y for pts in pos_list for _, y in pts]
+    if xs and (min(xs) < 0 or min(ys) < 0 or max(xs) >= args.width or max(ys) >= args.height):
+        print(f"Skip {pkl_path}: points span {max(xs)}x{max(ys)}, outside {args.width}x{args.height} "
+              f"(pass --width/--height for its real resolution)")
+        continue
+
+    save_layout(npz_path, Layout(wing_id, pos_list, args.width, args.height))
+
+    # Round-trip check before declaring victory
+    layout = load_layout(npz_path, wing_id)
+    assert [list(map(tuple, p)) for p in pos_list] == layout.pos_list, f"{npz_path}: polygons changed"
+    print(f"Converted {pkl_path} -> {npz_path} ({len(layout)} slots, {os.path.getsize(npz_path)} bytes)")
@@ -1,9 +1,6 @@
 import cv2
-import pickle
-import torch
-import numpy as np
-import time
 import argparse
+import signal
 import sys
 import os
 
@@ -11,113 +8,163 @@ ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.append(ROOT_DIR)
 
 try:
-    from backend.database import update_slot_status
+    from backend.database import get_writer, load_slots, queue_slot_status
     print("Successfully connected to Database Module.")
 except ImportError as e:
     print(f"Error: {e}")
     print("CRITICAL: Could not find backend/database.py. System will crash on detection.")
 
+from backends import load_backend
+from event_bus import with_events
+from layout import load_layout, layout_path
+from metrics import start_metrics, watch_writer
+from preview import Preview
+from roi import RoiBackend, SlotRegion
+from supervisor import clear_ready, mark_ready
+from wing_stream import RUNTIME_DIR, WingStream
+
 # 1. ARGUMENT PARSER
 parser = argparse.ArgumentParser()
 parser.add_argument('--wing', type=str, default='W1', help='Wing ID (e.g., W1)')
+parser.add_argument('--headless', action='store_true', default=os.environ.get('PARKING_HEADLESS') == '1',
+                    help='No window and no drawing (also set by PARKING_HEADLESS=1)')
+parser.add_argument('--preview', action='store_true',
+                    help='Headless only: write an annotated JPEG to runtime/preview_<wing>.jpg when requested')
+parser.add_argument('--preview-fps', type=float, default=1.0, help='Max preview frames per second')
+parser.add_argument('--backend', choices=['torch', 'onnx'], default=os.environ.get('PARKING_BACKEND', 'torch'),
+                    help='Inference backend (also set by PARKING_BACKEND)')
+parser.add_argument('--motion-gate', action='store_true',
+                    help='Only run the model when the slot regions change (or every --max-staleness s)')
+parser.add_argument('--max-staleness', type=float, default=10.0, help='Motion gate: max seconds between inferences')
+parser.add_argument('--int8', action='store_true', help='ONNX backend: use the INT8-quantized export')
+parser.add_argument('--keyframe-every', type=int, default=0,
+                    help='Detect-then-track: run the model every N source frames and track boxes in between')
+parser.add_argument('--roi', action='store_true',
+                    help='Run the model only on the slot-covered part of the frame (see roi.py)')
+parser.add_argument('--roi-tiles', type=int, default=1, help='ROI: split the region into N overlapping tiles')
+parser.add_argument('--roi-zoom', type=float, default=1.0,
+                    help='ROI: model resolution relative to full-frame inference (e.g. 1.5 with --roi-tiles 2)')
+parser.add_argument('--roi-margin', type=int, default=24, help='ROI: pixels added around the slot boxes')
+parser.add_argument('--metrics-port', type=int, default=int(os.environ.get('PARKING_METRICS_PORT', 0)),
+                    help='Serve Prometheus metrics on 127.0.0.1:<port>/metrics (0 = off)')
+parser.add_argument('--metrics-json-every', type=float, default=10.0,
+                    help='Also dump metrics to runtime/metrics_<name>.json every N seconds (0 = off)')
+parser.add_argument('--event-port', type=int, default=int(os.environ.get('PARKING_EVENT_PORT', 0)),
+                    help="Publish slot changes to manager.py's event bus on this port (0 = off)")
 args = parser.parse_args()
 W_ID = args.wing
 
 # 2. CONFIGURATION
-WIDTH, HEIGHT = 240, 386 
 weights_path = 'weights/best.pt'
 yolo_repo = '../yolov5'
-video_source = f'../dataset/{W_ID}.mp4'   
-pickle_path = f'config/{W_ID}.pkl'        
-
-# FSM Settings (Stability & Security)
-FRAMES_TO_OCCUPY = 5
-FRAMES_TO_VACATE = 30  # Increased for higher security against flickering
+video_source = f'../dataset/{W_ID}.mp4'
+slots_path = layout_path(W_ID)   # config/<wing>.npz (or legacy .pkl)
 
 # 3. LOAD MODEL & DATA
-print(f"[{W_ID}] Loading YOLOv5n Model...")
-model = torch.hub.load(yolo_repo, 'custom', path=weights_path, source='local')
-model.conf = 0.2
+print(f"[{W_ID}] Loading YOLOv5n Model ({args.backend}{' int8' if args.int8 else ''})...")
+region = None
+if args.roi:
+    # Crop to the slots once; ONNX is exported at the tile shape
+    region = SlotRegion.from_layout(load_layout(slots_path, W_ID), margin=args.roi_margin,
+                                    tiles=args.roi_tiles, zoom=args.roi_zoom)
+    print(f"[{W_ID}] {region.describe()}")
+model = load_backend(args.backend, weights_path, yolo_repo, int8=args.int8,
+                     shape=region.shape if region is not None else None)
+if region is not None:
+    model = RoiBackend(model, region)
+
+# Background cloud writer: the loop never waits on the network
+writer = get_writer(W_ID)
+watch_writer(writer, W_ID)
+on_change = with_events(queue_slot_status, args.event_port)   # Database write + live push to the dashboard
+stream = WingStream(W_ID, video_source, slots_path, on_change=on_change, display=not args.headless,
+                    motion_gate=args.motion_gate, max_staleness=args.max_staleness,
+                    keyframe_every=args.keyframe_every)
+
+# Warm restart: line the database up with the restored FSM state (one read, one batched write)
+try:
+    fixes = stream.reconcile(load_slots([W_ID]), writer.pending_slots())
+    writer.submit_states(fixes)
+    print(f"[{W_ID}] Startup reconcile: {len(fixes)} slot rows corrected")
+except Exception as e:
+    print(f"[{W_ID}] Startup reconcile skipped, could not read the slots table: {e}")
+
+preview = None
+if args.headless and args.preview:
+    preview = Preview(os.path.join(RUNTIME_DIR, f'preview_{W_ID}.jpg'), max_fps=args.preview_fps)
+    print(f"[{W_ID}] Preview on demand: touch {preview.want_path}")
 
-print(f"[{W_ID}] Loading Slot Config: {pickle_path}")
-with open(pickle_path, 'rb') as f:
-    pos_list = pickle.load(f)
+start_metrics(W_ID, args.metrics_port, args.metrics_json_every)
 
-# Track state for each slot
-# status: Current confirmed state
-# count: FSM counter for transition
-slot_states = [{"count": 0, "status": "Vacant"} for _ in range(len(pos_list))]
+# Tell the supervisor we're up; SIGTERM from it takes the same clean exit as Ctrl+C
+mark_ready(W_ID)
 
-cap = cv2.VideoCapture(video_source)
-frame_counter = 0
+def _on_sigterm(signum, frame):
+    raise KeyboardInterrupt
 
-print(f"[{W_ID}] Detection Started. Press 'Q' in the video window to stop.")
+signal.signal(signal.SIGTERM, _on_sigterm)
+
+if args.headless:
+    print(f"[{W_ID}] Detection Started (headless). Press Ctrl+C to stop.")
+else:
+    print(f"[{W_ID}] Detection Started. Press 'Q' in the video window to stop.")
 
 # ==========================================
 # 4. MAIN LOOP
 # ==========================================
-while cap.isOpened():
-    success, frame = cap.read()
-    if not success:
-        cap.set(cv2.CAP_PROP_POS_FRAMES, 0) # Loop video
-        continue
-
-    frame_counter += 1
-    frame_resized = cv2.resize(frame, (WIDTH, HEIGHT))
-    
-    # Run AI Inference every 3rd frame to save CPU
-    if frame_counter % 3 == 0:
-        results = model(frame_resized)
-        detections = results.xyxy[0].cpu().numpy()
-
-        for i, pts in enumerate(pos_list):
-            is_occupied_now = False
-            for det in detections:
-                xmin, ymin, xmax, ymax, conf, cls = det
-                # Calculate center of the detected car
-                cx, cy = int((xmin + xmax) / 2), int((ymin + ymax) / 2)
-                
-                # Check if car center is inside the specific ROI polygon
-                if cv2.pointPolygonTest(np.array(pts, np.int32), (cx, cy), False) >= 0:
-                    is_occupied_now = True
-                    break
-            
-            # --- FSM LOGIC & DATABASE UPDATE ---
-            state = slot_states[i]
-            old_confirmed_status = state["status"]
-            slot_label = f"{W_ID}-{i+1:02d}"
-
-            if is_occupied_now:
-                state["count"] = min(state["count"] + 1, FRAMES_TO_OCCUPY)
-                if state["count"] >= FRAMES_TO_OCCUPY:
-                    state["status"] = "Occupied"
-            else:
-                state["count"] = max(state["count"] - 1, -FRAMES_TO_VACATE)
-                if state["count"] <= -FRAMES_TO_VACATE:
-                    state["status"] = "Vacant"
-
-            # Check if status has officially changed
-            if old_confirmed_status != state["status"]:
-                print(f"[{W_ID}] Slot {slot_label} changed to {state['status']}")
-                # Update Database (Phase 8)
-                update_slot_status(W_ID, slot_label, state['status'])
-
-    # --- DRAWING (UI) ---
-    # --- DRAWING (UI) ---
-    for i, pts in enumerate(pos_list):
-        # Red if Occupied, Green if Vacant
-        color = (0, 0, 255) if slot_states[i]["status"] == "Occupied" else (0, 255, 0)
-        cv2.polylines(frame_resized, [np.array(pts, np.int32)], True, color, 2)
-        
-        # Draw Slot ID
-        cv2.putText(frame_resized, f"{i+1}", (int(pts[0][0]), int(pts[0][1])-5), 
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.4, color, 1)
-
-    # THESE ARE THE LINES THAT MAKE THE WINDOW POP UP!
-    cv2.imshow(f"Monitoring - {W_ID}", frame_resized)
-    
-    if cv2.waitKey(1) & 0xFF == ord('q'):
-        break
-
-cap.release()
-cv2.destroyAllWindows() 
\ No newline at end of file
+def run_headless():
+    while stream.is_open():
+        frame_resized = stream.read()
+        if frame_resized is None:
+            continue
+
+        if stream.should_infer() and stream.needs_model(frame_resized):
+            with stream.timings.stage('infer'):
+                detections = model([frame_resized])[0]
+            stream.process(detections)
+
+        # Only draw when someone asked for a preview, and at most preview_fps
+        if preview is not None and preview.wanted():
+            with stream.timings.stage('draw'):
+                preview.write(stream.draw(frame_resized))
+
+        stream.frame_done()
+
+def run_windowed():
+    while stream.is_open():
+        frame_resized = stream.read()
+        if frame_resized is None:
+            continue
+
+        if stream.should_infer() and stream.needs_model(frame_resized):
+            with stream.timings.stage('infer'):
+                detections = model([frame_resized])[0]
+            stream.process(detections)
+
+        # --- DRAWING (UI) ---
+        with stream.timings.stage('draw'):
+            stream.draw(frame_resized)
+
+        # THESE ARE THE LINES THAT MAKE THE WINDOW POP UP!
+        with stream.timings.stage('display'):
+            cv2.imshow(f"Monitoring - {W_ID}", frame_resized)
+            key = cv2.waitKey(1)
+
+        stream.frame_done()
+        if key & 0xFF == ord('q'):
+            break
+
+try:
+    if args.headless:
+        run_headless()
+    else:
+        run_windowed()
+except KeyboardInterrupt:
+    print(f"[{W_ID}] Stopping...")
+
+stream.release()
+stream.checkpoint()
+if not args.headless:
+    cv2.destroyAllWindows()
+writer.close()
+clear_ready(W_ID)
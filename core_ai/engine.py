@@ -0,0 +1,194 @@
+import cv2
+import argparse
+import signal
+import time
+import sys
+import os
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT_DIR)
+
+try:
+    from backend.database import get_writer, load_slots, queue_slot_status
+    print("Successfully connected to Database Module.")
+except ImportError as e:
+    print(f"Error: {e}")
+    print("CRITICAL: Could not find backend/database.py. System will crash on detection.")
+
+from backends import load_backend
+from event_bus import with_events
+from layout import load_layout, layout_path
+from metrics import start_metrics, watch_writer
+from preview import Preview
+from roi import SlotRegion, infer_regions
+from supervisor import clear_ready, mark_ready
+from timings import StageTimer
+from wing_stream import RUNTIME_DIR, WingStream
+
+# ==========================================
+# SINGLE-PROCESS MULTI-STREAM ENGINE
+# ==========================================
+# Loads the model once and runs one batched forward pass per tick for every
+# wing that is due for inference, instead of one detector.py (and one copy of
+# the model) per wing.
+
+# 1. ARGUMENT PARSER
+parser = argparse.ArgumentParser()
+parser.add_argument('--wings', nargs='+', default=["W3A", "W5", "W1", "W7", "W8"], help='Wing IDs to monitor')
+parser.add_argument('--headless', action='store_true', default=os.environ.get('PARKING_HEADLESS') == '1',
+                    help='No windows and no drawing (also set by PARKING_HEADLESS=1)')
+parser.add_argument('--preview', action='store_true',
+                    help='Headless only: write annotated JPEGs to runtime/preview_<wing>.jpg when requested')
+parser.add_argument('--preview-fps', type=float, default=1.0, help='Max preview frames per second per wing')
+parser.add_argument('--backend', choices=['torch', 'onnx'], default=os.environ.get('PARKING_BACKEND', 'torch'),
+                    help='Inference backend (also set by PARKING_BACKEND)')
+parser.add_argument('--motion-gate', action='store_true',
+                    help='Only run the model for wings whose slot regions changed (or every --max-staleness s)')
+parser.add_argument('--max-staleness', type=float, default=10.0, help='Motion gate: max seconds between inferences')
+parser.add_argument('--int8', action='store_true', help='ONNX backend: use the INT8-quantized export')
+parser.add_argument('--keyframe-every', type=int, default=0,
+                    help='Detect-then-track: run the model every N source frames and track boxes in between')
+parser.add_argument('--roi', action='store_true',
+                    help="Run the model only on each wing's slot-covered part of the frame (see roi.py)")
+parser.add_argument('--roi-tiles', type=int, default=1, help='ROI: split each region into N overlapping tiles')
+parser.add_argument('--roi-zoom', type=float, default=1.0,
+                    help='ROI: model resolution relative to full-frame inference (e.g. 1.5 with --roi-tiles 2)')
+parser.add_argument('--roi-margin', type=int, default=24, help='ROI: pixels added around the slot boxes')
+parser.add_argument('--metrics-port', type=int, default=int(os.environ.get('PARKING_METRICS_PORT', 0)),
+                    help='Serve Prometheus metrics on 127.0.0.1:<port>/metrics (0 = off)')
+parser.add_argument('--metrics-json-every', type=float, default=10.0,
+                    help='Also dump metrics to runtime/metrics_<name>.json every N seconds (0 = off)')
+parser.add_argument('--event-port', type=int, default=int(os.environ.get('PARKING_EVENT_PORT', 0)),
+                    help="Publish slot changes to manager.py's event bus on this port (0 = off)")
+args = parser.parse_args()
+
+# 2. CONFIGURATION
+weights_path = 'weights/best.pt'
+yolo_repo = '../yolov5'
+
+# 3. LOAD MODEL (ONCE) & WINGS
+print(f"[ENGINE] Loading YOLOv5n Model ({args.backend}) for {len(args.wings)} wings...")
+regions = {}
+if args.roi:
+    # Crop every wing to its slots once (see roi.infer_regions for the batching)
+    roi_args = dict(margin=args.roi_margin, tiles=args.roi_tiles, zoom=args.roi_zoom)
+    layouts = {w_id: load_layout(layout_path(w_id), w_id) for w_id in args.wings}
+    regions = {w_id: SlotRegion.from_layout(layout, **roi_args) for w_id, layout in layouts.items()}
+    if args.backend == 'torch':
+        # One common (largest) size, so every due wing goes into the same batched call
+        size = max(r.size for r in regions.values())
+        regions = {w_id: SlotRegion.from_layout(layout, size=size, **roi_args) for w_id, layout in layouts.items()}
+    for w_id, region in regions.items():
+        print(f"[ENGINE] {w_id}: {region.describe()}")
+if args.roi and args.backend == 'onnx':
+    # An ONNX session has a fixed input shape: one per distinct tile shape
+    models = {shape: load_backend(args.backend, weights_path, yolo_repo, int8=args.int8, shape=shape)
+              for shape in {r.shape for r in regions.values()}}
+else:
+    model = load_backend(args.backend, weights_path, yolo_repo, int8=args.int8)
+    models = {r.shape: model for r in regions.values()}
+
+# Background cloud writer shared by every wing
+writer = get_writer('engine')
+watch_writer(writer, 'engine')
+on_change = with_events(queue_slot_status, args.event_port)   # Database write + live push to the dashboard
+streams = [
+    WingStream(w_id, f'../dataset/{w_id}.mp4', layout_path(w_id), on_change=on_change,
+               display=not args.headless, motion_gate=args.motion_gate, max_staleness=args.max_staleness,
+               keyframe_every=args.keyframe_every)
+    for w_id in args.wings
+]
+
+# Warm restart: every wing's rows in one read, every correction in one batched write
+try:
+    rows = load_slots(args.wings)
+    pending = writer.pending_slots()
+    fixes = [fix for s in streams for fix in s.reconcile([r for r in rows if r['wing_id'] == s.wing_id], pending)]
+    writer.submit_states(fixes)
+    print(f"[ENGINE] Startup reconcile: {len(fixes)} slot rows corrected")
+except Exception as e:
+    print(f"[ENGINE] Startup reconcile skipped, could not read the slots table: {e}")
+
+previews = {}
+if args.headless and args.preview:
+    previews = {s.wing_id: Preview(os.path.join(RUNTIME_DIR, f'preview_{s.wing_id}.jpg'), max_fps=args.preview_fps)
+                for s in streams}
+
+start_metrics('engine', args.metrics_port, args.metrics_json_every)
+
+# Tell the supervisor we're up; SIGTERM from it takes the same clean exit as Ctrl+C
+mark_ready('engine')
+
+def _on_sigterm(signum, frame):
+    raise KeyboardInterrupt
+
+signal.signal(signal.SIGTERM, _on_sigterm)
+
+if args.headless:
+    print("[ENGINE] Detection Started (headless). Press Ctrl+C to stop.")
+else:
+    print("[ENGINE] Detection Started. Press 'Q' in any video window to stop.")
+
+# ==========================================
+# 4. MAIN LOOP
+# ==========================================
+frames_done = 0
+t_start = time.time()
+batch_timings = StageTimer('engine')   # Whole batched forward passes (parking_stage_seconds{wing="engine"})
+
+try:
+    while any(s.is_open() for s in streams):
+        frames = {}
+        for s in streams:
+            frame = s.read(timeout=0.1)
+            if frame is not None:
+                frames[s.wing_id] = frame
+
+        # One batched forward pass for every wing due this tick
+        due = [s for s in streams
+               if s.wing_id in frames and s.should_infer() and s.needs_model(frames[s.wing_id])]
+        if due:
+            t0 = time.perf_counter()
+            if regions:
+                results = infer_regions(models, [frames[s.wing_id] for s in due], [regions[s.wing_id] for s in due])
+            else:
+                results = model([frames[s.wing_id] for s in due])
+            infer_s = time.perf_counter() - t0
+            batch_timings.add('infer', infer_s)
+            for s in due:
+                s.timings.add('infer', infer_s / len(due))   # Each wing's share of the pass
+            for s, dets in zip(due, results):
+                s.process(dets)
+
+        # --- DRAWING (UI) ---
+        for s in streams:
+            if s.wing_id not in frames:
+                continue
+            if not args.headless:
+                with s.timings.stage('draw'):
+                    s.draw(frames[s.wing_id])
+                with s.timings.stage('display'):
+                    cv2.imshow(f"Monitoring - {s.wing_id}", frames[s.wing_id])
+            elif s.wing_id in previews and previews[s.wing_id].wanted():
+                with s.timings.stage('draw'):
+                    previews[s.wing_id].write(s.draw(frames[s.wing_id]))
+            s.frame_done()
+
+        frames_done += len(frames)
+        if frames_done and frames_done % 500 < len(frames):
+            elapsed = time.time() - t_start
+            print(f"[ENGINE] {frames_done / elapsed:.1f} frames/sec across {len(streams)} wings | writer {writer.stats()}")
+        batch_timings.maybe_report()
+
+        if not args.headless and cv2.waitKey(1) & 0xFF == ord('q'):
+            break
+except KeyboardInterrupt:
+    print("[ENGINE] Stopping...")
+
+for s in streams:
+    s.release()
+    s.checkpoint()
+if not args.headless:
+    cv2.destroyAllWindows()
+writer.close()
+clear_ready('engine')
@@ -0,0 +1,44 @@
+import json
+import os
+
+
+class EntryTimes:
+    """Occupancy start time of every Occupied slot of one wing, kept on local disk.
+
+    The detector sets a slot's start time itself when the slot turns
+    Occupied, so on a vacate it can hand the entry time straight to the
+    database writer instead of reading it back from the cloud. The map is
+    rewritten (atomically) on every change so it survives a restart.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        if os.path.exists(path):
+            try:
+                with open(path) as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Warning: could not read {path} ({e}); starting with no entry times")
+
+    def start(self, slot_id, at):
+        self.entries[slot_id] = at
+        self._save()
+
+    def end(self, slot_id):
+        """Forget the slot and return its entry time (None if unknown)."""
+        at = self.entries.pop(slot_id, None)
+        self._save()
+        return at
+
+    def replace(self, entries):
+        """Swap in a whole new map with one write (startup reconcile)."""
+        self.entries = dict(entries)
+        self._save()
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, 'w') as f:
+            json.dump(self.entries, f)
+        os.replace(tmp, self.path)
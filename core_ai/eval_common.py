@@ -0,0 +1,41 @@
+import cv2
+import numpy as np
+
+from layout import HEIGHT, WIDTH
+from slot_fsm import SlotFSM
+from wing_stream import FRAMES_TO_OCCUPY, FRAMES_TO_VACATE, INFER_EVERY
+
+# Shared by the offline evaluations (eval_tracking.py, eval_roi.py): the
+# frames the live loop would run the model on, and the slot states a
+# sequence of detections leads to.
+
+
+def due_frames(wing_id, count):
+    """Consecutive frames at the live inference cadence."""
+    frames = []
+    cap = cv2.VideoCapture(f'../dataset/{wing_id}.mp4')
+    index = 0
+    while len(frames) < count:
+        if index % INFER_EVERY:
+            if not cap.grab():
+                break
+        else:
+            success, frame = cap.read()
+            if not success:
+                break
+            frames.append(cv2.resize(frame, (WIDTH, HEIGHT)))
+        index += 1
+    cap.release()
+    return frames
+
+
+def replay(slot_mask, boxes_per_frame):
+    """Per-frame raw occupancy, FSM states and transition count for a box sequence."""
+    fsm = SlotFSM(slot_mask.num_slots, FRAMES_TO_OCCUPY, FRAMES_TO_VACATE)
+    raw, states, transitions = [], [], 0
+    for boxes in boxes_per_frame:
+        occupied = slot_mask.occupancy(boxes)
+        transitions += len(fsm.update(occupied))
+        raw.append(occupied)
+        states.append(fsm.occupied.copy())
+    return np.array(raw), np.array(states), transitions
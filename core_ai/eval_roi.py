@@ -0,0 +1,94 @@
+import argparse
+import json
+import time
+
+from backends import inference_shape, load_backend
+from eval_common import due_frames, replay
+from layout import HEIGHT, WIDTH, load_layout, layout_path
+from roi import FULL_SIZE, RoiBackend, SlotRegion
+from wing_stream import INFER_EVERY
+
+# ==========================================
+# ROI-CROPPED INFERENCE EVALUATION (offline)
+# ==========================================
+# Usage (from core_ai/):
+#   python eval_roi.py --wings W1 W5 --frames 300 --configs 1x1.0 2x1.0 2x1.5
+#
+# Full-frame inference on the due frames of ../dataset/<wing>.mp4 is the
+# reference. Every config (<tiles>x<zoom>, see roi.SlotRegion) then runs the
+# model on the slot region only, on the same frames. Reported per config:
+#   pixels           model input pixels per frame (all tiles), vs full frame
+#   infer_ms         model + crop/merge time per frame, and the time saved
+#   raw_agreement    per-slot occupancy agreement with full-frame inference
+#   fsm_agreement    agreement of the confirmed (FSM) slot states
+#   transitions      confirmed status changes, ROI vs full frame
+
+parser = argparse.ArgumentParser()
+parser.add_argument('--wings', nargs='+', default=['W3A', 'W5', 'W1', 'W7', 'W8'])
+parser.add_argument('--frames', type=int, default=300, help='Due frames to evaluate per wing')
+parser.add_argument('--configs', nargs='+', default=['1x1.0', '2x1.0', '2x1.5'],
+                    help='ROI configs as <tiles>x<zoom>')
+parser.add_argument('--margin', type=int, default=24, help='Pixels added around the slot boxes')
+parser.add_argument('--backend', choices=['torch', 'onnx'], default='torch')
+parser.add_argument('--json', help='Also write the results to this file')
+args = parser.parse_args()
+
+
+def timed(model, frames):
+    model([frames[0]])  # Warm-up (first call allocates)
+    t0 = time.perf_counter()
+    detections = [model([f])[0] for f in frames]
+    return detections, (time.perf_counter() - t0) / len(frames) * 1000
+
+
+full_shape = inference_shape(WIDTH, HEIGHT, FULL_SIZE)
+full_pixels = full_shape[0] * full_shape[1]
+full_model = load_backend(args.backend)
+configs = [(int(tiles), float(zoom)) for tiles, zoom in (c.split('x') for c in args.configs)]
+
+results = {}
+for wing_id in args.wings:
+    frames = due_frames(wing_id, args.frames)
+    if not frames:
+        print(f"[{wing_id}] no video, skipped")
+        continue
+    layout = load_layout(layout_path(wing_id), wing_id)
+    slot_mask = layout.get_slot_mask()
+
+    full, full_ms = timed(full_model, frames)
+    ref_raw, ref_states, ref_transitions = replay(slot_mask, full)
+
+    wing_results = {'due_frames': len(frames), 'full_pixels': full_pixels, 'full_ms': round(full_ms, 2),
+                    'full_transitions': ref_transitions, 'configs': {}}
+    for tiles, zoom in configs:
+        region = SlotRegion.from_layout(layout, margin=args.margin, tiles=tiles, zoom=zoom)
+        # The ONNX session's input shape is fixed at export, so each tile shape gets its own
+        base = full_model if args.backend == 'torch' else load_backend(args.backend, shape=region.shape)
+        detections, roi_ms = timed(RoiBackend(base, region), frames)
+        raw, states, transitions = replay(slot_mask, detections)
+
+        wing_results['configs'][f"{tiles}x{zoom}"] = {
+            'region': list(region.box),
+            'pixels': region.model_pixels(),
+            'infer_ms': round(roi_ms, 2),
+            'saved_ms': round(full_ms - roi_ms, 2),
+            'raw_agreement': round(float((raw == ref_raw).mean()), 4),
+            'fsm_agreement': round(float((states == ref_states).mean()), 4),
+            'transitions': transitions,
+        }
+    results[wing_id] = wing_results
+
+print(f"\n{'wing':<5} {'config':>6} {'pixels':>14} {'infer ms':>8} {'saved':>13} "
+      f"{'raw agree':>9} {'fsm agree':>9} {'changes':>11}")
+for wing_id, r in results.items():
+    for name, c in r['configs'].items():
+        print(f"{wing_id:<5} {name:>6} {c['pixels']:>7,} ({c['pixels'] / r['full_pixels']:>4.0%}) "
+              f"{c['infer_ms']:>8.1f} {c['saved_ms']:>6.1f} ({c['saved_ms'] / r['full_ms']:>4.0%}) "
+              f"{c['raw_agreement']:>9.3f} {c['fsm_agreement']:>9.3f} "
+              f"{c['transitions']:>4} vs {r['full_transitions']:<4}")
+    print(f"{'':<5} (full frame: {r['full_pixels']:,} pixels, {r['full_ms']:.1f} ms per due frame)")
+
+if args.json:
+    with open(args.json, 'w') as f:
+        json.dump({'frames': args.frames, 'infer_every': INFER_EVERY, 'margin': args.margin, 'results': results},
+                  f, indent=2)
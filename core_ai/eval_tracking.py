@@ -0,0 +1,81 @@
+import argparse
+import json
+import time
+
+from backends import load_backend
+from eval_common import due_frames, replay
+from layout import load_layout, layout_path
+from tracker import BoxTracker
+from wing_stream import INFER_EVERY
+
+# ==========================================
+# DETECT-THEN-TRACK EVALUATION (offline)
+# ==========================================
+# Usage (from core_ai/):
+#   python eval_tracking.py --wings W1 W5 --frames 600 --keyframes 6 15 30 60
+#
+# The model runs on every due frame (every INFER_EVERY source frames) of
+# ../dataset/<wing>.mp4. That dense run is the reference. Each keyframe
+# interval is then replayed from the same detections: the tracker sees them
+# only on keyframes and predicts boxes on the due frames in between, which
+# is what WingStream does with keyframe_every=N. Reported per interval:
+#   model_calls      fraction of due frames that still run the model
+#   raw_agreement    per-slot occupancy agreement with dense detection
+#   fsm_agreement    agreement of the confirmed (FSM) slot states
+#   transitions      confirmed status changes, dense vs tracked
+#   track_ms         tracker + matching cost per due frame
+
+parser = argparse.ArgumentParser()
+parser.add_argument('--wings', nargs='+', default=['W3A', 'W5', 'W1', 'W7', 'W8'])
+parser.add_argument('--frames', type=int, default=600, help='Due frames to evaluate per wing')
+parser.add_argument('--keyframes', nargs='+', type=int, default=[6, 15, 30, 60],
+                    help='Keyframe intervals in source frames')
+parser.add_argument('--backend', choices=['torch', 'onnx'], default='torch')
+parser.add_argument('--json', help='Also write the results to this file')
+args = parser.parse_args()
+
+
+model = load_backend(args.backend)
+results = {}
+for wing_id in args.wings:
+    frames = due_frames(wing_id, args.frames)
+    if not frames:
+        print(f"[{wing_id}] no video, skipped")
+        continue
+    slot_mask = load_layout(layout_path(wing_id), wing_id).get_slot_mask()
+
+    t0 = time.perf_counter()
+    dense = [model([f])[0] for f in frames]
+    infer_ms = (time.perf_counter() - t0) / len(frames) * 1000
+    ref_raw, ref_states, ref_transitions = replay(slot_mask, dense)
+
+    wing_results = {'due_frames': len(frames), 'infer_ms': round(infer_ms, 2),
+                    'dense_transitions': ref_transitions, 'intervals': {}}
+    for keyframe_every in args.keyframes:
+        step = max(keyframe_every // INFER_EVERY, 1)
+        tracker = BoxTracker()
+        t0 = time.perf_counter()
+        tracked = [tracker.update(d) if i % step == 0 else tracker.predict() for i, d in enumerate(dense)]
+        raw, states, transitions = replay(slot_mask, tracked)
+        track_ms = (time.perf_counter() - t0) / len(frames) * 1000
+
+        wing_results['intervals'][keyframe_every] = {
+            'model_calls': round(1 / step, 3),
+            'raw_agreement': round(float((raw == ref_raw).mean()), 4),
+            'fsm_agreement': round(float((states == ref_states).mean()), 4),
+            'transitions': transitions,
+            'track_ms': round(track_ms, 3),
+        }
+    results[wing_id] = wing_results
+
+print(f"\n{'wing':<5} {'keyframe':>8} {'model':>6} {'raw agree':>9} {'fsm agree':>9} {'changes':>11} {'track ms':>8}")
+for wing_id, r in results.items():
+    for keyframe_every, k in r['intervals'].items():
+        print(f"{wing_id:<5} {keyframe_every:>8} {k['model_calls']:>6.0%} {k['raw_agreement']:>9.3f} "
+              f"{k['fsm_agreement']:>9.3f} {k['transitions']:>4} vs {r['dense_transitions']:<4} "
+              f"{k['track_ms']:>8.2f}")
+    print(f"{'':<5} (dense inference {r['infer_ms']:.1f} ms per due frame)")
+
+if args.json:
+    with open(args.json, 'w') as f:
+        json.dump({'frames': args.frames, 'infer_every': INFER_EVERY, 'results': results}, f, indent=2)
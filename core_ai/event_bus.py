@@ -0,0 +1,261 @@
+import asyncio
+import json
+import os
+import queue
+import socket
+import threading
+import time
+
+# ==========================================
+# LOCAL SLOT-CHANGE EVENT BUS
+# ==========================================
+# manager.py runs an EventBus: a small asyncio relay on 127.0.0.1 (TCP, so
+# it works on Windows too). Detectors connect as publishers and the
+# dashboard as a subscriber. The protocol is newline-delimited JSON after a
+# one-line role greeting ("PUB" or "SUB").
+#
+# The bus is best effort: events are dropped while nobody listens, and slow
+# subscribers are cut off. The database stays the source of truth. A
+# subscriber reloads from it whenever it (re)connects.
+
+HOST = '127.0.0.1'
+DEFAULT_PORT = int(os.environ.get('PARKING_EVENT_PORT', 8765))
+MAX_SUBSCRIBER_BUFFER = 1 << 20   # Bytes queued for one subscriber before it is dropped
+
+
+class EventBus:
+    """Relays every line a publisher sends to every connected subscriber."""
+
+    def __init__(self, host=HOST, port=DEFAULT_PORT):
+        self.host, self.port = host, port
+        self.subscribers = set()
+
+        # Reporting
+        self.published = 0
+        self.delivered = 0
+        self.dropped_subscribers = 0
+
+    async def _handle(self, reader, writer):
+        try:
+            role = (await reader.readline()).strip()
+            if role == b'SUB':
+                self.subscribers.add(writer)
+                await reader.read()     # Wait for the subscriber to go away
+            elif role == b'PUB':
+                while line := await reader.readline():
+                    self.published += 1
+                    self._relay(line)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.subscribers.discard(writer)
+            writer.close()
+
+    def _relay(self, line):
+        for sub in list(self.subscribers):
+            if sub.transport.get_write_buffer_size() > MAX_SUBSCRIBER_BUFFER:
+                # Not reading: cut it off, it will catch up from the database on reconnect
+                self.subscribers.discard(sub)
+                sub.close()
+                self.dropped_subscribers += 1
+                continue
+            sub.write(line)
+            self.delivered += 1
+
+    async def serve(self):
+        server = await asyncio.start_server(self._handle, self.host, self.port)
+        async with server:
+            await server.serve_forever()
+
+    def start(self):
+        """Run the bus on a daemon thread (manager.py's main thread runs the supervisor)."""
+        threading.Thread(target=lambda: asyncio.run(self.serve()), name="EventBus", daemon=True).start()
+        print(f"[EVENTS] Slot-change bus on {self.host}:{self.port}")
+
+
+class Publisher:
+    """Detector side: publish() never blocks; a background thread does the sending.
+
+    Events published while the bus is unreachable are counted and dropped,
+    because the write-behind queue still gets them into the database.
+    """
+
+    def __init__(self, host=HOST, port=DEFAULT_PORT, max_queue=1000, max_backoff=10.0):
+        self.address = (host, port)
+        self.max_backoff = max_backoff
+        self._queue = queue.Queue(max_queue)
+        self.sent = 0
+        self.dropped = 0
+        threading.Thread(target=self._run, name="EventPublisher", daemon=True).start()
+
+    def publish(self, wing_id, slot_id, status, at=None, entry_time=None):
+        """Same signature as queue_slot_status, so it can sit next to it in on_change."""
+        event = {'wing_id': wing_id, 'slot_id': slot_id, 'status': status, 'at': at, 't_pub': time.time()}
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        backoff = 0.0
+        while True:
+            try:
+                with socket.create_connection(self.address, timeout=2.0) as sock:
+                    sock.sendall(b'PUB\n')
+                    backoff = 0.0
+                    while True:
+                        event = self._queue.get()
+                        sock.sendall((json.dumps(event) + "\n").encode())
+                        self.sent += 1
+            except OSError:
+                # Drop what piled up while disconnected; the database has it
+                while not self._queue.empty():
+                    self._queue.get_nowait()
+                    self.dropped += 1
+                backoff = min(max(backoff * 2, 0.5), self.max_backoff)
+                time.sleep(backoff)
+
+
+class Subscriber:
+    """Dashboard side: calls on_event(event) for every slot change.
+
+    on_connect() runs after every (re)connection, before any event is
+    delivered. Use it to resync from the database and pick up whatever was
+    missed while the link was down.
+    """
+
+    def __init__(self, on_event, on_connect=None, host=HOST, port=DEFAULT_PORT, max_backoff=10.0):
+        self.address = (host, port)
+        self.on_event = on_event
+        self.on_connect = on_connect
+        self.max_backoff = max_backoff
+        self.connected = False
+        self.received = 0
+        self.reconnects = 0
+        threading.Thread(target=self._run, name="EventSubscriber", daemon=True).start()
+
+    def _run(self):
+        backoff = 0.0
+        while True:
+            try:
+                with socket.create_connection(self.address, timeout=2.0) as sock:
+                    sock.sendall(b'SUB\n')
+                    sock.settimeout(None)
+                    self.connected = True
+                    self.reconnects += 1
+                    backoff = 0.0
+                    if self.on_connect is not None:
+                        self.on_connect()
+                    for line in sock.makefile('rb'):
+                        self.received += 1
+                        self.on_event(json.loads(line))
+            except (OSError, ValueError):
+                pass
+            self.connected = False
+            backoff = min(max(backoff * 2, 0.5), self.max_backoff)
+            time.sleep(backoff)
+
+
+def with_events(on_change, port):
+    """on_change that also publishes every slot change to the bus (port 0: on_change as is)."""
+    if not port:
+        return on_change
+    publisher = Publisher(port=port)
+
+    def publish_and_queue(wing_id, slot_id, status, at=None, entry_time=None):
+        on_change(wing_id, slot_id, status, at=at, entry_time=entry_time)
+        publisher.publish(wing_id, slot_id, status, at=at)
+
+    return publish_and_queue
+
+
+if __name__ == '__main__':
+    # Polling vs push, end to end on an in-memory database: one wing whose slots
+    # change every 0.2-1 s, a few dashboard sessions reading the shared SlotCache.
+    # Sessions re-read it at the dashboard's cadence: every 3 s when polling, every
+    # second (the live fragments in main.py) when pushed events keep it current.
+    import argparse
+    import random
+    import sys
+    from datetime import datetime, timezone
+
+    import numpy as np
+
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from backend.fake_client import FakeSupabase
+    from slot_cache import SlotCache
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--seconds', type=float, default=30.0, help='Duration of each run')
+    parser.add_argument('--sessions', type=int, default=3, help='Dashboard sessions reading the cache')
+    parser.add_argument('--latency', type=float, default=0.05, help='Simulated database round trip (s)')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT + 1)
+    args = parser.parse_args()
+
+    def stamp():
+        return datetime.now(timezone.utc).isoformat()
+
+    def run(push):
+        slot_ids = [f"W1-{i+1:02d}" for i in range(30)]
+        db = FakeSupabase({'slots': [{'wing_id': 'W1', 'slot_id': s, 'status': 'Vacant', 'start_time': None,
+                                      'updated_at': stamp()} for s in slot_ids]}, latency=args.latency)
+        cache = SlotCache(db, ttl=3.0)
+        subscriber = publisher = None
+        if push:
+            subscriber = Subscriber(cache.apply, cache.invalidate, port=args.port)
+            publisher = Publisher(port=args.port)
+        cache.get()
+        time.sleep(1.0)     # Let both ends connect
+        db.calls.clear()
+        cache.queries = 0
+
+        pending, shown = {}, []         # slot_id -> (t_change, status); latencies
+        stop = threading.Event()
+
+        def detector():
+            rng = random.Random(1)
+            status = dict.fromkeys(slot_ids, 'Vacant')
+            for i in range(10 ** 9):
+                if stop.wait(rng.uniform(0.2, 1.0)):
+                    return
+                slot = slot_ids[i % len(slot_ids)]  # Round robin: a slot flips again only after 30 changes
+                status[slot] = 'Occupied' if status[slot] == 'Vacant' else 'Vacant'
+                pending[slot] = (time.time(), status[slot])
+                if publisher is not None:
+                    publisher.publish('W1', slot, status[slot])
+                # Stands in for the write-behind queue (which doesn't hold up the publish)
+                db.table('slots').update({'status': status[slot], 'updated_at': stamp()}).eq('slot_id', slot).execute()
+
+        def session(k):
+            while not stop.is_set():
+                connected = subscriber is not None and subscriber.connected
+                snapshot = cache.get(ttl=60.0 if connected else None)
+                if k == 0:
+                    now = time.time()
+                    current = dict(zip(snapshot.wings['W1']['slot_id'], snapshot.wings['W1']['status']))
+                    for slot, (t, status) in list(pending.items()):
+                        if current.get(slot) == status:
+                            shown.append(now - t)
+                            del pending[slot]
+                time.sleep(1.0 if connected else 3.0)
+
+        threads = [threading.Thread(target=detector)] + \
+                  [threading.Thread(target=session, args=(k,)) for k in range(args.sessions)]
+        for t in threads:
+            t.start()
+        time.sleep(args.seconds)
+        stop.set()
+        for t in threads:
+            t.join()
+
+        per_min = cache.queries * 60.0 / args.seconds
+        p50, p95 = np.percentile(np.array(shown) * 1000, [50, 95]) if shown else (float('nan'),) * 2
+        print(f"{'push' if push else 'poll':>5}: {len(shown):4d} changes shown, change -> screen p50 {p50:6.0f} ms, "
+              f"p95 {p95:6.0f} ms, {per_min:5.1f} slot queries/min")
+        return per_min
+
+    EventBus(port=args.port).start()
+    print(f"{args.sessions} sessions, {args.seconds:.0f} s per run, {args.latency * 1000:.0f} ms database round trip")
+    polled = run(push=False)
+    pushed = run(push=True)
+    print(f"Polling queries: {polled:.1f}/min -> {pushed:.1f}/min")
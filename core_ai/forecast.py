@@ -0,0 +1,241 @@
+import os
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from backend.billing import parse_times
+
+HOURS_PER_WEEK = 168
+
+# Hours the facility is worth recommending (6 AM - 11 PM)
+OPEN_HOURS = range(6, 23)
+
+
+def hour_of_week(abs_hours):
+    """Monday-00:00-based hour of week for absolute hours since 1970-01-01 00:00 (a Thursday)."""
+    return (np.asarray(abs_hours) + 3 * 24) % HOURS_PER_WEEK
+
+
+class OccupancyForecaster:
+    """Per-wing, per-hour-of-week occupancy profiles built from `transactions`.
+
+    For every wing we keep 168 counters of occupied slot-seconds (one per
+    hour of the week) plus the first and last absolute hour covered by the
+    data. That is all the state there is, so memory does not grow with the
+    size of the table. refresh() pages through only the transactions added
+    since the last cursor, splits each parking session into its
+    hour buckets in one vectorized pass, and adds them in. Predictions and
+    best-time windows are read straight from the profiles.
+
+    The profiles and cursor are saved to `state_path` every `save_every`
+    pages and at the end of a refresh, so a restart (or an interrupted
+    catch-up over a long history) carries on from where it stopped instead
+    of re-reading the whole history. start() runs the refreshes on a
+    background thread so readers never wait for them.
+    """
+
+    def __init__(self, client=None, state_path=None, page_size=1000, save_every=20,
+                 max_session_hours=HOURS_PER_WEEK):
+        self.client = client
+        self.state_path = state_path
+        self.page_size = page_size
+        self.save_every = save_every
+        self.max_session_hours = max_session_hours
+        self._lock = threading.Lock()
+
+        self.seconds = {}            # wing_id -> float64[168] occupied slot-seconds
+        self.first_hour = None       # Absolute hour range the data covers
+        self.last_hour = None
+        self.cursor = 0              # Highest transaction id ingested
+        self.rows_ingested = 0
+        self.caught_up = False       # Last refresh reached the end of the table
+        self._last_refresh = 0.0
+        self._thread = None
+
+        if state_path and os.path.exists(state_path):
+            self._load()
+
+    # ------------------------------------------
+    # Ingest
+    # ------------------------------------------
+    def ingest_frame(self, df):
+        """Add a DataFrame of transactions (wing_id, entry_time, exit_time) to the profiles."""
+        if df.empty:
+            return
+        entry, exit_ = parse_times(df['entry_time']), parse_times(df['exit_time'])
+        ok = entry.notna() & exit_.notna() & (exit_ > entry)
+        if not ok.any():
+            return
+
+        wings = df['wing_id'].to_numpy()[ok.to_numpy()]
+        start = entry[ok].to_numpy().astype('datetime64[s]').astype(np.int64)
+        end = exit_[ok].to_numpy().astype('datetime64[s]').astype(np.int64)
+        end = np.minimum(end, start + self.max_session_hours * 3600)
+
+        # Split every session into hour pieces: one row per (session, hour it touches)
+        first = start // 3600
+        spans = end // 3600 - first + 1
+        session = np.repeat(np.arange(len(start)), spans)
+        offsets = np.arange(len(session)) - np.repeat(np.cumsum(spans) - spans, spans)
+        hours = first[session] + offsets
+        piece = np.minimum(end[session], (hours + 1) * 3600) - np.maximum(start[session], hours * 3600)
+        bins = hour_of_week(hours)
+
+        wing_of_piece = wings[session]
+        for wing in np.unique(wing_of_piece):
+            sel = wing_of_piece == wing
+            profile = self.seconds.setdefault(str(wing), np.zeros(HOURS_PER_WEEK))
+            profile += np.bincount(bins[sel], weights=piece[sel], minlength=HOURS_PER_WEEK)
+
+        lo, hi = int(first.min()), int((end // 3600).max())
+        self.first_hour = lo if self.first_hour is None else min(self.first_hour, lo)
+        self.last_hour = hi if self.last_hour is None else max(self.last_hour, hi)
+        self.rows_ingested += int(ok.sum())
+
+    def refresh(self, ttl=300.0, max_pages=None):
+        """Pull transactions added since the last refresh (at most once per `ttl` seconds).
+
+        Pages by `id`, which the database assigns: a row that arrives late
+        (journal replay, sync lag) with an older exit_time is still picked
+        up. Pages are read until one comes back empty, since the server may
+        return fewer rows than `page_size` (PostgREST caps at 1000), or until
+        `max_pages` pages have been read; `caught_up` tells which.
+        """
+        with self._lock:
+            if self.client is None or time.monotonic() - self._last_refresh < ttl:
+                return 0
+            self._last_refresh = time.monotonic()
+
+            added = pages = 0
+            self.caught_up = False
+            try:
+                while max_pages is None or pages < max_pages:
+                    rows = self.client.table('transactions').select('id,wing_id,entry_time,exit_time') \
+                        .gt('id', self.cursor).order('id').limit(self.page_size).execute().data
+                    if not rows:
+                        self.caught_up = True
+                        break
+                    df = pd.DataFrame(rows)
+                    self.ingest_frame(df)
+                    added += len(df)
+                    self.cursor = int(df['id'].max())
+                    pages += 1
+                    if pages % self.save_every == 0:
+                        self._save()
+            except Exception as e:
+                print(f"Error reading Supabase: {e}")
+
+            if added:
+                self._save()
+            return added
+
+    def start(self, interval=300.0, max_pages=50):
+        """Refresh on a background thread: back to back while catching up, then every `interval` seconds."""
+        if self._thread is not None:
+            return
+        def run():
+            while True:
+                self.refresh(ttl=0, max_pages=max_pages)
+                if self.caught_up:
+                    time.sleep(interval)
+        self._thread = threading.Thread(target=run, name="ForecastRefresh", daemon=True)
+        self._thread.start()
+
+    # ------------------------------------------
+    # Queries (constant time per render)
+    # ------------------------------------------
+    def _occurrences(self):
+        """How many times each hour-of-week bin occurs in the covered hour range."""
+        if self.first_hour is None:
+            return np.zeros(HOURS_PER_WEEK)
+        total = self.last_hour - self.first_hour + 1
+        counts = np.full(HOURS_PER_WEEK, total // HOURS_PER_WEEK, dtype=np.float64)
+        start_bin = int(hour_of_week(self.first_hour))
+        extra = (start_bin + np.arange(total % HOURS_PER_WEEK)) % HOURS_PER_WEEK
+        counts[extra] += 1
+        return counts
+
+    def profile(self, capacity, wing=None):
+        """Expected occupancy rate (0-1) for each of the 168 hours of the week."""
+        if wing is None:
+            seconds = sum(self.seconds.values(), np.zeros(HOURS_PER_WEEK))
+            slots = sum(capacity.values())
+        else:
+            seconds = self.seconds.get(wing, np.zeros(HOURS_PER_WEEK))
+            slots = capacity.get(wing, 0)
+        occurrences = self._occurrences()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rate = seconds / (3600.0 * occurrences * max(slots, 1))
+        return np.clip(np.nan_to_num(rate), 0.0, 1.0)
+
+    def next_hour(self, capacity, wing=None, now=None, current=None):
+        """Forecast occupancy (%) for the next hour.
+
+        Uses the profile value for that hour of the week. If the current
+        occupancy (%) is given, half of today's deviation from the profile
+        is carried forward.
+        """
+        if self.first_hour is None:
+            return None
+        now = now or datetime.now()
+        rate = self.profile(capacity, wing)
+        this_bin = now.weekday() * 24 + now.hour
+        forecast = rate[(this_bin + 1) % HOURS_PER_WEEK] * 100
+        if current is not None:
+            forecast += 0.5 * (current - rate[this_bin] * 100)
+        return int(round(min(100, max(0, forecast))))
+
+    def best_times(self, capacity, wing=None, day=None, window=2, top=2):
+        """The `top` quietest `window`-hour blocks (start_hour, end_hour, rate%) within opening hours."""
+        if self.first_hour is None:
+            return []
+        day = datetime.now().weekday() if day is None else day
+        rate = self.profile(capacity, wing)[day * 24:(day + 1) * 24]
+        starts = [h for h in OPEN_HOURS if h + window <= OPEN_HOURS.stop]
+        means = np.array([rate[h:h + window].mean() for h in starts])
+
+        picked = []
+        for i in np.argsort(means, kind='stable'):
+            h = starts[i]
+            if all(abs(h - p) >= window for p, _, _ in picked):
+                picked.append((h, h + window, int(round(means[i] * 100))))
+            if len(picked) == top:
+                break
+        return sorted(picked)
+
+    # ------------------------------------------
+    # Persistence
+    # ------------------------------------------
+    def _save(self):
+        if not self.state_path:
+            return
+        os.makedirs(os.path.dirname(self.state_path) or '.', exist_ok=True)
+        wings = sorted(self.seconds)
+        tmp = self.state_path + ".tmp.npz"
+        np.savez(tmp,
+                 wings=np.array(wings, dtype=str),
+                 seconds=np.array([self.seconds[w] for w in wings]).reshape(len(wings), HOURS_PER_WEEK),
+                 hours=np.array([self.first_hour, self.last_hour], dtype=np.int64),
+                 cursor=np.array(self.cursor, dtype=np.int64),
+                 rows=np.array(self.rows_ingested, dtype=np.int64))
+        os.replace(tmp, self.state_path)
+
+    def _load(self):
+        try:
+            with np.load(self.state_path, allow_pickle=False) as data:
+                self.seconds = {str(w): data['seconds'][i].copy() for i, w in enumerate(data['wings'])}
+                self.first_hour, self.last_hour = (int(h) for h in data['hours'])
+                self.cursor = int(data['cursor']) # State from the old exit_time cursor fails here: rebuilt
+                self.rows_ingested = int(data['rows'])
+        except (OSError, KeyError, ValueError) as e:
+            print(f"Warning: could not load forecast state {self.state_path} ({e}); rebuilding")
+            self.seconds, self.first_hour, self.last_hour, self.cursor = {}, None, None, 0
+
+
+def format_hour(h):
+    """0-24 -> '6 AM', '12 PM', ..."""
+    h = h % 24
+    return f"{h % 12 or 12} {'AM' if h < 12 else 'PM'}"
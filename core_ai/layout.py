@@ -0,0 +1,171 @@
+import cv2
+import os
+import pickle
+import numpy as np
+
+# ==========================================
+# SLOT LAYOUT FILES (config/<wing>.npz)
+# ==========================================
+# Version 1 arrays (np.savez_compressed, loaded with allow_pickle=False):
+#   version    int     LAYOUT_VERSION
+#   wing_id    str
+#   size       int[2]  (width, height) the polygons were drawn at
+#   points     int32[P, 2]   every polygon vertex, slot after slot
+#   offsets    int64[N + 1]  slot i is points[offsets[i]:offsets[i + 1]]
+#   bboxes     int32[N, 4]   (x, y, w, h) from cv2.boundingRect
+#   centroids  float32[N, 2] polygon centroid (first vertex if degenerate)
+#   mask       int32[H, W]   optional SlotMask label image
+#   members    bool[L, N]    optional SlotMask label -> slots table
+LAYOUT_VERSION = 1
+
+# Working resolution: every frame is resized to this before detection, and
+# layouts are drawn at it. Defined here only; the other modules import it.
+WIDTH, HEIGHT = 240, 386
+
+
+class Layout:
+    """Slot polygons of one wing plus the geometry the detector and picker need."""
+
+    def __init__(self, wing_id, pos_list, width=WIDTH, height=HEIGHT, bboxes=None, centroids=None, slot_mask=None):
+        self.wing_id = wing_id
+        self.pos_list = pos_list
+        self.width, self.height = width, height
+        self.bboxes = bboxes if bboxes is not None else _bboxes(pos_list)
+        self.centroids = centroids if centroids is not None else _centroids(pos_list)
+        self.slot_mask = slot_mask
+
+    def __len__(self):
+        return len(self.pos_list)
+
+    def get_slot_mask(self):
+        """Precomputed label mask, rasterised now if the file didn't carry one."""
+        if self.slot_mask is None:
+            from slot_mask import SlotMask  # Not at the top: slot_mask imports WIDTH/HEIGHT from here
+            self.slot_mask = SlotMask(self.pos_list, self.width, self.height)
+        return self.slot_mask
+
+
+class SlotIndex:
+    """Uniform grid over slot bounding boxes, for point hit-testing in the picker.
+
+    A click only tests the polygons whose bounding box overlaps its grid
+    cell, so right-click removal stays fast with hundreds of slots.
+    """
+
+    def __init__(self, pos_list, cell=32):
+        self.cell = cell
+        self.polygons = []
+        self.bboxes = []
+        self.cells = {}
+        for pts in pos_list:
+            self.add(pts)
+
+    def add(self, pts):
+        """Index a new slot (it gets the next number)."""
+        i = len(self.polygons)
+        polygon = np.array(pts, np.int32)
+        x, y, w, h = cv2.boundingRect(polygon)
+        self.polygons.append(polygon)
+        self.bboxes.append((x, y, w, h))
+        for cx in range(x // self.cell, (x + w - 1) // self.cell + 1):
+            for cy in range(y // self.cell, (y + h - 1) // self.cell + 1):
+                self.cells.setdefault((cx, cy), []).append(i)
+
+    def hit(self, x, y):
+        """Index of the lowest-numbered slot containing (x, y) (edges included), or None."""
+        for i in self.cells.get((x // self.cell, y // self.cell), ()):
+            bx, by, w, h = self.bboxes[i]
+            if bx <= x < bx + w and by <= y < by + h and \
+                    cv2.pointPolygonTest(self.polygons[i], (int(x), int(y)), False) >= 0:
+                return i
+        return None
+
+
+def _bboxes(pos_list):
+    return np.array([cv2.boundingRect(np.array(pts, np.int32)) for pts in pos_list], np.int32).reshape(-1, 4)
+
+
+def _centroids(pos_list):
+    centroids = []
+    for pts in pos_list:
+        pts = np.array(pts, np.int32)
+        M = cv2.moments(pts)
+        if M["m00"] != 0:
+            centroids.append((M["m10"] / M["m00"], M["m01"] / M["m00"]))
+        else:
+            centroids.append(tuple(pts[0]))
+    return np.array(centroids, np.float32).reshape(-1, 2)
+
+
+def save_layout(path, layout, with_mask=True):
+    points = [np.array(pts, np.int32).reshape(-1, 2) for pts in layout.pos_list]
+    offsets = np.cumsum([0] + [len(p) for p in points]).astype(np.int64)
+    arrays = dict(
+        version=np.array(LAYOUT_VERSION),
+        wing_id=np.array(layout.wing_id),
+        size=np.array([layout.width, layout.height], np.int32),
+        points=np.concatenate(points) if points else np.zeros((0, 2), np.int32),
+        offsets=offsets,
+        bboxes=np.asarray(layout.bboxes, np.int32).reshape(-1, 4),
+        centroids=np.asarray(layout.centroids, np.float32).reshape(-1, 2),
+    )
+    if with_mask:
+        slot_mask = layout.get_slot_mask()
+        arrays.update(mask=slot_mask.mask, members=slot_mask.members)
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp = path + ".tmp.npz"
+    np.savez_compressed(tmp, **arrays)
+    os.replace(tmp, path)
+
+
+def load_layout(path, wing_id=None):
+    """Load and validate a layout file. Legacy .pkl files are still accepted (with a warning).
+
+    Raises ValueError if the file is not a valid layout (or belongs to another wing).
+    """
+    if path.endswith('.pkl'):
+        print(f"Warning: {path} is a legacy pickle layout; run convert_layouts.py to migrate it")
+        with open(path, 'rb') as f:
+            return Layout(wing_id or os.path.splitext(os.path.basename(path))[0], pickle.load(f))
+
+    with np.load(path, allow_pickle=False) as data:
+        missing = {'version', 'wing_id', 'size', 'points', 'offsets', 'bboxes', 'centroids'} - set(data.files)
+        if missing:
+            raise ValueError(f"{path}: not a slot layout (missing {', '.join(sorted(missing))})")
+        version = int(data['version'])
+        if version != LAYOUT_VERSION:
+            raise ValueError(f"{path}: layout version {version} is not supported (expected {LAYOUT_VERSION})")
+
+        file_wing = str(data['wing_id'])
+        if wing_id is not None and file_wing != wing_id:
+            raise ValueError(f"{path}: layout is for wing {file_wing}, not {wing_id}")
+
+        width, height = (int(v) for v in data['size'])
+        points, offsets = data['points'], data['offsets']
+        n = len(offsets) - 1
+        if (points.ndim != 2 or points.shape[1] != 2 or n < 0 or offsets[0] != 0
+                or offsets[-1] != len(points) or np.any(np.diff(offsets) < 3)):
+            raise ValueError(f"{path}: corrupt polygon table")
+        if data['bboxes'].shape != (n, 4) or data['centroids'].shape != (n, 2):
+            raise ValueError(f"{path}: geometry does not match {n} slots")
+
+        pos_list = [[(int(x), int(y)) for x, y in points[offsets[i]:offsets[i + 1]]] for i in range(n)]
+
+        slot_mask = None
+        if 'mask' in data.files and 'members' in data.files:
+            mask, members = data['mask'], data['members']
+            if mask.shape != (height, width) or members.ndim != 2 or members.shape[1] != n \
+                    or mask.min(initial=0) < 0 or mask.max(initial=0) >= len(members):
+                raise ValueError(f"{path}: label mask does not match the layout")
+            from slot_mask import SlotMask
+            slot_mask = SlotMask.from_arrays(mask, members)
+
+        return Layout(file_wing, pos_list, width, height,
+                      bboxes=data['bboxes'].copy(), centroids=data['centroids'].copy(), slot_mask=slot_mask)
+
+
+def layout_path(wing_id, config_dir='config'):
+    """config/<wing>.npz if it exists, otherwise the legacy config/<wing>.pkl."""
+    npz = os.path.join(config_dir, f'{wing_id}.npz')
+    return npz if os.path.exists(npz) else os.path.join(config_dir, f'{wing_id}.pkl')
@@ -1,8 +1,18 @@
 import streamlit as st
 import pandas as pd
-import time
-from datetime import datetime
-from supabase import create_client, Client
+import numpy as np
+import hashlib
+import os
+import sys
+from collections import deque
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from backend.billing import load_tariff, quote
+from backend.storage import create_client, storage_kind
+
+from event_bus import DEFAULT_PORT, Subscriber
+from forecast import OccupancyForecaster, format_hour
+from slot_cache import SlotCache, totals
 
 # --- 1. PAGE CONFIGURATION & CSS ---
 st.set_page_config(page_title="AI Smart Parking Dashboard", layout="wide", page_icon="🅿️")
@@ -42,22 +52,106 @@ st.markdown("""
     </style>
     """, unsafe_allow_html=True)
 
-# --- 2. SUPABASE CONNECTION ---
-SUPABASE_URL = "https://edmusfoswgnjarzewzbi.supabase.co"
-SUPABASE_KEY = "sb_publishable_P-od1ESelOgV9dXUKooIlQ_x3FrRWHE"
-
+# --- 2. DATABASE CONNECTION ---
 @st.cache_resource
 def init_connection():
-    return create_client(SUPABASE_URL, SUPABASE_KEY)
+    # Supabase, or the local SQLite copy with PARKING_STORAGE=sqlite
+    return create_client()
 
 supabase = init_connection()
 
-def get_cloud_data(table_name):
-    response = supabase.table(table_name).select("*").execute()
-    return pd.DataFrame(response.data)
+@st.cache_resource
+def init_slot_cache():
+    # One cache for every browser session: at most one (incremental) query per 3 s
+    return SlotCache(supabase, ttl=3.0)
+
+slot_cache = init_slot_cache()
+
+@st.cache_resource
+def init_event_feed():
+    # Slot changes pushed by the detectors through manager.py's event bus. Every (re)connect
+    # reloads from the database, so changes missed while the bus was down are caught up.
+    # PARKING_EVENT_PORT=0 (manager.py --event-port 0) turns the bus off: plain polling.
+    if not DEFAULT_PORT:
+        return None
+    return Subscriber(on_event=slot_cache.apply, on_connect=slot_cache.invalidate, port=DEFAULT_PORT)
+
+events = init_event_feed()
+
+def bus_connected():
+    return events is not None and events.connected
+
+def bus_state():
+    if events is None:
+        return 'off (polling every 3 s)'
+    return 'connected' if events.connected else 'offline (polling every 3 s)'
+
+@st.cache_resource
+def init_latencies():
+    # Event -> screen latency (seconds) of the last pushed changes, over all sessions
+    return deque(maxlen=500)
+
+latencies = init_latencies()
+
+# With the bus connected the database is only polled as a safety net
+FALLBACK_TTL = 60.0
+
+# The live sections are fragments that rerun on their own; the page as a whole
+# only reruns on a click. Grid and metrics every second (pushed changes show
+# within that), the forecast and fee cards and the status line less often.
+LIVE_EVERY = 1.0
+SLOW_EVERY = 30.0
+
+@st.cache_resource
+def init_forecaster():
+    # Hour-of-week profiles, updated incrementally from new transactions on a background
+    # thread (a first start may have millions of rows of history to catch up on)
+    state_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'runtime', 'forecast.npz')
+    forecaster = OccupancyForecaster(supabase, state_path=state_path)
+    forecaster.start(interval=300)
+    return forecaster
+
+@st.cache_resource
+def init_tariff():
+    # Same tariff (and pricing) as backend/billing.py uses for the stored amounts
+    return load_tariff()
+
+tariff = init_tariff()
+
+forecaster = init_forecaster()
+
+def live_snapshot():
+    return slot_cache.get(ttl=FALLBACK_TTL if bus_connected() else None)
+
+def occupancy(snapshot):
+    """(total, available, occupancy rate in %) from the per-wing counts."""
+    if snapshot.slots.empty:
+        return 0, 0, 0
+    total_spaces, occupied_spaces = totals(snapshot.counts)
+    occupancy_rate = int((occupied_spaces / total_spaces) * 100) if total_spaces > 0 else 0
+    return total_spaces, total_spaces - occupied_spaces, occupancy_rate
+
+def wing_state_key(wing_id, wing_data):
+    # Changes exactly when a slot of the wing is added, removed or changes status
+    occupied = np.packbits(wing_data['status'].to_numpy() == 'Occupied')
+    digest = hashlib.blake2b(",".join(wing_data['slot_id']).encode() + occupied.tobytes(), digest_size=16)
+    return wing_id, digest.hexdigest()
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def grid_html(state_key, _wing_data):
+    # Shared by all sessions and keyed on the wing's slot states only, so an
+    # unchanged wing is never rebuilt. Built column-wise, without iterrows().
+    slot_names = _wing_data['slot_id'].str.split('-').str[1] # Just the number (e.g., 01, 02)
+    status_class = _wing_data['status'].eq('Occupied').map({True: 'occupied', False: 'vacant'})
+    slots = ("<div class='slot " + status_class + "'><div class='car-icon'>🚗</div>"
+             "<div class='slot-id'>" + slot_names + "</div></div>")
+    # Between the IN and OUT gates
+    return ("<div class='parking-grid'><div class='gate'>IN ➡️</div>" + "".join(slots) +
+            "<div class='gate'>➡️ OUT</div></div>")
 
-# Fetch Live Data
-df_slots = get_cloud_data("slots")
+# Fetch Live Data (for the payment portal; the fragments below fetch their own)
+snapshot = live_snapshot()
+df_slots = snapshot.slots
 
 # State Management for Payment Portal
 if 'show_payment' not in st.session_state:
@@ -68,19 +162,19 @@ def toggle_payment():
 
 # --- 3. TOP ROW: METRICS & PAYMENT BUTTON ---
 st.markdown("### 🚗 Facility Overview")
-if not df_slots.empty:
-    total_spaces = len(df_slots)
-    occupied_spaces = len(df_slots[df_slots['status'] == 'Occupied'])
-    available_spaces = total_spaces - occupied_spaces
-    occupancy_rate = int((occupied_spaces / total_spaces) * 100) if total_spaces > 0 else 0
-else:
-    total_spaces, available_spaces, occupancy_rate = 0, 0, 0
-
-col1, col2, col3, col4 = st.columns([1, 1, 1, 1])
-col1.metric("📍 Total Spaces", total_spaces)
-col2.metric("🟢 Available", available_spaces)
-col3.metric("📈 Occupancy Rate", f"{occupancy_rate}%")
-with col4:
+
+@st.fragment(run_every=LIVE_EVERY)
+def facility_metrics():
+    total_spaces, available_spaces, occupancy_rate = occupancy(live_snapshot())
+    col1, col2, col3 = st.columns([1, 1, 1])
+    col1.metric("📍 Total Spaces", total_spaces)
+    col2.metric("🟢 Available", available_spaces)
+    col3.metric("📈 Occupancy Rate", f"{occupancy_rate}%")
+
+metrics_col, button_col = st.columns([3, 1])
+with metrics_col:
+    facility_metrics()
+with button_col:
     st.write("<br>", unsafe_allow_html=True) # Spacing alignment
     st.button("💳 Quick Action: Pay Now", type="primary", use_container_width=True, on_click=toggle_payment)
 
@@ -99,13 +193,13 @@ if st.session_state.show_payment:
                 selected_slot = st.selectbox("Select your Slot ID:", occupied_df['slot_id'])
             with pc2:
                 row = occupied_df[occupied_df['slot_id'] == selected_slot].iloc[0]
-                entry_time = datetime.strptime(row['start_time'].replace('T', ' ').split('.')[0], '%Y-%m-%d %H:%M:%S')
-                duration = datetime.now() - entry_time
-                hours = max(1, duration.seconds // 3600)
-                fee = 2.00 + (max(0, hours - 1) * 1.00)
-                
-                st.write(f"**Parked Duration:** {hours} Hour(s)")
-                st.write(f"**Amount Due:** RM {fee:.2f}")
+                seconds, fee = (v[0] for v in quote([row['start_time']], tariff=tariff))
+                if np.isnan(fee):
+                    st.write("Entry time unknown, please see the attendant.")
+                else:
+                    hours, minutes = divmod(int(seconds) // 60, 60)
+                    st.write(f"**Parked Duration:** {hours} Hour(s) {minutes} Min")
+                    st.write(f"**Amount Due:** RM {fee:.2f}")
                 if st.button("Confirm Payment", type="primary"):
                     st.success("Payment successful! Please exit within 15 minutes.")
                     st.session_state.show_payment = False
@@ -115,68 +209,92 @@ if st.session_state.show_payment:
 left_panel, right_panel = st.columns([7, 3])
 
 # --- LEFT PANEL: PARKING ARRANGEMENT ---
-with left_panel:
+@st.fragment(run_every=LIVE_EVERY)
+def parking_grid():
+    snapshot = live_snapshot()
     st.subheader("Select Level")
     
-    if not df_slots.empty:
-        wings = sorted(df_slots['wing_id'].unique())
+    if not snapshot.slots.empty:
+        wings = sorted(snapshot.wings)
         # Use a horizontal radio button to mimic the level selector in your image
+        # (inside the fragment, so switching levels reruns only the grid)
         selected_wing = st.radio("Levels", wings, horizontal=True, label_visibility="collapsed")
         
         st.write(f"### Parking Layout: {selected_wing}")
         st.markdown("<span style='color:#10b981'>🟢 Available</span> &nbsp;&nbsp; <span style='color:#ef4444'>🔴 Occupied</span>", unsafe_allow_html=True)
         
-        wing_data = df_slots[df_slots['wing_id'] == selected_wing].sort_values(by='slot_id')
-        
-        # HTML construction for the parking grid
-        html_grid = "<div class='parking-grid'>"
-        
-        # IN GATE
-        html_grid += "<div class='gate'>IN ➡️</div>"
-        
-        for idx, row in wing_data.iterrows():
-            status_class = "occupied" if row['status'] == "Occupied" else "vacant"
-            slot_name = row['slot_id'].split('-')[1] # Just get the number (e.g., 01, 02)
-            html_grid += f"""
-                <div class='slot {status_class}'>
-                    <div class='car-icon'>🚗</div>
-                    <div class='slot-id'>{slot_name}</div>
-                </div>
-            """
-            
-        # OUT GATE
-        html_grid += "<div class='gate'>➡️ OUT</div>"
-        html_grid += "</div>"
-        
-        st.markdown(html_grid, unsafe_allow_html=True)
+        wing_data = snapshot.wings[selected_wing] # Already sorted by slot_id
+        st.markdown(grid_html(wing_state_key(selected_wing, wing_data), wing_data), unsafe_allow_html=True)
         
     else:
-        st.warning("No data found in Supabase.")
+        st.warning(f"No data found in {storage_kind()} storage.")
+
+    # Pushed changes this session hasn't shown before: publish -> rendered
+    if 'shown_version' in st.session_state:
+        latencies.extend(slot_cache.event_latencies(st.session_state.shown_version))
+    st.session_state.shown_version = snapshot.version
+
+with left_panel:
+    parking_grid()
 
 # --- RIGHT PANEL: PREDICTIONS & ANALYTICS ---
-with right_panel:
-    st.subheader("📈 Occupancy Prediction")
-    
+@st.fragment(run_every=LIVE_EVERY)
+def current_occupancy():
+    _, _, occupancy_rate = occupancy(live_snapshot())
     st.markdown("<div class='forecast-card'>", unsafe_allow_html=True)
     st.write(f"**Current Occupancy:** {occupancy_rate}%")
     st.progress(occupancy_rate / 100.0)
     st.markdown("</div>", unsafe_allow_html=True)
-    
+
+@st.fragment(run_every=SLOW_EVERY)
+def forecast_cards():
+    snapshot = live_snapshot()
+    _, _, occupancy_rate = occupancy(snapshot)
+
     st.markdown("<div class='forecast-card'>", unsafe_allow_html=True)
     st.write("⏱️ **Next Hour Forecast**")
-    # Simple logic to simulate a forecast
-    forecast = min(100, occupancy_rate + 5)
-    color = "Red" if forecast > 80 else "Orange" if forecast > 50 else "Green"
-    st.write(f"<span style='color:{color}; font-weight:bold; font-size:20px'>{forecast}%</span>", unsafe_allow_html=True)
-    st.caption("Based on current entry trends.")
+    capacity = {w: c['total'] for w, c in snapshot.counts.items()}
+    forecast = forecaster.next_hour(capacity, current=occupancy_rate)
+    if forecast is None:
+        st.write("Not enough history yet.")
+    else:
+        color = "Red" if forecast > 80 else "Orange" if forecast > 50 else "Green"
+        st.write(f"<span style='color:{color}; font-weight:bold; font-size:20px'>{forecast}%</span>", unsafe_allow_html=True)
+        st.caption(f"Based on {forecaster.rows_ingested:,} past sessions at this hour of the week"
+                   f"{'' if forecaster.caught_up else ' (still loading history)'}.")
     st.markdown("</div>", unsafe_allow_html=True)
     
+    st.markdown("<div class='forecast-card'>", unsafe_allow_html=True)
+    st.write("💰 **Fees Accruing**")
+    df_slots = snapshot.slots
+    parked = df_slots[df_slots['status'] == 'Occupied'] if not df_slots.empty else df_slots
+    _, fees = quote(parked['start_time'] if len(parked) else [], tariff=tariff)
+    st.write(f"RM {np.nansum(fees):,.2f} across {len(parked)} parked cars")
+    st.markdown("</div>", unsafe_allow_html=True)
+
     st.markdown("<div class='forecast-card'>", unsafe_allow_html=True)
     st.write("🕒 **Best Times to Visit**")
-    st.write("🟢 Early Morning: `6 AM - 8 AM`")
-    st.write("🟢 Late Evening: `9 PM - 11 PM`")
+    best = forecaster.best_times(capacity)
+    if not best:
+        st.write("Not enough history yet.")
+    for start, end, rate in best:
+        st.write(f"🟢 `{format_hour(start)} - {format_hour(end)}` (~{rate}% full)")
     st.markdown("</div>", unsafe_allow_html=True)
 
-# Auto-Refresh every few seconds
-time.sleep(3)
-st.rerun()
\ No newline at end of file
+with right_panel:
+    st.subheader("📈 Occupancy Prediction")
+    current_occupancy()
+    forecast_cards()
+
+@st.fragment(run_every=SLOW_EVERY)
+def status_line():
+    cache_stats = slot_cache.stats()
+    caption = (f"Data layer: {cache_stats['queries']} queries for {cache_stats['reads']} reads "
+               f"({cache_stats['queries_saved']} saved), {cache_stats['events_applied']} pushed changes, "
+               f"event bus {bus_state()}")
+    if latencies:
+        p50, p95 = np.percentile(np.array(latencies) * 1000, [50, 95])
+        caption += f" · event → screen p50 {p50:.0f} ms, p95 {p95:.0f} ms"
+    st.caption(caption)
+
+status_line()
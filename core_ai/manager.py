@@ -1,28 +1,74 @@
-import subprocess
-import time
+import argparse
+import os
+import signal
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT_DIR)
+
+from backend.storage import storage_kind
+from event_bus import DEFAULT_PORT, EventBus
+from supervisor import Supervisor
 
 # List of your 5 wings
 wings = ["W3A", "W5", "W1", "W7", "W8"]
 
-processes = []
+parser = argparse.ArgumentParser()
+parser.add_argument('--batched', action='store_true',
+                    help='Run every wing in one engine.py process with a single shared model')
+parser.add_argument('--headless', action='store_true', help='Run the detectors without windows')
+parser.add_argument('--preview', action='store_true', help='With --headless: on-demand JPEG previews in runtime/')
+parser.add_argument('--max-loading', type=int, default=None,
+                    help='How many detectors may load their model at once (default: one per core)')
+parser.add_argument('--metrics-port', type=int, default=0,
+                    help='Prometheus metrics: engine or first detector on this port, next detectors on +1, +2, ...')
+parser.add_argument('--billing-every', type=float, default=0,
+                    help='Price unpaid transactions every N seconds with backend/billing.py (0 = off)')
+parser.add_argument('--event-port', type=int, default=DEFAULT_PORT,
+                    help='Slot-change event bus for the dashboard on 127.0.0.1:<port> (0 = off, dashboard polls)')
+args = parser.parse_args()
+extra = ['--headless'] if args.headless else []
+if args.headless and args.preview:
+    extra.append('--preview')
+if args.event_port:
+    extra += ['--event-port', str(args.event_port)]
+
+def metrics_args(i):
+    return ['--metrics-port', str(args.metrics_port + i)] if args.metrics_port else []
 
 print("--- AI Smart Parking Multi-Stream Engine ---")
 print(f"Launching {len(wings)} wings...")
 
-for wing_id in wings:
-    # Launches detector.py with the wing argument
-    # 'python' might need to be 'python3' depending on your OS
-    p = subprocess.Popen(['python', 'detector.py', '--wing', wing_id])
-    processes.append(p)
-    print(f"Started stream for {wing_id}")
-    time.sleep(2) # Short delay to prevent CPU spike during loading
+if args.batched:
+    # One process, one model, one batched forward pass per tick
+    workers = [('engine', [sys.executable, 'engine.py', '--wings', *wings, *extra, *metrics_args(0)])]
+else:
+    # One detector.py per wing; each reports ready once its model and layout are loaded
+    workers = [(wing_id, [sys.executable, 'detector.py', '--wing', wing_id, *extra, *metrics_args(i)])
+               for i, wing_id in enumerate(wings)]
+
+if storage_kind() == 'sqlite':
+    # Detectors write to the local database; this worker copies it to Supabase
+    print("Storage: local SQLite, replicated to Supabase in the background")
+    workers.append(('sync', [sys.executable, os.path.join(ROOT_DIR, 'backend', 'sync.py')]))
+
+if args.event_port:
+    # Detectors publish slot changes here; the dashboard subscribes instead of polling
+    EventBus(port=args.event_port).start()
+
+if args.billing_every:
+    workers.append(('billing', [sys.executable, os.path.join(ROOT_DIR, 'backend', 'billing.py'),
+                                '--watch', str(args.billing_every)]))
+
+supervisor = Supervisor(workers, max_loading=args.max_loading)
+
+def _on_sigterm(signum, frame):
+    raise KeyboardInterrupt
 
-print("\nAll systems active. Press Ctrl+C in this terminal to stop all.")
+signal.signal(signal.SIGTERM, _on_sigterm) # run_all.py stops us with terminate()
+print("Press Ctrl+C in this terminal to stop all.")
 
 try:
-    for p in processes:
-        p.wait()
+    supervisor.run()
 except KeyboardInterrupt:
-    print("\nShutting down all streams...")
-    for p in processes:
-        p.terminate()
\ No newline at end of file
+    pass
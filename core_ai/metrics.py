@@ -0,0 +1,260 @@
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# JSON dumps go next to the other runtime state
+RUNTIME_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'runtime')
+
+# Latency buckets in seconds: 0.5 ms (match, fsm) up to 5 s (a stalled DB flush)
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+HELP = {
+    'parking_stage_seconds': 'Wall-clock time per pipeline stage (decode, resize, infer, match, fsm, draw, ...)',
+    'parking_frames_total': 'Frames read from the capture thread',
+    'parking_frames_dropped_total': 'Frames the capture thread replaced before the loop read them',
+    'parking_inferences_total': 'Due frames on which the model ran',
+    'parking_inferences_skipped_total': 'Due frames answered without the model, by reason',
+    'parking_tracks': 'Boxes currently carried by the tracker',
+    'parking_db_calls_total': 'Database calls made by the cloud writer, by table and operation',
+    'parking_db_errors_total': 'Failed database calls, by table and operation',
+    'parking_db_events_total': 'Slot events written to the database, by wing',
+    'parking_db_queue_depth': 'Slot events waiting in the write-behind queue',
+    'parking_db_flush_seconds_total': 'Total time spent in successful writer flushes',
+    'parking_db_flushes_total': 'Successful writer flushes',
+}
+
+
+class Counter:
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, n=1):
+        self.value += n
+
+
+class Histogram:
+    """Fixed-bucket histogram; observe() is one bisect and two adds."""
+
+    __slots__ = ('counts', 'sum', 'count')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        self.counts[bisect_left(BUCKETS, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th sample (coarse, but free)."""
+        target, seen = q * self.count, 0
+        for bound, n in zip(BUCKETS, self.counts):
+            seen += n
+            if seen >= target:
+                return bound
+        return float('inf')
+
+
+class Metrics:
+    """In-process metrics registry, rendered as Prometheus text or JSON on demand.
+
+    Hot-path updates are plain attribute increments on Counter/Histogram
+    objects the caller keeps a reference to; there is no lock and no label
+    lookup per sample. Values that already live elsewhere (writer stats,
+    dropped frames) are read by collector callbacks only when someone scrapes.
+    """
+
+    def __init__(self):
+        self._counters = {}
+        self._histograms = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+        self._last_snapshot = None
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted(labels.items()))
+
+    def counter(self, name, **labels):
+        with self._lock:
+            return self._counters.setdefault(self._key(name, labels), Counter())
+
+    def histogram(self, name, **labels):
+        with self._lock:
+            return self._histograms.setdefault(self._key(name, labels), Histogram())
+
+    def collector(self, fn):
+        """fn() yields (name, 'counter' | 'gauge', labels, value) at scrape time."""
+        with self._lock:
+            self._collectors.append(fn)
+
+    def _collect(self):
+        """{(name, kind): [(labels, value)]} for counters, gauges and collector output."""
+        with self._lock:
+            counters = list(self._counters.items())
+            collectors = list(self._collectors)
+        series = {}
+        for (name, labels), c in counters:
+            series.setdefault((name, 'counter'), []).append((labels, c.value))
+        for fn in collectors:
+            for name, kind, labels, value in fn():
+                series.setdefault((name, kind), []).append((tuple(sorted(labels.items())), value))
+        return series
+
+    def render(self):
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+
+        def header(name, kind):
+            if name in HELP:
+                lines.append(f"# HELP {name} {HELP[name]}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        for (name, kind), values in sorted(self._collect().items()):
+            header(name, kind)
+            lines += [f"{name}{_labels(labels)} {value}" for labels, value in values]
+
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+        current = None
+        for (name, labels), h in histograms:
+            if name != current:
+                header(name, 'histogram')
+                current = name
+            cumulative = 0
+            for bound, n in zip(BUCKETS, h.counts):
+                cumulative += n
+                lines.append(f"{name}_bucket{_labels(labels + (('le', repr(bound)),))} {cumulative}")
+            lines.append(f"{name}_bucket{_labels(labels + (('le', '+Inf'),))} {h.count}")
+            lines.append(f"{name}_sum{_labels(labels)} {h.sum:.6f}")
+            lines.append(f"{name}_count{_labels(labels)} {h.count}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self):
+        """JSON-friendly view, with per-second rates for counters since the previous snapshot."""
+        now = time.time()
+        series = self._collect()
+        previous, self._last_snapshot = self._last_snapshot, (now, series)
+
+        out = {'time': now, 'counters': {}, 'gauges': {}, 'rates': {}, 'histograms': {}}
+        for (name, kind), values in series.items():
+            out['counters' if kind == 'counter' else 'gauges'][name] = [dict(labels, value=v) for labels, v in values]
+        if previous is not None:
+            then, old = previous
+            for (name, kind), values in series.items():
+                if kind != 'counter':
+                    continue
+                before = dict(old.get((name, kind), []))
+                out['rates'][name] = [dict(labels, per_s=round((v - before.get(labels, 0)) / (now - then), 3))
+                                      for labels, v in values]
+
+        with self._lock:
+            histograms = list(self._histograms.items())
+        for (name, labels), h in histograms:
+            out['histograms'].setdefault(name, []).append(dict(
+                labels, count=h.count,
+                avg_ms=round(h.sum / h.count * 1000, 3) if h.count else 0.0,
+                p50_ms=h.quantile(0.5) * 1000, p95_ms=h.quantile(0.95) * 1000))
+        return out
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}"
+
+
+REGISTRY = Metrics()
+
+
+def watch_writer(writer, name, registry=REGISTRY):
+    """Export a SlotWriter's call/error/event counters (read only when scraped)."""
+    def collect():
+        for (table, op), n in list(writer.calls.items()):
+            yield 'parking_db_calls_total', 'counter', {'writer': name, 'table': table, 'op': op}, n
+        for (table, op), n in list(writer.errors.items()):
+            yield 'parking_db_errors_total', 'counter', {'writer': name, 'table': table, 'op': op}, n
+        for wing, n in list(writer.events_by_wing.items()):
+            yield 'parking_db_events_total', 'counter', {'writer': name, 'wing': wing}, n
+        yield 'parking_db_queue_depth', 'gauge', {'writer': name}, writer.queue_depth()
+        yield 'parking_db_flush_seconds_total', 'counter', {'writer': name}, round(writer.total_flush_ms / 1000, 6)
+        yield 'parking_db_flushes_total', 'counter', {'writer': name}, writer.flushes
+    registry.collector(collect)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    registry = REGISTRY
+
+    def do_GET(self):
+        if self.path.startswith('/metrics.json'):
+            body, ctype = json.dumps(self.registry.snapshot()).encode(), 'application/json'
+        elif self.path.startswith('/metrics'):
+            body, ctype = self.registry.render().encode(), 'text/plain; version=0.0.4; charset=utf-8'
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', ctype)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass  # Scrapes every few seconds would flood the detector's console
+
+
+def serve(port, host='127.0.0.1'):
+    """Serve /metrics (Prometheus text) and /metrics.json on a daemon thread."""
+    server = ThreadingHTTPServer((host, port), _Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+
+def dump_json(path, every=10.0, registry=REGISTRY):
+    """Fallback when nothing scrapes: write snapshot() to `path` every `every` seconds."""
+    def run():
+        while True:
+            time.sleep(every)
+            tmp = path + ".tmp"
+            with open(tmp, 'w') as f:
+                json.dump(registry.snapshot(), f)
+            os.replace(tmp, path)
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    threading.Thread(target=run, name="metrics-json", daemon=True).start()
+
+
+def start_metrics(name, port=0, json_every=10.0, runtime_dir=RUNTIME_DIR):
+    """Start the HTTP endpoint (port > 0) and the JSON dump (json_every > 0) for this process."""
+    if port:
+        try:
+            serve(port)
+            print(f"[{name}] Metrics on http://127.0.0.1:{port}/metrics")
+        except OSError as e:
+            print(f"[{name}] Metrics endpoint unavailable on port {port}: {e}")
+    if json_every:
+        dump_json(os.path.join(runtime_dir, f'metrics_{name}.json'), json_every)
+
+
+if __name__ == '__main__':
+    # Overhead check: cost of one stage sample, the unit the detector loop pays
+    h = REGISTRY.histogram('parking_stage_seconds', wing='bench', stage='infer')
+    c = REGISTRY.counter('parking_frames_total', wing='bench')
+    n = 1_000_000
+    t0 = time.perf_counter()
+    for i in range(n):
+        h.observe(0.003)
+        c.inc()
+    per_sample = (time.perf_counter() - t0) / n
+    print(f"observe + inc: {per_sample * 1e9:.0f} ns per frame-stage")
+    t0 = time.perf_counter()
+    text = REGISTRY.render()
+    print(f"render: {(time.perf_counter() - t0) * 1000:.2f} ms, {len(text)} bytes")
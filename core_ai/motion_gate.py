@@ -0,0 +1,75 @@
+import cv2
+import time
+import numpy as np
+
+INFER, SKIP, AUDIT = 'infer', 'skip', 'audit'
+
+
+class MotionGate:
+    """Cheap frame differencing over the slot ROIs that decides when the model has to run.
+
+    Each candidate frame is converted to a blurred half-resolution greyscale
+    image and compared with the frame the model last saw. Only pixels inside
+    the union of the slot polygons count. The gate answers INFER when enough
+    of them changed, or when the last inference is older than
+    `max_staleness` seconds. Otherwise it answers SKIP. Every
+    `audit_every`-th SKIP becomes an AUDIT instead: the model runs anyway,
+    so we can measure how often skipping would have hidden a change.
+    """
+
+    def __init__(self, roi_mask, pixel_threshold=25, min_changed=0.01, max_staleness=10.0, audit_every=20):
+        h, w = roi_mask.shape
+        self.size = (w // 2, h // 2)
+        self.roi = cv2.resize(roi_mask.astype(np.uint8), self.size, interpolation=cv2.INTER_NEAREST) > 0
+        self.roi_pixels = max(int(self.roi.sum()), 1)
+        self.pixel_threshold = pixel_threshold
+        self.min_changed = min_changed
+        self.max_staleness = max_staleness
+        self.audit_every = audit_every
+
+        self.reference = None
+        self.last_inference = 0.0
+        self.last_change = 0.0
+        self._since_audit = 0
+
+        # Reporting
+        self.checks = 0
+        self.skipped = 0
+        self.audits = 0
+        self.audit_mismatches = 0
+
+    def _prepare(self, frame):
+        gray = cv2.cvtColor(cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA), cv2.COLOR_BGR2GRAY)
+        return cv2.GaussianBlur(gray, (5, 5), 0)
+
+    def check(self, frame):
+        self.checks += 1
+        if self.reference is None or time.monotonic() - self.last_inference >= self.max_staleness:
+            return INFER
+
+        diff = cv2.absdiff(self._prepare(frame), self.reference)
+        self.last_change = np.count_nonzero((diff > self.pixel_threshold) & self.roi) / self.roi_pixels
+        if self.last_change >= self.min_changed:
+            return INFER
+
+        self._since_audit += 1
+        if self.audit_every and self._since_audit >= self.audit_every:
+            self._since_audit = 0
+            self.audits += 1
+            return AUDIT
+        self.skipped += 1
+        return SKIP
+
+    def inferred(self, frame):
+        """The model just ran on `frame`: it becomes the new reference."""
+        self.reference = self._prepare(frame)
+        self.last_inference = time.monotonic()
+
+    def stats(self):
+        return {
+            'checks': self.checks,
+            'skipped': self.skipped,
+            'skip_rate': round(self.skipped / self.checks, 3) if self.checks else 0.0,
+            'audits': self.audits,
+            'audit_mismatch_rate': round(self.audit_mismatches / self.audits, 3) if self.audits else 0.0,
+        }
@@ -1,17 +1,19 @@
 import cv2
-import pickle
 import numpy as np
 import os
 
+from layout import HEIGHT, WIDTH, Layout, SlotIndex, load_layout, save_layout
+
 # ==========================================
 # 1. CONFIGURATION
 # ==========================================
-# Resolution matches your training data/detector.py
-WIDTH, HEIGHT = 240, 386  
+# Resolution (WIDTH, HEIGHT) comes from layout.py, shared with the detector
 
 # Change these for each wing (W1, W2, etc.)
-image_path = '../dataset/train/W8.jpg' 
-pos_file = 'config/W8.pkl'
+wing_id = 'W8'
+image_path = f'../dataset/train/{wing_id}.jpg' 
+pos_file = f'config/{wing_id}.npz'
+legacy_file = f'config/{wing_id}.pkl'  # Read if there is no .npz yet
 
 MICRO_STEP = 10 
 
@@ -27,14 +29,23 @@ current_points = []
 mouse_pos_raw = (0, 0)
 pos_list = []
 
+# Rendering is layered and cached; these say which layers are out of date
+slots_dirty = True      # Slot added/removed: redraw the polygon layer
+view_dirty = True       # ... or zoom/pan changed: re-warp the view
+frame_dirty = True      # ... or the point being drawn moved: redraw the overlay
+
 # Load existing data if it exists
-if os.path.exists(pos_file):
-    with open(pos_file, 'rb') as f:
+for existing in (pos_file, legacy_file):
+    if os.path.exists(existing):
         try:
-            pos_list = pickle.load(f)
-            print(f"Loaded {len(pos_list)} slots from {pos_file}")
-        except: 
+            pos_list = [list(pts) for pts in load_layout(existing, wing_id).pos_list]
+            print(f"Loaded {len(pos_list)} slots from {existing}")
+        except (OSError, ValueError) as e:
+            print(f"Could not load {existing}: {e}")
             pos_list = []
+        break
+
+slot_index = SlotIndex(pos_list)   # Bounding-box grid for right-click hit-testing
 
 # ==========================================
 # 3. HELPER FUNCTIONS
@@ -56,18 +67,59 @@ def draw_ruler(img, s, px, py):
         cv2.line(img, (15, pos), (25, pos), color, 1)
         cv2.putText(img, str(y), (2, pos + 5), cv2.FONT_HERSHEY_SIMPLEX, 0.3, color, 1)
 
+def load_base():
+    """Decoded, resized image with the grid drawn on it; read from disk once."""
+    img_base = cv2.imread(image_path)
+    if img_base is None:
+        # Create black canvas if image not found
+        img_base = np.zeros((HEIGHT, WIDTH, 3), np.uint8)
+        cv2.putText(img_base, "Img Not Found", (20, 50), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0,0,255), 1)
+
+    # Resize Image to Project Resolution
+    base = cv2.resize(img_base, (WIDTH, HEIGHT))
+
+    # Draw Grid
+    for x in range(0, WIDTH, MICRO_STEP):
+        cv2.line(base, (x, 0), (x, HEIGHT), (40, 40, 40), 1)
+    for y in range(0, HEIGHT, MICRO_STEP):
+        cv2.line(base, (0, y), (WIDTH, y), (40, 40, 40), 1)
+    return base
+
+def draw_slot(img, i, pts_list):
+    pts = np.array(pts_list, np.int32)
+    cv2.polylines(img, [pts], True, (0, 255, 0), 1)
+
+    # Calculate Center
+    M = cv2.moments(pts)
+    if M["m00"] != 0:
+        cx = int(M["m10"] / M["m00"])
+        cy = int(M["m01"] / M["m00"])
+    else:
+        cx, cy = pts[0]
+
+    # Draw Number
+    label = str(i + 1)
+    # Black border for contrast
+    cv2.putText(img, label, (cx-5, cy+5), cv2.FONT_HERSHEY_SIMPLEX, 0.4, (0, 0, 0), 2)
+    # White text
+    cv2.putText(img, label, (cx-5, cy+5), cv2.FONT_HERSHEY_SIMPLEX, 0.4, (255, 255, 255), 1)
+
 def mouse_click(event, x, y, flags, param):
     global current_points, mouse_pos_raw, pos_list, scale, pan_x, pan_y, is_dragging, drag_start
-    
+    global slot_index, slots_dirty, view_dirty, frame_dirty
+
     # Convert Screen Coords -> Image Coords
     img_x = int((x - pan_x) / scale)
     img_y = int((y - pan_y) / scale)
+    if current_points and (img_x, img_y) != mouse_pos_raw:
+        frame_dirty = True  # Rubber-band line follows the mouse
     mouse_pos_raw = (img_x, img_y)
 
     # ZOOM
     if event == cv2.EVENT_MOUSEWHEEL:
         if flags > 0: scale *= 1.1
         else: scale /= 1.1
+        view_dirty = True
 
     # PAN
     elif event == cv2.EVENT_MBUTTONDOWN:
@@ -78,32 +130,38 @@ def mouse_click(event, x, y, flags, param):
             pan_x += (x - drag_start[0])
             pan_y += (y - drag_start[1])
             drag_start = (x, y)
+            view_dirty = True
     elif event == cv2.EVENT_MBUTTONUP:
         is_dragging = False
 
     # DRAW (Left Click)
     elif event == cv2.EVENT_LBUTTONDOWN and not is_dragging:
         current_points.append((img_x, img_y))
-        
+        frame_dirty = True
+
     # FINISH SLOT (Double Click)
     elif event == cv2.EVENT_LBUTTONDBLCLK:
         if len(current_points) >= 3:
-            pos_list.append(current_points) 
+            pos_list.append(current_points)
+            slot_index.add(current_points)
+            draw_slot(slots_layer, len(pos_list) - 1, current_points)  # Just the new one; numbers don't move
             current_points = []
+            view_dirty = True
             print(f"Slot {len(pos_list)} saved!")
-            
+
     # REMOVE SLOT (Right Click)
     elif event == cv2.EVENT_RBUTTONDOWN:
-        if current_points: 
+        if current_points:
             current_points.pop() # Undo last point
+            frame_dirty = True
         else:
             # Check if clicked inside a completed box
-            for i, pts_list in enumerate(pos_list):
-                pts = np.array(pts_list, np.int32)
-                if cv2.pointPolygonTest(pts, (img_x, img_y), False) >= 0:
-                    pos_list.pop(i)
-                    print(f"Removed Slot {i+1}. Renumbering...")
-                    break
+            i = slot_index.hit(img_x, img_y)
+            if i is not None:
+                pos_list.pop(i)
+                slot_index = SlotIndex(pos_list)
+                slots_dirty = True
+                print(f"Removed Slot {i+1}. Renumbering...")
 
 # ==========================================
 # 4. MAIN LOOP
@@ -121,65 +179,45 @@ print("Middle Click + Drag: Pan")
 print("S: Save")
 print("Q: Quit")
 
+base_layer = load_base()
+slots_layer = base_layer.copy()
+
 while True:
-    img_base = cv2.imread(image_path)
-    if img_base is None:
-        # Create black canvas if image not found
-        img_base = np.zeros((HEIGHT, WIDTH, 3), np.uint8)
-        cv2.putText(img_base, "Img Not Found", (20, 50), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0,0,255), 1)
-    
-    # 1. Resize Image to Project Resolution
-    workspace = cv2.resize(img_base, (WIDTH, HEIGHT))
-    
-    # Draw Grid
-    for x in range(0, WIDTH, MICRO_STEP):
-        cv2.line(workspace, (x, 0), (x, HEIGHT), (40, 40, 40), 1)
-    for y in range(0, HEIGHT, MICRO_STEP):
-        cv2.line(workspace, (0, y), (WIDTH, y), (40, 40, 40), 1)
-
-    # 2. Draw Completed Slots with Numbers
-    for i, pts_list in enumerate(pos_list):
-        pts = np.array(pts_list, np.int32)
-        cv2.polylines(workspace, [pts], True, (0, 255, 0), 1)
-        
-        # Calculate Center
-        M = cv2.moments(pts)
-        if M["m00"] != 0:
-            cx = int(M["m10"] / M["m00"])
-            cy = int(M["m01"] / M["m00"])
-        else:
-            cx, cy = pts[0]
-            
-        # Draw Number
-        label = str(i + 1)
-        # Black border for contrast
-        cv2.putText(workspace, label, (cx-5, cy+5), cv2.FONT_HERSHEY_SIMPLEX, 0.4, (0, 0, 0), 2)
-        # White text
-        cv2.putText(workspace, label, (cx-5, cy+5), cv2.FONT_HERSHEY_SIMPLEX, 0.4, (255, 255, 255), 1)
-
-    # 3. Draw Active Drawing
-    if current_points:
-        cv2.polylines(workspace, [np.array(current_points, np.int32)], False, (0, 255, 255), 1)
-        cv2.line(workspace, current_points[-1], mouse_pos_raw, (0, 255, 255), 1)
-
-    # 4. Apply Zoom & Pan
-    M_mat = np.float32([[scale, 0, pan_x], [0, scale, pan_y]])
-    display_img = cv2.warpAffine(workspace, M_mat, (WIDTH, HEIGHT))
-
-    # Overlays
-    draw_ruler(display_img, scale, pan_x, pan_y)
-    cv2.putText(display_img, f"Slots: {len(pos_list)} | {WIDTH}x{HEIGHT}", 
-                (10, HEIGHT-10), cv2.FONT_HERSHEY_SIMPLEX, 0.4, (255, 255, 255), 1)
-
-    cv2.imshow("Picker 240x386", display_img)
-    
+    # 1. Slot layer: base image + every completed slot, redrawn only after a removal
+    if slots_dirty:
+        slots_layer = base_layer.copy()
+        for i, pts_list in enumerate(pos_list):
+            draw_slot(slots_layer, i, pts_list)
+        slots_dirty, view_dirty = False, True
+
+    # 2. View: zoom & pan plus overlays, redone only after an edit or a zoom/pan
+    if view_dirty:
+        M_mat = np.float32([[scale, 0, pan_x], [0, scale, pan_y]])
+        view = cv2.warpAffine(slots_layer, M_mat, (WIDTH, HEIGHT))
+        draw_ruler(view, scale, pan_x, pan_y)
+        cv2.putText(view, f"Slots: {len(pos_list)} | {WIDTH}x{HEIGHT}",
+                    (10, HEIGHT-10), cv2.FONT_HERSHEY_SIMPLEX, 0.4, (255, 255, 255), 1)
+        view_dirty, frame_dirty = False, True
+
+    # 3. Active drawing, in screen coordinates on top of the cached view
+    if frame_dirty:
+        display_img = view
+        if current_points:
+            display_img = view.copy()
+            screen = [(int(px * scale + pan_x), int(py * scale + pan_y)) for px, py in current_points + [mouse_pos_raw]]
+            cv2.polylines(display_img, [np.array(screen[:-1], np.int32)], False, (0, 255, 255), 1)
+            cv2.line(display_img, screen[-2], screen[-1], (0, 255, 255), 1)
+        cv2.imshow("Picker 240x386", display_img)
+        frame_dirty = False
+
     key = cv2.waitKey(1)
     if key == ord('s'):
-        with open(pos_file, 'wb') as f:
-            pickle.dump(pos_list, f)
+        # Versioned layout with precomputed boxes, centroids and label mask
+        save_layout(pos_file, Layout(wing_id, pos_list, WIDTH, HEIGHT))
         print(f"Saved {len(pos_list)} slots to {pos_file}")
     elif key == ord('r'): # Reset View
         scale, pan_x, pan_y = 1.0, 0, 0
+        view_dirty = True
     elif key == ord('q'):
         break
 
@@ -0,0 +1,43 @@
+import cv2
+import os
+import time
+
+
+class Preview:
+    """Throttled, on-demand annotated preview written to a JPEG file.
+
+    Rendering only happens while somebody is watching: a viewer asks for
+    frames by touching `<path>.want` (e.g. `touch runtime/preview_W1.jpg.want`
+    or a page that polls the image). If the marker is older than
+    `demand_window` seconds, or missing, nothing is drawn or encoded. While
+    it is fresh, at most `max_fps` frames per second are written.
+    """
+
+    def __init__(self, path, max_fps=1.0, demand_window=30.0):
+        self.path = path
+        self.want_path = path + ".want"
+        self.min_interval = 1.0 / max_fps if max_fps > 0 else 0.0
+        self.demand_window = demand_window
+        self._last_write = 0.0
+        self._last_check = 0.0
+        self._demanded = False
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+    def wanted(self):
+        now = time.time()
+        if now - self._last_write < self.min_interval:
+            return False
+        # Stat the marker at most once a second
+        if now - self._last_check >= 1.0:
+            self._last_check = now
+            try:
+                self._demanded = now - os.path.getmtime(self.want_path) < self.demand_window
+            except OSError:
+                self._demanded = False
+        return self._demanded
+
+    def write(self, frame):
+        self._last_write = time.time()
+        tmp = self.path + ".tmp.jpg"
+        cv2.imwrite(tmp, frame, [cv2.IMWRITE_JPEG_QUALITY, 80])
+        os.replace(tmp, self.path) # Readers never see a half-written file
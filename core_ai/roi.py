@@ -0,0 +1,149 @@
+import numpy as np
+
+from backends import IOU_THRES, inference_shape
+from layout import HEIGHT, WIDTH
+from tracker import iou_matrix
+
+# AutoShape scales the full frame to 640 on its longest side; crops keep that scale (times zoom)
+FULL_SIZE = 640
+
+
+class SlotRegion:
+    """The part of the frame the model has to see: the union of the slot boxes plus a margin.
+
+    Only car centres inside a slot count, but the car around that centre
+    has to be visible, hence the margin. The region is optionally cut into
+    `tiles` strips along its longer side. They overlap by `overlap` pixels,
+    by default the largest slot extent along that side plus the margin, so
+    every car is whole in some tile. Each tile is scaled by the full
+    frame's scale times `zoom`, so zoom > 1 gives the model more pixels per
+    car than full-frame inference does. `size` overrides the resulting
+    longest side, e.g. to give several wings one common size to batch at.
+    """
+
+    def __init__(self, bboxes, width=WIDTH, height=HEIGHT, margin=24, tiles=1, overlap=None, zoom=1.0, size=None):
+        bboxes = np.asarray(bboxes).reshape(-1, 4)
+        self.width, self.height = width, height
+        if len(bboxes):
+            x0 = max(int(bboxes[:, 0].min()) - margin, 0)
+            y0 = max(int(bboxes[:, 1].min()) - margin, 0)
+            x1 = min(int((bboxes[:, 0] + bboxes[:, 2]).max()) + margin, width)
+            y1 = min(int((bboxes[:, 1] + bboxes[:, 3]).max()) + margin, height)
+        else:
+            x0, y0, x1, y1 = 0, 0, width, height
+        self.box = (x0, y0, x1, y1)
+
+        # Equal strips along the longer side, each overlapping the next
+        vertical = (y1 - y0) >= (x1 - x0)
+        if overlap is None:
+            overlap = int(bboxes[:, 3 if vertical else 2].max(initial=0)) + margin
+        start, stop = (y0, y1) if vertical else (x0, x1)
+        step = (stop - start - overlap) / tiles + overlap if tiles > 1 else stop - start
+        self.tiles = []
+        for i in range(tiles):
+            a = int(round(start + i * (step - overlap)))
+            b = min(int(round(a + step)), stop)
+            self.tiles.append((x0, a, x1, b) if vertical else (a, y0, b, y1))
+
+        tile_w = max(t[2] - t[0] for t in self.tiles)
+        tile_h = max(t[3] - t[1] for t in self.tiles)
+        self.size = size or int(round(max(tile_w, tile_h) * FULL_SIZE / max(width, height) * zoom))
+        self.shape = inference_shape(tile_w, tile_h, self.size)
+
+    @classmethod
+    def from_layout(cls, layout, **kwargs):
+        return cls(layout.bboxes, layout.width, layout.height, **kwargs)
+
+    def model_pixels(self):
+        """Pixels the model processes per frame (all tiles, after letterboxing)."""
+        return len(self.tiles) * self.shape[0] * self.shape[1]
+
+    def describe(self):
+        x0, y0, x1, y1 = self.box
+        full = inference_shape(self.width, self.height, FULL_SIZE)
+        return (f"ROI {x1 - x0}x{y1 - y0} at ({x0},{y0}) in {len(self.tiles)} tile(s) of "
+                f"{self.shape[1]}x{self.shape[0]}: {self.model_pixels():,} model pixels per frame "
+                f"vs {full[0] * full[1]:,} full frame")
+
+    def crops(self, frame):
+        return [frame[y0:y1, x0:x1] for x0, y0, x1, y1 in self.tiles]
+
+    def merge(self, detections):
+        """Per-tile detections -> one (n, 6) array in frame coordinates.
+
+        Boxes cut off by a seam between tiles are dropped (the car is whole
+        in the neighbouring tile). Cars seen whole in two tiles are
+        deduplicated with class-aware NMS.
+        """
+        boxes = []
+        for (x0, y0, x1, y1), dets in zip(self.tiles, detections):
+            dets = np.asarray(dets, np.float32).reshape(-1, 6).copy()
+            dets[:, [0, 2]] += x0
+            dets[:, [1, 3]] += y0
+            if len(self.tiles) > 1:
+                lo_x, lo_y, hi_x, hi_y = self._seams(x0, y0, x1, y1)
+                keep = ((dets[:, 0] > lo_x) & (dets[:, 1] > lo_y) & (dets[:, 2] < hi_x) & (dets[:, 3] < hi_y))
+                dets = dets[keep]
+            boxes.append(dets)
+        boxes = np.concatenate(boxes) if boxes else np.zeros((0, 6), np.float32)
+        return nms(boxes) if len(self.tiles) > 1 else boxes
+
+    def _seams(self, x0, y0, x1, y1, edge=1.0):
+        """Edges of a tile that are seams (inside the region), as limits a kept box must not touch."""
+        rx0, ry0, rx1, ry1 = self.box
+        return (x0 + edge if x0 > rx0 else -np.inf, y0 + edge if y0 > ry0 else -np.inf,
+                x1 - edge if x1 < rx1 else np.inf, y1 - edge if y1 < ry1 else np.inf)
+
+
+def nms(dets, iou_thres=IOU_THRES):
+    """Greedy class-aware NMS over (n, 6) xyxy/conf/cls rows (highest confidence wins)."""
+    order = np.argsort(-dets[:, 4], kind='stable')
+    dets = dets[order]
+    iou = iou_matrix(dets, dets)
+    same_class = dets[:, 5, None] == dets[None, :, 5]
+    keep = np.ones(len(dets), bool)
+    for i in range(len(dets)):
+        if keep[i]:
+            keep[i + 1:] &= ~((iou[i, i + 1:] > iou_thres) & same_class[i, i + 1:])
+    return dets[keep]
+
+
+class RoiBackend:
+    """Wraps an inference backend: runs it on the SlotRegion tiles, returns boxes in frame coordinates.
+
+    Same call interface as the backends, so the detector loop doesn't change.
+    For the ONNX backend, load it with shape=region.shape.
+    """
+
+    def __init__(self, model, region):
+        self.model = model
+        self.region = region
+        self.name = f"{getattr(model, 'name', 'model')}+roi"
+
+    def __call__(self, frames, size=None):
+        n = len(self.region.tiles)
+        crops = [crop for frame in frames for crop in self.region.crops(frame)]
+        detections = self.model(crops, size=self.region.size)
+        return [self.region.merge(detections[i * n:(i + 1) * n]) for i in range(len(frames))]
+
+
+def infer_regions(models, frames, regions):
+    """Detections in frame coordinates for frames that each have their own SlotRegion (engine.py).
+
+    `models` maps region.shape to the backend to use: the same torch model
+    for every shape, or an ONNX session exported at each shape. Regions
+    that use the same backend at the same size share one batched call.
+    """
+    groups = {}
+    for i, region in enumerate(regions):
+        groups.setdefault((id(models[region.shape]), region.size), []).append(i)
+    results = [None] * len(frames)
+    for (_, size), members in groups.items():
+        crops = [crop for i in members for crop in regions[i].crops(frames[i])]
+        detections = models[regions[members[0]].shape](crops, size=size)
+        start = 0
+        for i in members:
+            n = len(regions[i].tiles)
+            results[i] = regions[i].merge(detections[start:start + n])
+            start += n
+    return results
@@ -0,0 +1,175 @@
+import threading
+import time
+from collections import deque, namedtuple
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+# What every dashboard session reads. All fields are replaced (never mutated)
+# on refresh, so a session can keep using the snapshot it got.
+# `version` goes up on every change, pushed or polled.
+Snapshot = namedtuple('Snapshot', ['slots', 'wings', 'counts', 'synced_at', 'version'])
+
+
+class SlotCache:
+    """Shared, TTL-cached view of the `slots` table for all dashboard sessions.
+
+    One instance is shared by every browser session (via st.cache_resource).
+    At most one query is made per `ttl` seconds, however many sessions are
+    reading. After the first full load only rows with `updated_at` at most
+    `lag` seconds before the newest value already seen are fetched. Each
+    detector stamps updated_at with its own clock before its write commits,
+    so a write can land behind the cursor: the lag window re-reads those, and
+    a full resync every `resync_every` seconds (and after invalidate())
+    catches anything older. Per-wing counts and per-wing sorted frames are
+    kept up to date so the page doesn't rescan the whole table.
+
+    If the table has no `updated_at` column, every refresh is a full select
+    (still shared by all sessions).
+
+    Slot-change events from the event bus can be pushed in with apply(). Only
+    the affected wing is rebuilt, and no query is made. While events are
+    arriving, pass a longer ttl to get(): polling is then only a safety net.
+    """
+
+    def __init__(self, client, ttl=3.0, lag=30.0, resync_every=300.0):
+        self.client = client
+        self.ttl = ttl
+        self.lag = lag
+        self.resync_every = resync_every
+        self._lock = threading.Lock()
+        self._rows = {}             # wing_id -> {slot_id: row}
+        self._cursor = None         # Newest updated_at seen
+        self._incremental = True
+        self._last_sync = 0.0
+        self._last_full = 0.0
+        self._snapshot = Snapshot(pd.DataFrame(), {}, {}, None, 0)
+        self._event_times = deque(maxlen=1000)   # (version, t_pub) of pushed events
+
+        # Reporting
+        self.reads = 0
+        self.queries = 0
+        self.rows_fetched = 0
+        self.events_applied = 0
+
+    def get(self, ttl=None):
+        """Current snapshot, refreshed first if it is older than the TTL."""
+        ttl = self.ttl if ttl is None else ttl
+        with self._lock:
+            self.reads += 1
+            if time.monotonic() - self._last_sync >= ttl:
+                try:
+                    self._refresh()
+                except Exception as e:
+                    print(f"Error reading Supabase: {e}")
+                self._last_sync = time.monotonic()
+            return self._snapshot
+
+    def apply(self, event):
+        """Apply one slot-change event from the bus (see event_bus.py) without a query."""
+        with self._lock:
+            if self._snapshot.synced_at is None:
+                return      # Not loaded yet; the first refresh will include this change
+            wing = self._rows.setdefault(event['wing_id'], {})
+            row = dict(wing.get(event['slot_id'], {'wing_id': event['wing_id'], 'slot_id': event['slot_id']}))
+            row['status'] = event['status']
+            row['start_time'] = event.get('at') if event['status'] == 'Occupied' else None
+            wing[event['slot_id']] = row
+            self.events_applied += 1
+            self._publish({event['wing_id']})
+            self._event_times.append((self._snapshot.version, event.get('t_pub')))
+
+    def invalidate(self):
+        """Fully reload from the database on the next get(), e.g. after the bus reconnects."""
+        with self._lock:
+            self._last_sync = 0.0
+            self._cursor = None
+
+    def event_latencies(self, since_version):
+        """Seconds from publish to now for the pushed events a session hasn't shown yet."""
+        now = time.time()
+        with self._lock:
+            return [now - t for v, t in self._event_times if v > since_version and t is not None]
+
+    def stats(self):
+        return {
+            'reads': self.reads,
+            'queries': self.queries,
+            'queries_saved': self.reads - self.queries,
+            'rows_fetched': self.rows_fetched,
+            'incremental': self._incremental,
+            'events_applied': self.events_applied,
+        }
+
+    def _refresh(self):
+        full = self._cursor is None or time.monotonic() - self._last_full >= self.resync_every
+        query = self.client.table('slots').select('*')
+        if not full:
+            query = query.gte('updated_at', _seconds_before(self._cursor, self.lag))
+        rows = query.execute().data
+        self.queries += 1
+        self.rows_fetched += len(rows)
+
+        if full:
+            # First sync, periodic resync, or every sync when there is no updated_at column
+            self._last_full = time.monotonic()
+            new_rows = {}
+            for row in rows:
+                held = self._rows.get(row['wing_id'], {}).get(row['slot_id'])
+                if held is not None and row.get('updated_at') is not None \
+                        and held.get('updated_at') == row['updated_at']:
+                    row = held  # Same database version; may hold a newer pushed event
+                new_rows.setdefault(row['wing_id'], {})[row['slot_id']] = row
+            changed = {w for w in new_rows.keys() | self._rows.keys() if new_rows.get(w) != self._rows.get(w)}
+            self._rows = new_rows
+            self._incremental = bool(rows) and all('updated_at' in r for r in rows)
+        else:
+            changed = set()
+            for row in rows:
+                wing = self._rows.setdefault(row['wing_id'], {})
+                held = wing.get(row['slot_id'])
+                if held is not None and held.get('updated_at') == row['updated_at']:
+                    continue    # Same database version (re-read in the lag window); may hold a newer pushed event
+                if held != row:
+                    wing[row['slot_id']] = row
+                    changed.add(row['wing_id'])
+
+        if self._incremental:
+            newest = max((r['updated_at'] for r in rows if r.get('updated_at')), default=None)
+            if newest is not None and (self._cursor is None or newest > self._cursor):
+                self._cursor = newest
+
+        if not changed and self._snapshot.synced_at is not None:
+            return
+        self._publish(changed)
+
+    def _publish(self, changed):
+        # Rebuild only the wings that changed; keep the others as they were
+        wings = dict(self._snapshot.wings)
+        counts = dict(self._snapshot.counts)
+        for wing in changed:
+            if wing not in self._rows:
+                wings.pop(wing, None)
+                counts.pop(wing, None)
+                continue
+            df = pd.DataFrame(list(self._rows[wing].values())).sort_values(by='slot_id').reset_index(drop=True)
+            wings[wing] = df
+            counts[wing] = {'total': len(df), 'occupied': int((df['status'] == 'Occupied').sum())}
+
+        slots = pd.concat([wings[w] for w in sorted(wings)], ignore_index=True) if wings else pd.DataFrame()
+        self._snapshot = Snapshot(slots, wings, counts, time.time(), self._snapshot.version + 1)
+
+
+def _seconds_before(stamp, seconds):
+    """An ISO timestamp `seconds` earlier (the stamp itself if it doesn't parse)."""
+    try:
+        return (datetime.fromisoformat(stamp) - timedelta(seconds=seconds)).isoformat(timespec='microseconds')
+    except (TypeError, ValueError):
+        return stamp
+
+
+def totals(counts):
+    """(total, occupied) over all wings from the precomputed per-wing counts."""
+    total = sum(c['total'] for c in counts.values())
+    occupied = sum(c['occupied'] for c in counts.values())
+    return total, occupied
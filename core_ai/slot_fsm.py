@@ -0,0 +1,76 @@
+import os
+import time
+
+import numpy as np
+
+
+class SlotFSM:
+    """Occupancy hysteresis for every slot of a wing, kept as NumPy arrays.
+
+    counts:   FSM counter per slot, in [-frames_to_vacate, frames_to_occupy]
+    occupied: confirmed state per slot (True = Occupied, False = Vacant)
+
+    update() steps every slot at once from one boolean observation vector and
+    returns only the indices whose confirmed state flipped.
+    """
+
+    def __init__(self, num_slots, frames_to_occupy, frames_to_vacate):
+        self.frames_to_occupy = frames_to_occupy
+        self.frames_to_vacate = frames_to_vacate
+        self.counts = np.zeros(num_slots, np.int16)
+        self.occupied = np.zeros(num_slots, bool)
+
+    def __len__(self):
+        return len(self.counts)
+
+    def update(self, occupied_now):
+        occupied_now = np.asarray(occupied_now, bool)
+
+        self.counts = np.where(occupied_now,
+                               np.minimum(self.counts + 1, self.frames_to_occupy),
+                               np.maximum(self.counts - 1, -self.frames_to_vacate)).astype(np.int16)
+
+        confirmed = self.occupied.copy()
+        confirmed[occupied_now & (self.counts >= self.frames_to_occupy)] = True
+        confirmed[~occupied_now & (self.counts <= -self.frames_to_vacate)] = False
+
+        changed = np.flatnonzero(confirmed != self.occupied)
+        self.occupied = confirmed
+        return changed
+
+    def status(self, i):
+        return "Occupied" if self.occupied[i] else "Vacant"
+
+    def save(self, path):
+        """Checkpoint counters and confirmed states (atomically) to an .npz file."""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp = path + ".tmp.npz"
+        np.savez(tmp, counts=self.counts, occupied=self.occupied, saved_at=np.array(time.time()))
+        os.replace(tmp, path)
+
+    def restore(self, path):
+        """Load a checkpoint written by save(). Returns its age in seconds, or None if there is none.
+
+        A checkpoint for a different number of slots (the layout was redrawn)
+        or with out-of-range counters is ignored.
+        """
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                counts, occupied, saved_at = data['counts'], data['occupied'], float(data['saved_at'])
+        except (OSError, KeyError, ValueError) as e:
+            print(f"Warning: could not read {path} ({e}); ignoring it")
+            return None
+        if counts.shape != self.counts.shape or occupied.shape != self.occupied.shape \
+                or counts.min(initial=0) < -self.frames_to_vacate or counts.max(initial=0) > self.frames_to_occupy:
+            print(f"Warning: {path} does not match this layout; ignoring it")
+            return None
+        self.counts = counts.astype(np.int16)
+        self.occupied = occupied.astype(bool)
+        return time.time() - saved_at
+
+    def adopt(self, occupied):
+        """Take confirmed states from elsewhere (the database), counters at the matching threshold."""
+        self.occupied = np.asarray(occupied, bool).copy()
+        self.counts = np.where(self.occupied, self.frames_to_occupy, 0).astype(np.int16)
@@ -0,0 +1,139 @@
+import cv2
+import time
+import numpy as np
+
+from layout import HEIGHT, WIDTH
+
+
+class SlotMask:
+    """Integer label image of the slot polygons for O(detections) slot matching.
+
+    Every pixel of the working frame holds a label. Label 0 means "no slot".
+    Any other label is a row of `members`, a (labels x slots) boolean table
+    saying which slots cover that pixel. Pixels covered by several
+    overlapping polygons get their own label whose row marks *all* of those
+    slots, so a car centre in an overlap occupies every slot it falls in -
+    the same answer the per-polygon cv2.pointPolygonTest loop gives.
+    """
+
+    def __init__(self, pos_list, width=WIDTH, height=HEIGHT):
+        self.width, self.height = width, height
+        self.num_slots = len(pos_list)
+        self.mask = np.zeros((height, width), np.int32)
+
+        groups = [frozenset()]          # label -> set of slot indices
+        group_ids = {frozenset(): 0}
+
+        for i, pts in enumerate(pos_list):
+            ys, xs = self._rasterise(np.array(pts, np.int32))
+            if len(xs) == 0:
+                continue
+
+            # Re-label the covered pixels: old group + this slot
+            old_labels = self.mask[ys, xs]
+            new_labels = np.empty_like(old_labels)
+            for label in np.unique(old_labels):
+                group = groups[label] | {i}
+                if group not in group_ids:
+                    group_ids[group] = len(groups)
+                    groups.append(group)
+                new_labels[old_labels == label] = group_ids[group]
+            self.mask[ys, xs] = new_labels
+
+        self.members = np.zeros((len(groups), self.num_slots), bool)
+        for label, group in enumerate(groups):
+            self.members[label, list(group)] = True
+
+    @classmethod
+    def from_arrays(cls, mask, members):
+        """Rebuild a SlotMask from a precomputed label image and membership table (see layout.py)."""
+        self = cls.__new__(cls)
+        self.height, self.width = mask.shape
+        self.num_slots = members.shape[1]
+        self.mask = mask.astype(np.int32, copy=False)
+        self.members = members.astype(bool, copy=False)
+        return self
+
+    def _rasterise(self, pts):
+        """Pixels inside (or on the edge of) one polygon, using the same test as the detector loop."""
+        x, y, w, h = cv2.boundingRect(pts)
+        x0, y0 = max(x, 0), max(y, 0)
+        x1, y1 = min(x + w, self.width), min(y + h, self.height)
+
+        ys, xs = [], []
+        for y in range(y0, y1):
+            for x in range(x0, x1):
+                if cv2.pointPolygonTest(pts, (x, y), False) >= 0:
+                    ys.append(y)
+                    xs.append(x)
+        return np.array(ys, np.intp), np.array(xs, np.intp)
+
+    def occupancy(self, detections):
+        """Boolean vector (one per slot): does any detection centre fall inside the slot?"""
+        detections = np.asarray(detections, np.float64).reshape(-1, 6)
+        if len(detections) == 0:
+            return np.zeros(self.num_slots, bool)
+
+        # Same centre rounding as int((xmin + xmax) / 2)
+        cx = np.trunc((detections[:, 0] + detections[:, 2]) / 2).astype(np.intp)
+        cy = np.trunc((detections[:, 1] + detections[:, 3]) / 2).astype(np.intp)
+
+        inside = (cx >= 0) & (cx < self.width) & (cy >= 0) & (cy < self.height)
+        labels = self.mask[cy[inside], cx[inside]]
+        return self.members[labels].any(axis=0)
+
+
+# ==========================================
+# MICRO-BENCHMARK: python slot_mask.py
+# ==========================================
+def _per_polygon_occupancy(pos_list, detections):
+    """The original O(slots x detections) loop, kept as the reference."""
+    result = []
+    for pts in pos_list:
+        is_occupied_now = False
+        for det in detections:
+            xmin, ymin, xmax, ymax, conf, cls = det
+            cx, cy = int((xmin + xmax) / 2), int((ymin + ymax) / 2)
+            if cv2.pointPolygonTest(np.array(pts, np.int32), (cx, cy), False) >= 0:
+                is_occupied_now = True
+                break
+        result.append(is_occupied_now)
+    return np.array(result, bool)
+
+
+def _synthetic_layout(num_slots, rng):
+    """Slanted quads scattered over the frame; some overlap on purpose."""
+    pos_list = []
+    for _ in range(num_slots):
+        x, y = int(rng.integers(0, WIDTH - 30)), int(rng.integers(0, HEIGHT - 20))
+        w, h, skew = int(rng.integers(12, 30)), int(rng.integers(8, 20)), int(rng.integers(-4, 5))
+        pos_list.append([(x, y), (x + w, y + skew), (x + w, y + h + skew), (x, y + h), (x, y + 2)])
+    return pos_list
+
+
+if __name__ == '__main__':
+    rng = np.random.default_rng(0)
+    frames = 200
+
+    print(f"{'slots':>6} {'per-polygon ms':>15} {'label mask ms':>14} {'speedup':>8}")
+    for num_slots in (10, 30, 100, 300):
+        pos_list = _synthetic_layout(num_slots, rng)
+        slot_mask = SlotMask(pos_list)
+
+        batches = []
+        for _ in range(frames):
+            n = int(rng.integers(0, num_slots + 1))
+            x0 = rng.uniform(0, WIDTH - 20, n)
+            y0 = rng.uniform(0, HEIGHT - 20, n)
+            batches.append(np.stack([x0, y0, x0 + 20, y0 + 16, np.full(n, 0.9), np.zeros(n)], axis=1))
+
+        t0 = time.perf_counter()
+        expected = [_per_polygon_occupancy(pos_list, dets) for dets in batches]
+        t_old = (time.perf_counter() - t0) / frames * 1000
+
+        t0 = time.perf_counter()
+        actual = [slot_mask.occupancy(dets) for dets in batches]
+        t_new = (time.perf_counter() - t0) / frames * 1000
+
+        assert all((a == e).all() for a, e in zip(actual, expected)), "label mask disagrees with pointPolygonTest"
+        print(f"{num_slots:>6} {t_old:>15.3f} {t_new:>14.3f} {t_old / t_new:>7.1f}x")
@@ -0,0 +1,146 @@
+import os
+import subprocess
+import time
+
+# Ready files live next to the other runtime state
+RUNTIME_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'runtime')
+
+
+def ready_path(name):
+    return os.path.join(RUNTIME_DIR, f'ready_{name}')
+
+
+def mark_ready(name):
+    """Called by a worker once its model and layout are loaded."""
+    os.makedirs(RUNTIME_DIR, exist_ok=True)
+    with open(ready_path(name), 'w') as f:
+        f.write(str(os.getpid()))
+
+
+def clear_ready(name):
+    try:
+        os.remove(ready_path(name))
+    except FileNotFoundError:
+        pass
+
+
+def is_ready(name, pid):
+    """True if the ready file exists and was written by process `pid` (not a stale one)."""
+    try:
+        with open(ready_path(name)) as f:
+            return f.read().strip() == str(pid)
+    except OSError:
+        return False
+
+
+def available_cores():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+class Worker:
+    def __init__(self, name, cmd):
+        self.name = name
+        self.cmd = cmd
+        self.process = None
+        self.state = 'pending'      # pending -> loading -> ready; crashed -> (backoff) -> pending; finished
+        self.started_at = 0.0
+        self.ready_at = 0.0
+        self.restart_at = 0.0
+        self.restarts = 0
+        self.backoff = 0.0
+
+
+class Supervisor:
+    """Starts worker processes, waits for them to report ready, and restarts them if they crash.
+
+    At most `max_loading` workers load their model at the same time
+    (default: one per available core). A worker counts as ready once it has
+    written runtime/ready_<name> with its own PID (see mark_ready()). Crashed
+    workers (non-zero exit code or killed by a signal) are restarted after an
+    exponential backoff that resets once a worker has stayed up for
+    `stable_after` seconds. A worker that exits with code 0 (e.g. 'q' pressed
+    in a detector window, a one-shot job) is finished and stays down.
+    """
+
+    def __init__(self, workers, max_loading=None, max_backoff=60.0, stable_after=60.0, name='manager'):
+        self.workers = [Worker(n, cmd) for n, cmd in workers]
+        self.max_loading = max_loading or available_cores()
+        self.max_backoff = max_backoff
+        self.stable_after = stable_after
+        self.name = name
+        self.t_start = time.perf_counter()
+        self.all_ready_logged = False
+
+    def _start(self, w):
+        clear_ready(w.name)
+        w.process = subprocess.Popen(w.cmd)
+        w.state = 'loading'
+        w.started_at = time.perf_counter()
+        print(f"[SUPERVISOR] Started {w.name} (pid {w.process.pid})")
+
+    def poll(self):
+        now = time.perf_counter()
+
+        for w in self.workers:
+            if w.state in ('loading', 'ready') and w.process.poll() is not None:
+                code = w.process.returncode
+                clear_ready(w.name)
+                if code == 0:
+                    w.state = 'finished'
+                    print(f"[SUPERVISOR] {w.name} finished")
+                    continue
+                if w.state == 'ready' and now - w.ready_at >= self.stable_after:
+                    w.backoff = 0.0
+                w.backoff = min(max(w.backoff * 2, 1.0), self.max_backoff)
+                w.state, w.restart_at = 'crashed', now + w.backoff
+                w.restarts += 1
+                print(f"[SUPERVISOR] {w.name} exited with code {code}; restarting in {w.backoff:.0f}s")
+            elif w.state == 'loading' and is_ready(w.name, w.process.pid):
+                w.state, w.ready_at = 'ready', now
+                print(f"[SUPERVISOR] {w.name} ready in {now - w.started_at:.1f}s")
+            elif w.state == 'crashed' and now >= w.restart_at:
+                w.state = 'pending'
+
+        # Bounded parallel start: only as many loading at once as we have cores
+        loading = sum(w.state == 'loading' for w in self.workers)
+        for w in self.workers:
+            if w.state == 'pending' and loading < self.max_loading:
+                self._start(w)
+                loading += 1
+
+        if all(w.state in ('ready', 'finished') for w in self.workers):
+            if not self.all_ready_logged:
+                print(f"[SUPERVISOR] All {len(self.workers)} workers ready in {now - self.t_start:.1f}s "
+                      f"(up to {self.max_loading} loading at once)")
+                self.all_ready_logged = True
+                mark_ready(self.name)
+        elif self.all_ready_logged:
+            self.all_ready_logged = False
+            clear_ready(self.name)
+
+    def run(self, interval=0.2):
+        try:
+            while not all(w.state == 'finished' for w in self.workers):
+                self.poll()
+                time.sleep(interval)
+            print("[SUPERVISOR] All workers finished")
+        finally:
+            self.shutdown()
+
+    def shutdown(self, timeout=10.0):
+        print("\n[SUPERVISOR] Shutting down all workers...")
+        clear_ready(self.name)
+        running = [w for w in self.workers if w.process is not None and w.process.poll() is None]
+        for w in running:
+            w.process.terminate()
+        deadline = time.perf_counter() + timeout
+        for w in running:
+            try:
+                w.process.wait(max(0.0, deadline - time.perf_counter()))
+            except subprocess.TimeoutExpired:
+                print(f"[SUPERVISOR] {w.name} did not stop; killing it")
+                w.process.kill()
+            clear_ready(w.name)
@@ -0,0 +1,147 @@
+import math
+import os
+import time
+
+import cv2
+import numpy as np
+
+from layout import HEIGHT, WIDTH, Layout, save_layout
+
+# ==========================================
+# SYNTHETIC PARKING LOT (benchmarks, offline tests)
+# ==========================================
+# A top-down lot at the detector's working size: grey asphalt, white slot
+# outlines, and cars drawn as saturated rectangles inside their slots. The
+# matching layout is written next to the video, and ColorBlobDetector finds
+# the cars again without the YOLO weights, so the whole pipeline can be
+# benchmarked on any machine.
+
+
+def make_slots(num_slots, width=WIDTH, height=HEIGHT, margin=6, aisle=14, rng=None):
+    """Rows of perpendicular slots (about 1:2), with an aisle after every second row."""
+    rng = rng or np.random.default_rng(0)
+    cols = max(1, math.ceil(math.sqrt(num_slots * width / height * 2)))
+    rows = math.ceil(num_slots / cols)
+    aisles = (rows - 1) // 2
+    slot_w = (width - 2 * margin) / cols
+    slot_h = min(2 * slot_w, (height - 2 * margin - aisles * aisle) / rows)
+
+    pos_list = []
+    for i in range(num_slots):
+        r, c = divmod(i, cols)
+        x0 = margin + c * slot_w
+        y0 = margin + r * slot_h + (r // 2) * aisle
+        skew = rng.uniform(-0.08, 0.08) * slot_w   # Slight perspective, like a hand-drawn layout
+        pos_list.append([(int(x0 + skew), int(y0)), (int(x0 + slot_w + skew), int(y0)),
+                         (int(x0 + slot_w), int(y0 + slot_h)), (int(x0), int(y0 + slot_h))])
+    return pos_list
+
+
+class SyntheticLot:
+    """Slot occupancy over time plus the frames that show it.
+
+    `cars` is the number of parked cars the lot hovers around. `churn` is
+    the fraction of slots that change state per minute. Each change is a car
+    leaving or arriving, chosen so the occupancy stays near `cars`.
+    """
+
+    def __init__(self, num_slots=30, cars=20, churn=0.1, fps=30.0, seed=0):
+        self.rng = np.random.default_rng(seed)
+        self.pos_list = make_slots(num_slots, rng=self.rng)
+        self.num_slots = num_slots
+        self.target = min(cars, num_slots)
+        self.churn = churn
+        self.fps = fps
+
+        self.occupied = np.zeros(num_slots, bool)
+        self.occupied[self.rng.choice(num_slots, self.target, replace=False)] = True
+        self.colors = self.rng.integers(0, 180, num_slots)   # Hue of the car in each slot
+
+        self.background = self._background()
+
+    def _background(self):
+        noise = self.rng.normal(0, 6, (HEIGHT, WIDTH)).astype(np.float32)
+        gray = np.clip(95 + cv2.GaussianBlur(noise, (5, 5), 0), 0, 255).astype(np.uint8)
+        frame = cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR)
+        for pts in self.pos_list:
+            cv2.polylines(frame, [np.array(pts, np.int32)], True, (235, 235, 235), 1)
+        return frame
+
+    def step(self):
+        """Advance one frame; returns the slots that changed."""
+        changed = []
+        for _ in range(self.rng.poisson(self.churn * self.num_slots / (60.0 * self.fps))):
+            count = int(self.occupied.sum())
+            leave = count > self.target or (count == self.target and self.rng.random() < 0.5)
+            candidates = np.flatnonzero(self.occupied if leave else ~self.occupied)
+            if not len(candidates):
+                continue
+            i = int(self.rng.choice(candidates))
+            self.occupied[i] = not leave
+            if not leave:
+                self.colors[i] = self.rng.integers(0, 180)
+            changed.append(i)
+        return changed
+
+    def car_boxes(self):
+        """Ground-truth boxes (xmin, ymin, xmax, ymax, conf, cls) of the parked cars."""
+        boxes = []
+        for i in np.flatnonzero(self.occupied):
+            x, y, w, h = cv2.boundingRect(np.array(self.pos_list[i], np.int32))
+            dx, dy = int(w * 0.18), int(h * 0.12)
+            boxes.append((x + dx, y + dy, x + w - dx, y + h - dy, 1.0, 0.0))
+        return np.array(boxes, np.float32).reshape(-1, 6)
+
+    def render(self):
+        frame = self.background.copy()
+        for i, (x1, y1, x2, y2) in zip(np.flatnonzero(self.occupied), self.car_boxes()[:, :4].astype(int)):
+            hsv = np.uint8([[[self.colors[i], 200, 200]]])
+            color = tuple(int(v) for v in cv2.cvtColor(hsv, cv2.COLOR_HSV2BGR)[0, 0])
+            cv2.rectangle(frame, (x1, y1), (x2, y2), color, -1)
+            cv2.rectangle(frame, (x1 + 3, y1 + (y2 - y1) // 4), (x2 - 3, y1 + (y2 - y1) // 2), (40, 40, 40), -1)
+        return frame
+
+    def write(self, directory, wing_id, seconds):
+        """Write <wing_id>.mp4 (or .avi) and <wing_id>.npz; returns (video path, ground-truth changes)."""
+        os.makedirs(directory, exist_ok=True)
+        save_layout(os.path.join(directory, f'{wing_id}.npz'), Layout(wing_id, self.pos_list, WIDTH, HEIGHT))
+
+        path = os.path.join(directory, f'{wing_id}.mp4')
+        writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), self.fps, (WIDTH, HEIGHT))
+        if not writer.isOpened():  # OpenCV builds without an MP4 encoder
+            path = os.path.join(directory, f'{wing_id}.avi')
+            writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), self.fps, (WIDTH, HEIGHT))
+
+        changes = []
+        for frame_index in range(int(seconds * self.fps)):
+            changes += [(frame_index, i, bool(self.occupied[i])) for i in self.step()]
+            writer.write(self.render())
+        writer.release()
+        return path, changes
+
+
+class ColorBlobDetector:
+    """Stand-in for the model on synthetic footage: saturated blobs are cars.
+
+    `infer_ms` adds a fixed delay per frame to mimic a real model's cost.
+    """
+
+    name = 'synthetic'
+
+    def __init__(self, min_area=40, infer_ms=0.0):
+        self.min_area = min_area
+        self.delay = infer_ms / 1000.0
+        self.kernel = np.ones((3, 3), np.uint8)
+
+    def __call__(self, frames):
+        detections = []
+        for frame in frames:
+            hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
+            mask = cv2.morphologyEx(cv2.inRange(hsv, (0, 100, 60), (180, 255, 255)), cv2.MORPH_OPEN, self.kernel)
+            n, _, stats, _ = cv2.connectedComponentsWithStats(mask)
+            keep = stats[1:, cv2.CC_STAT_AREA] >= self.min_area
+            x, y, w, h = stats[1:][keep, :4].T
+            detections.append(np.stack([x, y, x + w, y + h, np.ones_like(x), np.zeros_like(x)], 1).astype(np.float32))
+        if self.delay:
+            time.sleep(self.delay * len(frames))
+        return detections
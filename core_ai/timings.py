@@ -0,0 +1,65 @@
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from metrics import REGISTRY
+
+
+class StageTimer:
+    """Per-stage wall-clock timings for one wing, printed as a summary every few seconds.
+
+    Stages are free-form names ('decode', 'infer', 'latency', ...). The
+    capture thread and the main loop both record into the same timer.
+    Every sample also lands in the parking_stage_seconds histogram that
+    metrics.py exports.
+    """
+
+    def __init__(self, name, report_every=10.0):
+        self.name = name
+        self.report_every = report_every
+        self._samples = defaultdict(list)
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._last_report = time.perf_counter()
+
+    @contextmanager
+    def stage(self, stage):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - t0)
+
+    def add(self, stage, seconds):
+        with self._lock:
+            self._samples[stage].append(seconds)
+            histogram = self._histograms.get(stage)
+            if histogram is None:
+                histogram = self._histograms[stage] = REGISTRY.histogram(
+                    'parking_stage_seconds', wing=self.name, stage=stage)
+            histogram.observe(seconds)
+
+    def summary(self, reset=True):
+        """{stage: {'count', 'avg_ms', 'max_ms'}} for the samples since the last reset."""
+        with self._lock:
+            samples = self._samples
+            if reset:
+                self._samples = defaultdict(list)
+        return {
+            stage: {
+                'count': len(values),
+                'avg_ms': round(sum(values) / len(values) * 1000, 2),
+                'max_ms': round(max(values) * 1000, 2),
+            }
+            for stage, values in samples.items() if values
+        }
+
+    def maybe_report(self, extra=""):
+        now = time.perf_counter()
+        if now - self._last_report < self.report_every:
+            return
+        elapsed, self._last_report = now - self._last_report, now
+        parts = [f"{stage} {s['avg_ms']:.1f}/{s['max_ms']:.1f}ms x{s['count'] / elapsed:.1f}/s"
+                 for stage, s in sorted(self.summary().items())]
+        print(f"[{self.name}] Timings (avg/max): " + " | ".join(parts) + (f" | {extra}" if extra else ""))
@@ -0,0 +1,130 @@
+import numpy as np
+
+try:
+    from scipy.optimize import linear_sum_assignment
+except ImportError:  # scipy is optional; greedy matching is fine for parked cars
+    linear_sum_assignment = None
+
+
+def iou_matrix(a, b):
+    """IoU between every box in a (n, 4+) and b (m, 4+), xyxy."""
+    if not len(a) or not len(b):
+        return np.zeros((len(a), len(b)))
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / (area_a[:, None] + area_b[None, :] - inter + 1e-9)
+
+
+def _to_z(box):
+    """xyxy -> [cx, cy, area, aspect] (SORT measurement)."""
+    w, h = box[2] - box[0], box[3] - box[1]
+    return np.array([box[0] + w / 2, box[1] + h / 2, w * h, w / max(h, 1e-6)])
+
+
+def _to_box(x):
+    area, aspect = max(x[2], 1e-6), max(x[3], 1e-6)
+    w = np.sqrt(area * aspect)
+    h = area / w
+    return np.array([x[0] - w / 2, x[1] - h / 2, x[0] + w / 2, x[1] + h / 2])
+
+
+class _KalmanTrack:
+    """Constant-velocity Kalman filter over [cx, cy, area, aspect, vx, vy, varea] (as in SORT)."""
+
+    F = np.eye(7)
+    F[0, 4] = F[1, 5] = F[2, 6] = 1.0
+    H = np.eye(4, 7)
+    R = np.diag([1.0, 1.0, 10.0, 10.0])
+    Q = np.diag([1.0, 1.0, 1.0, 1.0, 0.01, 0.01, 0.0001])
+
+    def __init__(self, det):
+        self.x = np.zeros(7)
+        self.x[:4] = _to_z(det)
+        self.P = np.diag([10.0, 10.0, 10.0, 10.0, 1e4, 1e4, 1e4])
+        self.conf, self.cls = float(det[4]), float(det[5])
+        self.hits = 1
+        self.misses = 0       # Consecutive keyframes without a matching detection
+
+    def predict(self):
+        if self.x[2] + self.x[6] <= 0:
+            self.x[6] = 0.0
+        self.x = self.F @ self.x
+        self.P = self.F @ self.P @ self.F.T + self.Q
+
+    def update(self, det):
+        y = _to_z(det) - self.H @ self.x
+        S = self.H @ self.P @ self.H.T + self.R
+        K = self.P @ self.H.T @ np.linalg.inv(S)
+        self.x = self.x + K @ y
+        self.P = (np.eye(7) - K @ self.H) @ self.P
+        self.conf, self.cls = float(det[4]), float(det[5])
+        self.hits += 1
+        self.misses = 0
+
+    def box(self):
+        return _to_box(self.x)
+
+
+class BoxTracker:
+    """SORT-style tracker that carries car boxes between detector keyframes.
+
+    predict() advances every track by one observed frame and returns the
+    current boxes without running the model. update(detections) does the
+    same, then associates the keyframe's detections with the tracks by IoU.
+    A track that goes unmatched for more than `max_misses` keyframes is
+    dropped. Output rows match the detector's: xmin, ymin, xmax, ymax, conf, cls.
+    """
+
+    def __init__(self, iou_threshold=0.3, max_misses=2, min_hits=1):
+        self.iou_threshold = iou_threshold
+        self.max_misses = max_misses
+        self.min_hits = min_hits
+        self.tracks = []
+
+    def _boxes(self):
+        rows = [np.r_[t.box(), t.conf, t.cls] for t in self.tracks if t.hits >= self.min_hits]
+        return np.array(rows, np.float32).reshape(-1, 6)
+
+    def predict(self):
+        for t in self.tracks:
+            t.predict()
+        return self._boxes()
+
+    def update(self, detections):
+        detections = np.asarray(detections, np.float64).reshape(-1, 6)
+        for t in self.tracks:
+            t.predict()
+
+        predicted = np.array([t.box() for t in self.tracks]).reshape(-1, 4)
+        iou = iou_matrix(predicted, detections)
+        matches = self._associate(iou)
+
+        matched_tracks = {ti for ti, _ in matches}
+        matched_dets = {di for _, di in matches}
+        for ti, di in matches:
+            self.tracks[ti].update(detections[di])
+        for ti, t in enumerate(self.tracks):
+            if ti not in matched_tracks:
+                t.misses += 1
+        self.tracks = [t for t in self.tracks if t.misses <= self.max_misses]
+        self.tracks += [_KalmanTrack(d) for di, d in enumerate(detections) if di not in matched_dets]
+        return self._boxes()
+
+    def _associate(self, iou):
+        if not iou.size:
+            return []
+        if linear_sum_assignment is not None:
+            rows, cols = linear_sum_assignment(-iou)
+            return [(r, c) for r, c in zip(rows, cols) if iou[r, c] >= self.iou_threshold]
+
+        matches, iou = [], iou.copy()
+        while iou.max() >= self.iou_threshold:
+            r, c = np.unravel_index(iou.argmax(), iou.shape)
+            matches.append((r, c))
+            iou[r, :], iou[:, c] = -1, -1
+        return matches
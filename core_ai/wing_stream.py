@@ -0,0 +1,282 @@
+import cv2
+import os
+import time
+import numpy as np
+from datetime import datetime
+
+from capture import FrameGrabber
+from entry_times import EntryTimes
+from layout import HEIGHT, WIDTH, load_layout
+from metrics import REGISTRY
+from motion_gate import AUDIT, INFER, SKIP, MotionGate
+from slot_fsm import SlotFSM
+from timings import StageTimer
+from tracker import BoxTracker
+
+# ==========================================
+# SHARED SETTINGS (used by detector.py and engine.py)
+# ==========================================
+# Local state that must survive a restart (entry times, journals)
+RUNTIME_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'runtime')
+
+# FSM Settings (Stability & Security)
+FRAMES_TO_OCCUPY = 5
+FRAMES_TO_VACATE = 30  # Increased for higher security against flickering
+
+# Run AI Inference every Nth frame to save CPU
+INFER_EVERY = 3
+
+# Seconds between FSM checkpoints (also written on every confirmed change)
+CHECKPOINT_EVERY = 5.0
+
+
+class WingStream:
+    """One wing: its video source, slot polygons and per-slot FSM state.
+
+    The stream does not own a model. The caller runs inference (alone or as
+    part of a batch with other wings) and hands the detections back through
+    process().
+
+    Frames come from a FrameGrabber thread. With display=False only the
+    frames that will be inferred are decoded at all.
+
+    With motion_gate=True, call needs_model() on each due frame: when the
+    slot regions haven't changed it steps the FSM with the last observation
+    itself and returns False, so the caller can skip the model.
+
+    With keyframe_every=N the model only runs on every Nth source frame.
+    In between, needs_model() moves the last keyframe's car boxes forward
+    with a BoxTracker and matches those to the slots instead.
+
+    The FSM state is checkpointed to runtime/fsm_<wing>.npz and restored on
+    the next start, so parked cars don't have to be confirmed again. Call
+    reconcile() with the wing's `slots` rows to line the database up with
+    it (checkpoint_every=0 starts from scratch and never writes one).
+    """
+
+    def __init__(self, wing_id, video_source, layout_path, on_change=None, display=True,
+                 motion_gate=False, max_staleness=10.0, keyframe_every=0, pace=None,
+                 checkpoint_every=CHECKPOINT_EVERY):
+        self.wing_id = wing_id
+        self.video_source = video_source
+        self.on_change = on_change
+        self.timings = StageTimer(wing_id)
+
+        print(f"[{wing_id}] Loading Slot Config: {layout_path}")
+        self.layout = load_layout(layout_path, wing_id)
+        if (self.layout.width, self.layout.height) != (WIDTH, HEIGHT):
+            raise ValueError(f"{layout_path} was drawn at {self.layout.width}x{self.layout.height}, "
+                             f"detector runs at {WIDTH}x{HEIGHT}")
+        self.pos_list = self.layout.pos_list
+
+        # Label mask comes precomputed in the layout file; matching is then a per-detection lookup
+        self.slot_mask = self.layout.get_slot_mask()
+
+        # Track state for each slot (counters + confirmed Occupied bitmap)
+        self.fsm = SlotFSM(len(self.pos_list), FRAMES_TO_OCCUPY, FRAMES_TO_VACATE)
+
+        # Last observed occupancy; repeated to the FSM when the motion gate skips a frame
+        self.last_occupied = np.zeros(len(self.pos_list), bool)
+        self.gate = MotionGate(self.slot_mask.mask > 0, max_staleness=max_staleness) if motion_gate else None
+        self._decision = INFER
+
+        # Detect-then-track: full detection on keyframes only, tracked boxes in between
+        self.tracker = BoxTracker() if keyframe_every > INFER_EVERY else None
+        self.keyframe_every = keyframe_every
+        self.last_keyframe = -keyframe_every
+        self.boxes = np.zeros((0, 6), np.float32)   # Boxes the current slot occupancy came from
+
+        # Occupancy start times we set ourselves, so a vacate never has to read them back
+        self.entry_times = EntryTimes(os.path.join(RUNTIME_DIR, f'entries_{wing_id}.json'))
+
+        # Warm restart: counters and confirmed states from the last checkpoint
+        self.checkpoint_every = checkpoint_every
+        self.checkpoint_path = os.path.join(RUNTIME_DIR, f'fsm_{wing_id}.npz')
+        self.restored_age = self.fsm.restore(self.checkpoint_path) if checkpoint_every else None
+        if self.restored_age is not None:
+            print(f"[{wing_id}] Restored {int(self.fsm.occupied.sum())} occupied slots "
+                  f"from a {self.restored_age:.0f} s old checkpoint")
+        self.last_checkpoint = time.monotonic()
+
+        # Capture runs in its own thread; frames nobody will look at are never decoded
+        self.grabber = FrameGrabber(video_source, decode_every=1 if display else INFER_EVERY,
+                                    timings=self.timings, pace=pace)
+        self.frame_index = 0        # Source frame number of the current frame
+        self.frame_time = 0.0       # perf_counter() when it was captured
+        self.last_inferred = -INFER_EVERY
+
+        # Exported by metrics.py; frames/sec and inference rate are rates of these
+        self.frames = REGISTRY.counter('parking_frames_total', wing=wing_id)
+        self.inferences = REGISTRY.counter('parking_inferences_total', wing=wing_id)
+        self.skipped = {reason: REGISTRY.counter('parking_inferences_skipped_total', wing=wing_id, reason=reason)
+                        for reason in ('gate', 'track')}
+        REGISTRY.collector(self._collect)
+
+    def _collect(self):
+        yield 'parking_frames_dropped_total', 'counter', {'wing': self.wing_id}, self.grabber.dropped
+        if self.tracker is not None:
+            yield 'parking_tracks', 'gauge', {'wing': self.wing_id}, len(self.tracker.tracks)
+
+    def is_open(self):
+        return self.grabber.is_open()
+
+    def read(self, timeout=1.0):
+        """Return the newest resized frame (stale ones are dropped), or None."""
+        item = self.grabber.read(timeout)
+        if item is None:
+            return None
+
+        self.frame_index, self.frame_time, frame = item
+        with self.timings.stage('resize'):
+            return cv2.resize(frame, (WIDTH, HEIGHT))
+
+    def should_infer(self):
+        # Every INFER_EVERY source frames, even if the frame in between was dropped
+        return self.frame_index - self.last_inferred >= INFER_EVERY
+
+    def frame_done(self):
+        """Record end-to-end latency for the current frame and print the periodic summary."""
+        self.frames.inc()
+        self.timings.add('latency', time.perf_counter() - self.frame_time)
+        extra = f"dropped {self.grabber.dropped}"
+        if self.gate is not None:
+            gate = self.gate.stats()
+            extra += (f" | gate skipped {gate['skipped']}/{gate['checks']}"
+                      f" (audit mismatch {gate['audit_mismatch_rate']:.1%})")
+        if self.tracker is not None:
+            extra += f" | tracks {len(self.tracker.tracks)}"
+        self.timings.maybe_report(extra)
+
+    def needs_model(self, frame):
+        """Ask the tracker and the motion gate whether the model must run on this due frame.
+
+        Between keyframes the slots are matched against the tracked boxes,
+        and on a gate skip the FSM is stepped with the last observation,
+        both right here.
+        """
+        if self.tracker is not None and self.frame_index - self.last_keyframe < self.keyframe_every:
+            self.last_inferred = self.frame_index
+            with self.timings.stage('track'):
+                self.boxes = self.tracker.predict()
+            self.skipped['track'].inc()
+            self._observe(self.boxes)
+            return False
+        if self.gate is None:
+            return True
+        with self.timings.stage('gate'):
+            self._decision = self.gate.check(frame)
+        if self._decision == SKIP:
+            self.last_inferred = self.frame_index
+            self.skipped['gate'].inc()
+            self._step(self.last_occupied)
+            return False
+        self.gate.inferred(frame)
+        return True
+
+    def process(self, detections):
+        """Match detections (rows of xmin, ymin, xmax, ymax, conf, cls) to slots and step the FSM."""
+        self.inferences.inc()
+        if self.tracker is not None:
+            self.last_keyframe = self.frame_index
+            with self.timings.stage('track'):
+                detections = self.tracker.update(detections)
+        self._observe(detections)
+
+    def _observe(self, detections):
+        self.last_inferred = self.frame_index
+        self.boxes = detections
+        with self.timings.stage('match'):
+            occupied = self.slot_mask.occupancy(detections)
+
+        # Audit of a frame the gate would have skipped: did skipping hide a change?
+        if self._decision == AUDIT and (occupied != self.last_occupied).any():
+            self.gate.audit_mismatches += 1
+        self._decision = INFER
+        self.last_occupied = occupied
+        self._step(occupied)
+
+    def _step(self, occupied):
+        # --- FSM LOGIC & DATABASE UPDATE ---
+        # Only slots whose confirmed status flipped are reported
+        with self.timings.stage('fsm'):
+            changed = self.fsm.update(occupied)
+        for i in changed:
+            status = self.fsm.status(i)
+            slot_label = self.slot_label(i)
+            now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            if status == "Occupied":
+                self.entry_times.start(slot_label, now)
+                entry_time = now
+            else:
+                entry_time = self.entry_times.end(slot_label)
+
+            print(f"[{self.wing_id}] Slot {slot_label} changed to {status}")
+            if self.on_change is not None:
+                self.on_change(self.wing_id, slot_label, status, at=now, entry_time=entry_time)
+
+        # After on_change, so a confirmed change is journalled before it is checkpointed
+        if self.checkpoint_every and (len(changed) or time.monotonic() - self.last_checkpoint >= self.checkpoint_every):
+            self.checkpoint()
+
+    def checkpoint(self):
+        try:
+            self.fsm.save(self.checkpoint_path)
+        except OSError as e:
+            print(f"[{self.wing_id}] Could not write {self.checkpoint_path}: {e}")
+        self.last_checkpoint = time.monotonic()
+
+    def slot_label(self, i):
+        return f"{self.wing_id}-{i+1:02d}"
+
+    def reconcile(self, rows, pending=()):
+        """Line local state up with this wing's `slots` rows (from one bulk query).
+
+        Without a checkpoint, the database's states are adopted and the
+        detector corrects them the normal way (with transactions) if cars
+        left meanwhile. With a checkpoint, the checkpoint wins. The rows
+        that disagree are returned as final states for SlotWriter.submit_states(),
+        which writes them in one batch. Slots in `pending` (events still in the
+        writer's journal, newer than both sides) are left alone.
+        """
+        cloud = {r['slot_id']: r for r in rows}
+        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        labels = [self.slot_label(i) for i in range(len(self.fsm))]
+
+        if self.restored_age is None:
+            self.fsm.adopt([cloud.get(label, {}).get('status') == 'Occupied' for label in labels])
+
+        entries, fixes = {}, []
+        for i, label in enumerate(labels):
+            row = cloud.get(label, {})
+            if label in pending:
+                if label in self.entry_times.entries:
+                    entries[label] = self.entry_times.entries[label]
+                continue
+            status = self.fsm.status(i)
+            if status == 'Occupied':
+                entries[label] = self.entry_times.entries.get(label) or row.get('start_time') or now
+            if row.get('status') != status:
+                fixes.append({'wing_id': self.wing_id, 'slot_id': label, 'status': status,
+                              'at': entries.get(label, now)})
+
+        self.entry_times.replace(entries)
+        if self.checkpoint_every:
+            self.checkpoint()
+        return fixes
+
+    def draw(self, frame):
+        if self.tracker is not None:
+            for x1, y1, x2, y2 in self.boxes[:, :4].astype(int):
+                cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 255), 1)
+        for i, pts in enumerate(self.pos_list):
+            # Red if Occupied, Green if Vacant
+            color = (0, 0, 255) if self.fsm.occupied[i] else (0, 255, 0)
+            cv2.polylines(frame, [np.array(pts, np.int32)], True, color, 2)
+
+            # Draw Slot ID
+            cv2.putText(frame, f"{i+1}", (int(pts[0][0]), int(pts[0][1])-5),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.4, color, 1)
+        return frame
+
+    def release(self):
+        self.grabber.release()
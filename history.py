@@ -1,52 +1,240 @@
-import random
+import argparse
+import os
+import sys
+import time
 from datetime import datetime, timedelta
-from supabase import create_client
 
-# --- 1. SUPABASE CONNECTION ---
-SUPABASE_URL = "https://edmusfoswgnjarzewzbi.supabase.co"
-SUPABASE_KEY = "sb_publishable_P-od1ESelOgV9dXUKooIlQ_x3FrRWHE"
-supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+import numpy as np
+import pandas as pd
 
-print("Injecting 30 days of synthetic parking data into Supabase...")
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(ROOT_DIR)
+sys.path.append(os.path.join(ROOT_DIR, 'core_ai'))
 
-wings = ['W1', 'W3A', 'W5', 'W7', 'W8']
-now = datetime.now()
+from backend.billing import load_tariff
+from layout import load_layout, layout_path
+
+# ==========================================
+# SYNTHETIC PARKING HISTORY
+# ==========================================
+# Usage:
+#   python history.py                                       # 500 sessions -> Supabase (as before)
+#   python history.py --sessions 30000000 --out runtime/history.parquet
+#   python history.py --sessions 5000000 --out runtime/parking.db   # local SQLite store
+#
+# Sessions are drawn in chunks of --chunk rows with NumPy, so memory stays
+# bounded at any size and the same --seed (and --chunk) gives the same rows.
+# Slots come from the real layouts in core_ai/config. Entry times follow the
+# weekday/weekend hourly profiles below, and each wing gets its own share of
+# traffic. Stays are log-normal (median about 1.5 h).
+
+WINGS = ['W1', 'W3A', 'W5', 'W7', 'W8']
 
 # Traffic weights (Hour of day: Weight). Higher weight = more cars park at this time.
 hourly_weights = {
-    6: 1, 7: 2, 8: 5, 9: 6, 10: 7, 11: 8, 
-    12: 10, 13: 10, 14: 8, 15: 6, 16: 5, 17: 7, 
+    6: 1, 7: 2, 8: 5, 9: 6, 10: 7, 11: 8,
+    12: 10, 13: 10, 14: 8, 15: 6, 16: 5, 17: 7,
     18: 9, 19: 8, 20: 5, 21: 3, 22: 2, 23: 1
 }
+# Weekends start later and stay busy into the evening
+weekend_weights = {
+    6: 0, 7: 1, 8: 2, 9: 4, 10: 7, 11: 9,
+    12: 10, 13: 10, 14: 10, 15: 9, 16: 8, 17: 8,
+    18: 9, 19: 9, 20: 7, 21: 5, 22: 3, 23: 1
+}
+# Relative traffic per day of the week (Monday = 0)
+weekday_weights = [1.0, 1.0, 1.0, 1.0, 1.1, 0.8, 0.5]
+# Relative popularity per wing, on top of its number of slots (ground-floor wings fill first)
+wing_popularity = {'W1': 1.3, 'W3A': 1.0, 'W5': 0.9, 'W7': 0.8, 'W8': 0.7}
+
+MEDIAN_STAY_MIN, STAY_SIGMA = 90, 0.8
+MIN_STAY_MIN, MAX_STAY_MIN = 10, 12 * 60
+
+COLUMNS = ['wing_id', 'slot_id', 'entry_time', 'exit_time', 'amount', 'payment_status']
+
+
+def load_slots(wings):
+    """[(wing_id, [slot_id, ...])] from core_ai/config, numbered like the detector does."""
+    config_dir = os.path.join(ROOT_DIR, 'core_ai', 'config')
+    slots = []
+    for wing_id in wings:
+        layout = load_layout(layout_path(wing_id, config_dir), wing_id)
+        slots.append((wing_id, [f"{wing_id}-{i+1:02d}" for i in range(len(layout))]))
+    return slots
+
+
+class HistoryGenerator:
+    """Draws parking sessions in vectorized chunks (see the distributions above)."""
+
+    def __init__(self, slots, days=30, end=None, seed=42, unpaid=0.0, tariff=None):
+        self.rng = np.random.default_rng(seed)
+        self.unpaid = unpaid
+        self.tariff = tariff or load_tariff()
+
+        # Every real slot, with a per-slot probability from its wing's share
+        self.wing_ids = np.array([w for w, ids in slots for _ in ids])
+        self.slot_ids = np.array([s for _, ids in slots for s in ids])
+        slot_weight = np.array([wing_popularity.get(w, 1.0) for w in self.wing_ids])
+        self.slot_p = slot_weight / slot_weight.sum()
+
+        # Days before `end`, weighted by day of the week
+        end = (end or datetime.now()).replace(hour=0, minute=0, second=0, microsecond=0)
+        self.start = np.datetime64(end - timedelta(days=days), 's')
+        weekday = (np.arange(days) + (end - timedelta(days=days)).weekday()) % 7
+        day_weight = np.array(weekday_weights)[weekday]
+        self.day_p = day_weight / day_weight.sum()
+        self.weekend = weekday >= 5
+
+        self.hour_p = np.zeros((2, 24))
+        for row, weights in enumerate((hourly_weights, weekend_weights)):
+            for hour, w in weights.items():
+                self.hour_p[row, hour] = w
+            self.hour_p[row] /= self.hour_p[row].sum()
+        self.hour_cdf = self.hour_p.cumsum(1)
+
+        # Timestamps are assembled from lookup tables instead of formatting each one:
+        # a date string per day (+1 for exits after midnight) and a time string per second of the day
+        dates = self.start + np.arange(days + 1).astype('timedelta64[D]')
+        self.date_str = np.array([str(d)[:10] + ' ' for d in dates], dtype=object)
+        tod = np.arange(86400)
+        self.time_str = np.array([f"{h:02d}:{m:02d}:{s:02d}" for h, m, s in zip(tod // 3600, tod // 60 % 60, tod % 60)],
+                                 dtype=object)
+
+    def chunk(self, n):
+        """n sessions as a DataFrame with the transactions columns."""
+        rng = self.rng
+        slot = rng.choice(len(self.slot_ids), n, p=self.slot_p)
+        day = rng.choice(len(self.day_p), n, p=self.day_p)
+
+        # Hour from the weekday or weekend profile: inverse CDF on the matching row
+        cdf = self.hour_cdf[self.weekend[day].astype(int)]
+        hour = np.minimum((rng.random(n)[:, None] > cdf).sum(1), 23)
+
+        offset = day * 86400 + hour * 3600 + rng.integers(0, 3600, n)
+        stay_min = np.clip(rng.lognormal(np.log(MEDIAN_STAY_MIN), STAY_SIGMA, n), MIN_STAY_MIN, MAX_STAY_MIN)
+        stay = (stay_min * 60).astype(np.int64)
+        exit_ = offset + stay
+
+        # Priced with the same tariff as the payment portal and backend/billing.py
+        amount = self.tariff.fee(stay)
+        unpaid = rng.random(n) < self.unpaid if self.unpaid else np.zeros(n, bool)
+
+        return pd.DataFrame({
+            'wing_id': self.wing_ids[slot],
+            'slot_id': self.slot_ids[slot],
+            'entry_time': self._format(offset),
+            'exit_time': self._format(exit_),
+            'amount': np.where(unpaid, np.nan, amount),
+            'payment_status': np.where(unpaid, 'Unpaid', 'Paid'),
+        })
+
+    def _format(self, seconds):
+        """Seconds since the first day -> 'YYYY-mm-dd HH:MM:SS' (the format the detector writes)."""
+        return self.date_str[seconds // 86400] + self.time_str[seconds % 86400]
+
+
+class CsvSink:
+    def __init__(self, path):
+        self.path, self.first = path, True
+
+    def write(self, df):
+        df.to_csv(self.path, mode='w' if self.first else 'a', header=self.first, index=False)
+        self.first = False
+
+    def close(self):
+        pass
+
+
+class ParquetSink:
+    def __init__(self, path):
+        import pyarrow.parquet as pq  # Optional dependency, only for .parquet output
+        import pyarrow as pa
+        self.pa, self.pq, self.path, self.writer = pa, pq, path, None
+
+    def write(self, df):
+        table = self.pa.Table.from_pandas(df, preserve_index=False)
+        if self.writer is None:
+            self.writer = self.pq.ParquetWriter(self.path, table.schema, compression='zstd')
+        self.writer.write_table(table)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+class SqliteSink:
+    """Bulk load into the local store (backend/sqlite_client.py schema); marked as already synced."""
+
+    def __init__(self, path):
+        from backend.sqlite_client import SqliteClient
+        self.conn = SqliteClient(path).connection()
+        self.sql = (f"INSERT INTO transactions ({', '.join(COLUMNS)}, synced) "
+                    f"VALUES ({', '.join('?' * len(COLUMNS))}, 1)")
+
+    def write(self, df):
+        self.conn.execute("BEGIN IMMEDIATE")
+        self.conn.executemany(self.sql, df.astype(object).where(df.notna(), None).itertuples(index=False, name=None))
+        self.conn.execute("COMMIT")
+
+    def close(self):
+        pass
+
+
+class SupabaseSink:
+    """Insert into the cloud in batches (fine for thousands of rows, not for millions)."""
+
+    def __init__(self, batch=1000):
+        from backend.storage import create_remote_client
+        self.client, self.batch = create_remote_client(), batch
+
+    def write(self, df):
+        rows = df.astype(object).where(df.notna(), None).to_dict('records')
+        for i in range(0, len(rows), self.batch):
+            self.client.table('transactions').insert(rows[i:i + self.batch]).execute()
+
+    def close(self):
+        pass
+
+
+def open_sink(path):
+    if path is None:
+        return SupabaseSink()
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    if path.endswith('.parquet'):
+        return ParquetSink(path)
+    if path.endswith('.db'):
+        return SqliteSink(path)
+    return CsvSink(path)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sessions', type=int, default=500, help='Number of parking sessions to generate')
+    parser.add_argument('--days', type=int, default=30, help='How many days of history, ending yesterday')
+    parser.add_argument('--end', type=lambda s: datetime.strptime(s, '%Y-%m-%d'), default=None,
+                        help='Last day (exclusive) of the history, YYYY-mm-dd (default: today)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--chunk', type=int, default=1_000_000, help='Rows generated and written at a time')
+    parser.add_argument('--wings', nargs='+', default=WINGS)
+    parser.add_argument('--unpaid', type=float, default=0.0, help='Fraction of sessions left Unpaid (no amount)')
+    parser.add_argument('--out', help='.csv, .parquet or .db (SQLite) file; default: insert into Supabase')
+    args = parser.parse_args()
+
+    slots = load_slots(args.wings)
+    generator = HistoryGenerator(slots, days=args.days, end=args.end, seed=args.seed, unpaid=args.unpaid)
+    sink = open_sink(args.out)
+    target = args.out or "Supabase"
+    print(f"Generating {args.sessions:,} sessions over {args.days} days for "
+          f"{len(generator.slot_ids)} slots in {len(slots)} wings -> {target}")
+
+    t0 = time.perf_counter()
+    written = 0
+    while written < args.sessions:
+        n = min(args.chunk, args.sessions - written)
+        sink.write(generator.chunk(n))
+        written += n
+        elapsed = time.perf_counter() - t0
+        print(f"  {written:,} rows ({written / elapsed:,.0f} rows/s)")
+    sink.close()
 
-transactions = []
-for _ in range(500): # Generate 500 past parking sessions
-    # Pick a random day in the last 30 days
-    days_ago = random.randint(1, 30)
-    
-    # Pick an hour based on our realistic weights
-    hour = random.choices(list(hourly_weights.keys()), weights=list(hourly_weights.values()))[0]
-    minute = random.randint(0, 59)
-    
-    # Create the entry and exit times
-    entry_time = now - timedelta(days=days_ago)
-    entry_time = entry_time.replace(hour=hour, minute=minute, second=0)
-    
-    # Cars stay between 30 mins and 4 hours
-    stay_duration = timedelta(minutes=random.randint(30, 240))
-    exit_time = entry_time + stay_duration
-    
-    transactions.append({
-        'wing_id': random.choice(wings),
-        'slot_id': f"{random.choice(wings)}-{random.randint(1, 10):02d}",
-        'entry_time': entry_time.strftime('%Y-%m-%d %H:%M:%S'),
-        'exit_time': exit_time.strftime('%Y-%m-%d %H:%M:%S'),
-        'amount': round(random.uniform(2.0, 10.0), 2),
-        'payment_status': 'Paid'
-    })
-
-# Send to Supabase in batches
-for i in range(0, len(transactions), 100):
-    supabase.table('transactions').insert(transactions[i:i+100]).execute()
-
-print("✅ Successfully added 500 realistic records to your cloud database!")
\ No newline at end of file
+    print(f"✅ Added {written:,} realistic records to {target} in {time.perf_counter() - t0:.1f}s")
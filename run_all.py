@@ -1,4 +1,5 @@
 import subprocess
+import sys
 import time
 import os
 
@@ -11,24 +12,46 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 CORE_AI_DIR = os.path.join(BASE_DIR, 'core_ai')
 MAIN_PY_PATH = os.path.join(CORE_AI_DIR, 'main.py')
 
+# Written by the manager's supervisor once every detector has loaded its model
+MANAGER_READY = os.path.join(BASE_DIR, 'runtime', 'ready_manager')
+READY_TIMEOUT = 180
+
 processes = []
 
 try:
-    # 1. Start the AI Manager
+    t_start = time.perf_counter()
+    if os.path.exists(MANAGER_READY):
+        os.remove(MANAGER_READY)
+
+    # 1. Start the AI Manager (pass extra flags through, e.g. --batched --headless)
     print("[1/2] Starting AI Multi-Stream Engine...")
-    p1 = subprocess.Popen(['python', 'manager.py'], cwd=CORE_AI_DIR)
+    p1 = subprocess.Popen([sys.executable, 'manager.py', *sys.argv[1:]], cwd=CORE_AI_DIR)
     processes.append(p1)
-    
-    # Give the AI 5 seconds to warm up and load the YOLO models
-    time.sleep(5)
-    
-    # 2. Start Streamlit
+
+    # Wait until the models are actually loaded instead of guessing a delay
+    while not os.path.exists(MANAGER_READY):
+        if p1.poll() is not None:
+            raise SystemExit(f"AI Manager exited with code {p1.returncode} before it was ready")
+        if time.perf_counter() - t_start > READY_TIMEOUT:
+            print(f"⚠️ Detectors not ready after {READY_TIMEOUT}s; starting the dashboard anyway")
+            break
+        time.sleep(0.2)
+    else:
+        print(f"AI engine ready in {time.perf_counter() - t_start:.1f}s")
+
+    # 2. Start Streamlit (on the manager's event bus port, so --event-port 0 means polling there too)
     print("[2/2] Launching Dashboard...")
-    p2 = subprocess.Popen(['streamlit', 'run', MAIN_PY_PATH], cwd=BASE_DIR)
+    env = dict(os.environ)
+    for i, arg in enumerate(sys.argv):
+        if arg == '--event-port' and i + 1 < len(sys.argv):
+            env['PARKING_EVENT_PORT'] = sys.argv[i + 1]
+        elif arg.startswith('--event-port='):
+            env['PARKING_EVENT_PORT'] = arg.split('=', 1)[1]
+    p2 = subprocess.Popen(['streamlit', 'run', MAIN_PY_PATH], cwd=BASE_DIR, env=env)
     processes.append(p2)
 
     print("\n✅ System is running! Press Ctrl+C in this terminal to shut everything down.")
-    
+
     # Keep the script alive
     for p in processes:
         p.wait()
@@ -36,4 +59,9 @@ try:
 except KeyboardInterrupt:
     print("\n🛑 Shutting down AI Smart Parking System...")
     for p in processes:
-        p.terminate()
\ No newline at end of file
+        p.terminate()
+    for p in processes:
+        try:
+            p.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            p.kill()
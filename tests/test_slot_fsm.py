@@ -0,0 +1,105 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'core_ai'))
+from slot_fsm import SlotFSM
+
+FRAMES_TO_OCCUPY, FRAMES_TO_VACATE = 5, 30
+
+
+def reference_step(slot_states, occupied_now, frames_to_occupy=FRAMES_TO_OCCUPY, frames_to_vacate=FRAMES_TO_VACATE):
+    """The original list-of-dicts loop from detector.py; returns the slots that changed."""
+    changed = []
+    for i, state in enumerate(slot_states):
+        old_confirmed_status = state["status"]
+        if occupied_now[i]:
+            state["count"] = min(state["count"] + 1, frames_to_occupy)
+            if state["count"] >= frames_to_occupy:
+                state["status"] = "Occupied"
+        else:
+            state["count"] = max(state["count"] - 1, -frames_to_vacate)
+            if state["count"] <= -frames_to_vacate:
+                state["status"] = "Vacant"
+        if old_confirmed_status != state["status"]:
+            changed.append(i)
+    return changed
+
+
+def observations(seed, num_slots, frames):
+    """Per-slot "true" occupancy that changes rarely, seen through a flickering detector."""
+    rng = np.random.default_rng(seed)
+    truth = rng.random(num_slots) < 0.5
+    noise = rng.choice([0.0, 0.1, 0.4], num_slots)
+    for _ in range(frames):
+        truth ^= rng.random(num_slots) < 0.01
+        yield truth ^ (rng.random(num_slots) < noise)
+
+
+def assert_same(fsm, slot_states):
+    assert fsm.counts.tolist() == [s["count"] for s in slot_states]
+    assert [fsm.status(i) for i in range(len(fsm))] == [s["status"] for s in slot_states]
+
+
+def step_both(fsm, slot_states, observed):
+    expected = reference_step(slot_states, observed)
+    assert fsm.update(observed).tolist() == expected
+    assert_same(fsm, slot_states)
+    return len(expected)
+
+
+@pytest.mark.parametrize('seed, num_slots', [(0, 64), (1, 1), (2, 200)])
+def test_matches_reference_loop(seed, num_slots):
+    fsm = SlotFSM(num_slots, FRAMES_TO_OCCUPY, FRAMES_TO_VACATE)
+    slot_states = [{"count": 0, "status": "Vacant"} for _ in range(num_slots)]
+    transitions = sum(step_both(fsm, slot_states, observed) for observed in observations(seed, num_slots, 5000))
+    assert transitions > 0
+
+
+def test_save_restore_continues_identically(tmp_path):
+    path = str(tmp_path / 'fsm.npz')
+    fsm = SlotFSM(64, FRAMES_TO_OCCUPY, FRAMES_TO_VACATE)
+    slot_states = [{"count": 0, "status": "Vacant"} for _ in range(64)]
+    stream = observations(3, 64, 4000)
+    for _, observed in zip(range(2000), stream):
+        step_both(fsm, slot_states, observed)
+
+    fsm.save(path)
+    restored = SlotFSM(64, FRAMES_TO_OCCUPY, FRAMES_TO_VACATE)
+    age = restored.restore(path)
+    assert age is not None and 0 <= age < 60
+    assert_same(restored, slot_states)
+
+    for observed in stream:
+        step_both(restored, slot_states, observed)
+
+
+def test_restore_ignores_missing_or_mismatched_checkpoints(tmp_path):
+    path = str(tmp_path / 'fsm.npz')
+    fsm = SlotFSM(10, FRAMES_TO_OCCUPY, FRAMES_TO_VACATE)
+    assert fsm.restore(path) is None
+
+    SlotFSM(12, FRAMES_TO_OCCUPY, FRAMES_TO_VACATE).save(path)     # Layout redrawn since
+    assert fsm.restore(path) is None
+
+    other = SlotFSM(10, FRAMES_TO_OCCUPY + 10, FRAMES_TO_VACATE)  # Counters out of range for this FSM
+    other.counts[:] = FRAMES_TO_OCCUPY + 10
+    other.save(path)
+    assert fsm.restore(path) is None
+    assert fsm.counts.tolist() == [0] * 10 and not fsm.occupied.any()
+
+
+def test_adopt_matches_reference_loop_seeded_with_the_same_states():
+    rng = np.random.default_rng(4)
+    occupied = rng.random(64) < 0.5
+    fsm = SlotFSM(64, FRAMES_TO_OCCUPY, FRAMES_TO_VACATE)
+    fsm.adopt(occupied)
+    # What the old loop would hold for a slot the database says is occupied / vacant
+    slot_states = [{"count": FRAMES_TO_OCCUPY, "status": "Occupied"} if o else {"count": 0, "status": "Vacant"}
+                   for o in occupied]
+    assert_same(fsm, slot_states)
+
+    for observed in observations(5, 64, 3000):
+        step_both(fsm, slot_states, observed)